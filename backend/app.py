@@ -1,11 +1,182 @@
-from fastapi import FastAPI, Request
+import hmac
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, List, Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .services.chat_service import ChatService
-from .services.assessment_service import AssessmentService
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from starlette.concurrency import run_in_threadpool
+from .services.idempotency import COMPUTED, REJECTED, IdempotencyCache, IdempotencyConflict, fingerprint
+from .services.rate_limiter import RATE_LIMIT_CRISIS_BYPASS, TokenBucketLimiter
+from .services.shared_cache import SharedLRU
+from .utils.metrics import REGISTRY, PROMETHEUS_CONTENT_TYPE
+from .utils.profiling import PROFILER
+from .utils.structured_logging import (
+    bind_context, configure_logging, new_request_id, reset_context, shutdown_logging
+)
+
+if TYPE_CHECKING:
+    from .services.assessment_service import AssessmentService
+    from .services.batch_chat import BatchJobManager
+    from .services.chat_service import ChatService
+    from .services.model_warmup import ModelWarmer
+
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# Set MODEL_WARMUP=0 to skip preloading (e.g. when Ollama is managed elsewhere)
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "1") != "0"
+# Extra models to keep loaded besides the chat model, comma separated
+WARMUP_MODELS = [m.strip() for m in os.environ.get("WARMUP_MODELS", "").split(",") if m.strip()]
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "End-to-end request latency by route", labels=("route",))
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "Requests currently being handled")
+
+# Per-client limit on chat turns (CHAT_RATE_PER_MINUTE, CHAT_RATE_BURST); crisis messages are never throttled
+chat_rate_limiter = TokenBucketLimiter()
+# Retried /chat/ requests with the same Idempotency-Key reuse the first generation,
+# on any worker when SHARED_CACHE_DIR is set
+chat_idempotency = IdempotencyCache(
+    shared=SharedLRU.from_env("idempotency", capacity_bytes=16 << 20, slot_bytes=8 << 10))
+
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware timing every request; cheaper than BaseHTTPMiddleware.
+    Compare with chat_stage_seconds to tell queueing from work.
+    Also binds a correlation id (X-Request-ID, generated if absent) for logging.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or new_request_id()
+        context_token = bind_context(request_id=request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        profiler = None
+        if PROFILER.active and not scope["path"].startswith("/admin/"):
+            profiler = PROFILER.begin_request()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            reset_context(context_token)
+            if profiler is not None:
+                PROFILER.end_request(profiler)
+            HTTP_IN_FLIGHT.dec()
+            # Label by route template, not raw path, to keep cardinality bounded
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, getattr(route, "path", "unmatched"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging(getattr(logging, os.environ.get("LOG_LEVEL", "INFO").upper(), logging.INFO))
+    # Build the chat service and start warming off the startup path, so the
+    # server accepts connections (and reports not-ready) straight away
+    warmup_thread = None
+    if MODEL_WARMUP:
+        warmup_thread = threading.Thread(target=_start_model_warmer, name="model-warmup-init", daemon=True)
+        warmup_thread.start()
+    try:
+        yield
+    finally:
+        if warmup_thread is not None:
+            warmup_thread.join()
+        for warmer in model_warmers:
+            warmer.stop()
+        if _chat_service is not None:
+            _chat_service.analytics.flush()
+        shutdown_logging()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Heavy subsystems are built on first use; importing this module only wires up routes
+_chat_service: Optional["ChatService"] = None
+_assessment_service: Optional["AssessmentService"] = None
+_batch_manager: Optional["BatchJobManager"] = None
+_init_lock = threading.Lock()
+# One warmer per Ollama backend
+model_warmers: List["ModelWarmer"] = []
+
+
+def get_chat_service() -> "ChatService":
+    global _chat_service
+    if _chat_service is None:
+        with _init_lock:
+            if _chat_service is None:
+                from .models.backend_pool import create_llm_client
+                from .services.chat_service import ChatService
+                _chat_service = ChatService(llm_client=create_llm_client())
+    return _chat_service
+
+
+def get_batch_manager() -> "BatchJobManager":
+    global _batch_manager
+    if _batch_manager is None:
+        # Built outside the lock, which is not reentrant
+        chat_service = get_chat_service()
+        with _init_lock:
+            if _batch_manager is None:
+                from .services.batch_chat import BatchJobManager
+                _batch_manager = BatchJobManager(chat_service)
+    return _batch_manager
+
+
+def get_assessment_service() -> "AssessmentService":
+    global _assessment_service
+    if _assessment_service is None:
+        with _init_lock:
+            if _assessment_service is None:
+                from .services.assessment_service import AssessmentService
+                _assessment_service = AssessmentService()
+    return _assessment_service
+
 
-app = FastAPI()
-chat_service = ChatService()
-assessment_service = AssessmentService()
+def __getattr__(name):
+    # Keeps `app.chat_service` / `app.assessment_service` working for scripts and benchmarks
+    if name == "chat_service":
+        return get_chat_service()
+    if name == "assessment_service":
+        return get_assessment_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _start_model_warmer() -> None:
+    from .services.model_warmup import ModelWarmer
+
+    chat_service = get_chat_service()
+    # Every routed tier is warmed, so the first simple turn does not pay for loading the small model. Readiness
+    # waits for the large model only (listed first): it can answer every turn, and a small tier that is not
+    # pulled escalates to it
+    models = list(dict.fromkeys(chat_service.model_router.models + WARMUP_MODELS))
+    # A backend pool exposes its per-backend clients so every backend gets loaded and primed
+    clients = getattr(chat_service.llm_client, "clients", [chat_service.llm_client])
+    model_warmers.extend(
+        ModelWarmer(client, models, system_prompt=chat_service.therapy_prompts.base_system_prompt,
+                    keep_alive=chat_service.keep_alive).start()
+        for client in clients
+    )
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,30 +185,178 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 @app.post("/chat/")
 async def chat_endpoint(request: Request):
     data = await request.json()
     user_message = data.get("message", "")
     user_id = data.get("user_id", None)
-    return chat_service.process_message(user_message, user_id)
+    client_key = user_id or (request.client.host if request.client else "anonymous")
+
+    # Without a key, an identical message already in flight for the client (a double submit) is still attached to
+    idempotency_key = request.headers.get("idempotency-key") or data.get("idempotency_key")
+    if idempotency_key:
+        key, store = f"{client_key}:{str(idempotency_key)[:128]}", True
+    else:
+        key, store = f"{client_key}:submit:{fingerprint(user_message)}", False
+
+    # Only requests that will generate count against the rate limit; duplicates are answered without new work
+    throttled = []
+
+    def admit() -> bool:
+        allowed, retry_after = chat_rate_limiter.check(client_key)
+        if allowed:
+            return True
+        from .utils.therapy_prompts import detect_crisis_level, is_priority_crisis
+        if is_priority_crisis(detect_crisis_level(user_message)):
+            RATE_LIMIT_CRISIS_BYPASS.inc(chat_rate_limiter.scope)
+            return True
+        throttled.append(retry_after)
+        return False
+
+    # Generation blocks on the LLM; run it in the threadpool so the event loop keeps serving
+    try:
+        result, outcome = await chat_idempotency.run(
+            key, fingerprint(user_message, user_id),
+            lambda: run_in_threadpool(PROFILER.call, get_chat_service().process_message, user_message, user_id),
+            store=store, cacheable=lambda response: "error" not in response, admit=admit)
+    except IdempotencyConflict as e:
+        return JSONResponse({"error": "idempotency_key_reused", "detail": str(e)}, status_code=422)
+    if outcome == REJECTED:
+        retry_after = throttled[0]
+        return JSONResponse(
+            {"message": "You're sending messages faster than I can reply. Please wait a moment and try again.",
+             "error": "rate_limited", "retry_after": round(retry_after, 1)},
+            status_code=429, headers={"Retry-After": str(max(int(retry_after + 0.999), 1))})
+    if outcome != COMPUTED:
+        return JSONResponse(result, headers={"Idempotent-Replayed": "true"})
+    return result
+
+@app.post("/chat/batch", status_code=202)
+async def chat_batch_endpoint(request: Request):
+    data = await request.json()
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return JSONResponse({"error": "invalid_batch", "detail": "items must be a list"}, status_code=422)
+    client_key = data.get("user_id") or (request.client.host if request.client else "anonymous")
+    # A batch is one submission for the rate limit; its generations only use idle capacity
+    allowed, retry_after = chat_rate_limiter.check(client_key)
+    if not allowed:
+        return JSONResponse({"error": "rate_limited", "retry_after": round(retry_after, 1)}, status_code=429,
+                            headers={"Retry-After": str(max(int(retry_after + 0.999), 1))})
+    manager = await run_in_threadpool(get_batch_manager)
+    try:
+        # Detection for the whole batch runs here, in one pass
+        job = await run_in_threadpool(PROFILER.call, manager.submit, items)
+    except ValueError as e:
+        return JSONResponse({"error": "invalid_batch", "detail": str(e)}, status_code=422)
+    return {"job_id": job.job_id, "status": job.status, "total": len(job.items), "crisis_items": job.crisis_items}
+
+@app.get("/chat/batch/{job_id}")
+def chat_batch_status(job_id: str, offset: int = 0, limit: int = 100):
+    job = get_batch_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired batch job")
+    return job.view(max(offset, 0), min(max(limit, 1), 1000))
 
 @app.post("/start_session/")
 async def start_session(request: Request):
     data = await request.json()
     user_id = data.get("user_id", None)
-    return chat_service.start_session(user_id)
+    return get_chat_service().start_session(user_id)
 
 @app.post("/end_session/")
 async def end_session():
-    return chat_service.end_session()
+    return get_chat_service().end_session()
+
+@app.get("/session_stats/")
+def session_stats():
+    return get_chat_service().get_session_stats()
 
 @app.post("/assessment/")
 async def assessment_endpoint(request: Request):
     data = await request.json()
     assessment_type = data.get("type", "phq9")
     answers = data.get("answers", [])
-    return assessment_service.process_assessment(assessment_type, answers)
+    return get_assessment_service().process_assessment(assessment_type, answers)
+
+@app.get("/ready")
+def readiness():
+    # Not ready until the chat model is loaded and warm; liveness stays on "/"
+    if not MODEL_WARMUP:
+        return {"ready": True, "warmup": "disabled"}
+    if not model_warmers:
+        return JSONResponse({"ready": False, "warmup": "starting"}, status_code=503)
+    # With several backends, serving can start once any of them is warm
+    backends = {warmer.llm_client.base_url: warmer.readiness() for warmer in model_warmers}
+    status = {"ready": any(b["ready"] for b in backends.values()), "backends": backends}
+    return status if status["ready"] else JSONResponse(status, status_code=503)
+
+@app.get("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.post("/admin/profile/start", dependencies=[Depends(require_admin)])
+async def start_profiling(request: Request):
+    # Runs on the event loop thread, which is the thread the stack sampler watches
+    data = await request.json()
+    return PROFILER.start(
+        duration=float(data.get("seconds", 30)),
+        max_requests=int(data.get("requests", 100)),
+        sample_rate=float(data.get("sample_rate", 1.0)),
+        loop_thread_id=threading.get_ident() if data.get("event_loop", True) else None,
+        interval=float(data.get("interval_ms", 5)) / 1000
+    )
+
+@app.post("/admin/profile/stop", dependencies=[Depends(require_admin)])
+def stop_profiling():
+    return PROFILER.stop()
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+def profiling_status():
+    return PROFILER.status()
+
+@app.get("/admin/profile/requests", dependencies=[Depends(require_admin)])
+def request_profile():
+    return PlainTextResponse(PROFILER.request_stacks())
+
+@app.get("/admin/profile/event_loop", dependencies=[Depends(require_admin)])
+def event_loop_profile():
+    return PlainTextResponse(PROFILER.loop_stacks())
+
+@app.get("/admin/idempotency", dependencies=[Depends(require_admin)])
+def idempotency_status():
+    return chat_idempotency.snapshot()
+
+@app.get("/admin/analytics/{table}", dependencies=[Depends(require_admin)])
+def analytics_query(table: str, request: Request, group_by: str = "", agg: str = "",
+                    since: Optional[str] = None, until: Optional[str] = None):
+    # e.g. /admin/analytics/turns?group_by=day,emotional_state&agg=llm_ms:mean&crisis_level=high
+    analytics = get_chat_service().analytics
+    if not analytics.enabled:
+        raise HTTPException(status_code=404, detail="Analytics export is disabled; set ANALYTICS_DIR")
+    where = {name: request.query_params.getlist(name) for name in request.query_params
+             if name not in ("group_by", "agg", "since", "until")}
+    try:
+        rows = analytics.query(table, group_by=[c for c in group_by.split(",") if c],
+                               aggregates=[a for a in agg.split(",") if a], since=since, until=until, where=where)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"table": table, "rows": rows}
+
+@app.get("/admin/backends", dependencies=[Depends(require_admin)])
+def backend_status():
+    llm_client = get_chat_service().llm_client
+    if hasattr(llm_client, "snapshot"):
+        return llm_client.snapshot()
+    return {"backends": [{"url": llm_client.base_url}]}
 
 @app.get("/")
 def read_root():
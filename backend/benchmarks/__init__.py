@@ -0,0 +1,4 @@
+"""
+Benchmarks for the AI Mental Health Counselor backend
+Run from the repository root, e.g. `python -m backend.benchmarks.speech_pipeline`
+"""
@@ -0,0 +1,133 @@
+"""
+Batch chat throughput: one-pass detection and background generation
+First times crisis and emotion detection for many messages, per message
+(as /chat/ does) against BatchDetector's single scan. Then answers the same
+messages against the fake Ollama server twice: serially, one blocking turn
+after another like an integration calling /chat/ in a loop, and as one
+batch job whose generations fill every serving slot at background priority.
+CPU time per message is process time, so it covers the client side only
+
+Usage (from the repository root):
+    python -m backend.benchmarks.batch_chat
+    python -m backend.benchmarks.batch_chat --messages 200 --detect-messages 50000 --json
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+from ..fake_ollama import FakeOllamaServer
+from ..models.llm_handler import OllamaClient
+from ..services.batch_chat import BatchDetector, BatchJobManager
+from ..services.chat_service import EMOTION_KEYWORDS, ChatService
+from ..services.fair_scheduler import FairScheduler
+from ..utils.therapy_prompts import detect_crisis_level
+
+ENTRIES = [
+    "Today was long but I managed to go for a walk",
+    "I'm worried about the exam and can't sleep",
+    "I feel sad and lonely since the move",
+    "Work is too much, I'm completely overwhelmed",
+    "Things are getting better, I feel hopeful",
+    "I was so angry at my brother again",
+    "Nothing happened really, just a normal day",
+    "Sometimes I feel hopeless about all of it",
+]
+
+
+def synthetic_messages(count: int, rng: random.Random) -> List[str]:
+    return [f"{rng.choice(ENTRIES)}. {rng.choice(ENTRIES).lower()}" for _ in range(count)]
+
+
+def time_detection(messages: List[str]) -> Dict:
+    service = ChatService(llm_client=None)
+    started = time.perf_counter()
+    expected = [(detect_crisis_level(m), service._detect_emotional_state(m)) for m in messages]
+    loop_seconds = time.perf_counter() - started
+
+    detector = BatchDetector(EMOTION_KEYWORDS)
+    started = time.perf_counter()
+    crisis, emotions = detector.detect(messages)
+    batch_seconds = time.perf_counter() - started
+    return {
+        "loop_us_per_message": round(loop_seconds / len(messages) * 1e6, 2),
+        "batch_us_per_message": round(batch_seconds / len(messages) * 1e6, 2),
+        "speedup": round(loop_seconds / batch_seconds, 1),
+        "identical": expected == list(zip(crisis, emotions))
+    }
+
+
+def run_serial(server: FakeOllamaServer, messages: List[str], slots: int) -> Dict:
+    service = ChatService(llm_client=OllamaClient(server.url), keep_alive=None,
+                          scheduler=FairScheduler(slots=slots))
+    wall, cpu = time.perf_counter(), time.process_time()
+    for message in messages:
+        service.process_message(message, user_id="integration")
+    return summarize(len(messages), time.perf_counter() - wall, time.process_time() - cpu)
+
+
+def run_batch(server: FakeOllamaServer, messages: List[str], slots: int) -> Dict:
+    service = ChatService(llm_client=OllamaClient(server.url), keep_alive=None,
+                          scheduler=FairScheduler(slots=slots, background_reserve=0))
+    manager = BatchJobManager(service)
+    wall, cpu = time.perf_counter(), time.process_time()
+    job = manager.submit([{"session_id": f"s{i}", "message": m} for i, m in enumerate(messages)])
+    while job.finished is None:
+        time.sleep(0.005)
+    result = summarize(len(messages), time.perf_counter() - wall, time.process_time() - cpu)
+    result["degraded"] = sum(1 for r in job.results if r.get("degraded"))
+    return result
+
+
+def summarize(count: int, wall_seconds: float, cpu_seconds: float) -> Dict:
+    return {
+        "messages_per_second": round(count / wall_seconds, 1),
+        "cpu_ms_per_message": round(cpu_seconds / count * 1000, 3),
+        "wall_seconds": round(wall_seconds, 2)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare serial chat turns with a batch chat job")
+    parser.add_argument("--messages", type=int, default=80, help="Messages answered per run")
+    parser.add_argument("--detect-messages", type=int, default=10000, help="Messages in the detection timing")
+    parser.add_argument("--num-parallel", type=int, default=4, help="Serving slots of the fake server")
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--ttft", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    report = {"detection": time_detection(synthetic_messages(args.detect_messages, rng))}
+    messages = synthetic_messages(args.messages, rng)
+    with FakeOllamaServer(ttft=args.ttft, tokens_per_second=args.tokens_per_second,
+                          num_parallel=args.num_parallel) as server:
+        report["serial"] = run_serial(server, messages, args.num_parallel)
+        report["batch"] = run_batch(server, messages, args.num_parallel)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        detection = report["detection"]
+        print(f"📦 Batch chat ({args.messages} messages, {args.num_parallel} serving slots)")
+        print("=" * 60)
+        print(f"detection per message   loop {detection['loop_us_per_message']} µs, "
+              f"batch {detection['batch_us_per_message']} µs ({detection['speedup']}x)")
+        print(f"{'mode':<10}{'msgs/s':>10}{'cpu ms/msg':>13}{'wall s':>10}")
+        for mode in ("serial", "batch"):
+            result = report[mode]
+            print(f"{mode:<10}{result['messages_per_second']:>10.1f}{result['cpu_ms_per_message']:>13.3f}"
+                  f"{result['wall_seconds']:>10.2f}")
+
+    if not report["detection"]["identical"]:
+        print("\n❌ Batch detection disagrees with per-message detection")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Tail latency under overload: adaptive generation budget vs static settings
+Drives concurrent chat sessions through ChatService against the fake
+Ollama server with a limited number of serving slots, so turns queue the
+way they do on a saturated GPU. The static run always asks for the full
+reply length; the adaptive run lets GenerationBudget shrink num_predict and
+prompt history as the queue grows. Crisis turns are checked to keep the
+full budget in both runs
+
+Usage (from the repository root):
+    python -m backend.benchmarks.generation_budget
+    python -m backend.benchmarks.generation_budget --workers 16 --turns 96 --json
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from ..fake_ollama import FakeOllamaServer
+from ..models.llm_handler import OllamaClient
+from ..services.chat_service import ChatService
+from ..services.generation_budget import GenerationBudget
+from .http_load import percentile
+
+MESSAGES = [
+    "I'm a bit nervous about my exam next week",
+    "Work has been okay, just busy",
+    "I feel frustrated with my roommate",
+    "Thanks, that helps a little",
+    "I keep thinking I can't go on like this",
+    "I've been sleeping badly and feel exhausted"
+]
+
+
+def run(server: FakeOllamaServer, budget: GenerationBudget, args) -> Dict:
+    client = OllamaClient(server.url)
+    latencies: List[float] = []
+    generated: List[int] = []
+    plans: List = []
+    lock = threading.Lock()
+    remaining = [args.turns]
+
+    # Record what the budget planned per turn, to check crisis turns kept the full budget
+    plan = budget.plan
+
+    def recording_plan(crisis: bool = False) -> Dict:
+        planned = plan(crisis)
+        with lock:
+            plans.append((crisis, planned["num_predict"]))
+        return planned
+
+    budget.plan = recording_plan
+
+    def worker(index: int) -> None:
+        service = ChatService(llm_client=client, generation_budget=budget, keep_alive=None)
+        service.start_session(f"bench-{index}")
+        turn = index
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            message = MESSAGES[turn % len(MESSAGES)]
+            turn += 1
+            started = time.perf_counter()
+            service.process_message(message)
+            elapsed = time.perf_counter() - started
+            timings = service.conversation_history[-1]["llm_timings"] or {}
+            with lock:
+                latencies.append(elapsed)
+                generated.append(timings.get("generated_tokens", 0))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    crisis_budgets = [num_predict for crisis, num_predict in plans if crisis]
+    other_budgets = [num_predict for crisis, num_predict in plans if not crisis]
+    return {
+        "turns": len(latencies),
+        "turns_per_second": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_generated_tokens": round(sum(generated) / len(generated), 1) if generated else 0.0,
+        "mean_num_predict": round(sum(other_budgets) / len(other_budgets), 1) if other_budgets else 0.0,
+        "crisis_turns": len(crisis_budgets),
+        "min_crisis_num_predict": min(crisis_budgets) if crisis_budgets else None
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare tail latency of static and adaptive generation budgets")
+    parser.add_argument("--workers", type=int, default=12, help="Concurrent chat sessions")
+    parser.add_argument("--turns", type=int, default=72, help="Turns per run across all sessions")
+    parser.add_argument("--num-parallel", type=int, default=2, help="Serving slots of the fake server")
+    parser.add_argument("--tokens-per-second", type=float, default=600.0)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--slo", type=float, default=1.5, help="Latency objective for the adaptive budget (s)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with FakeOllamaServer(ttft=args.ttft, tokens_per_second=args.tokens_per_second, reply_sentences=32,
+                          num_parallel=args.num_parallel) as server:
+        # Same bounds for both runs; the static budget cannot go below its maximum
+        static = GenerationBudget(min_predict=500, max_predict=500, min_history=3, capacity=args.num_parallel)
+        adaptive = GenerationBudget(slo_seconds=args.slo, max_predict=500, capacity=args.num_parallel,
+                                    initial_rate=args.tokens_per_second)
+        results["static"] = run(server, static, args)
+        results["adaptive"] = run(server, adaptive, args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"📉 Generation budget under overload ({args.workers} sessions, {args.num_parallel} serving slots)")
+        print("=" * 78)
+        print(f"{'mode':<10}{'turns/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'num_predict':>13}"
+              f"{'tokens':>9}{'crisis num_predict':>20}")
+        for mode, result in results.items():
+            print(f"{mode:<10}{result['turns_per_second']:>9.2f}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+                  f"{result['p99_ms']:>10.1f}{result['mean_num_predict']:>13.1f}{result['mean_generated_tokens']:>9.1f}"
+                  f"{str(result['min_crisis_num_predict']):>20}")
+
+    # Crisis turns must keep the full budget however loaded the server is
+    if results["adaptive"]["min_crisis_num_predict"] != adaptive.max_predict:
+        print("\n❌ Crisis turns were given less than the full generation budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Microbenchmarks for the per-request hot paths that run before the model
+Covers detect_crisis_level, ChatService._detect_emotional_state,
+ChatService._choose_therapy_approach and TherapyPrompts.build_contextual_prompt
+over realistic message lengths, and the session summary and stats, which
+walk the whole conversation history, over history sizes. Reports ns/op,
+peak allocation per op (tracemalloc) and a fitted scaling exponent, so
+super-linear work shows up. The prompt builders only read a fixed window
+of history, so their history curves are checked for staying flat instead
+
+Usage (from the repository root):
+    python -m backend.benchmarks.hot_paths
+    python -m backend.benchmarks.hot_paths --json --output hot_paths.json
+"""
+
+import argparse
+import itertools
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from ..services.chat_service import ChatService
+from ..utils.therapy_prompts import EmotionalState, TherapyApproach, TherapyPrompts, detect_crisis_level
+
+FILLER_WORDS = (
+    "i have been feeling like the day just keeps going and my work and family "
+    "want more from me than i can give lately so i try to sleep but it does not help much"
+).split()
+
+SIGNAL_PHRASES = [
+    "anxious", "worried", "sad", "tired", "overwhelmed", "frustrated", "better",
+    "hopeless", "give up", "hurt myself", "too much"
+]
+
+MESSAGE_LENGTHS = [16, 64, 256, 1024, 4096]
+HISTORY_SIZES = [10, 50, 200, 1000, 5000]
+
+# Exponent of ns/op against input size above which a path is flagged as super-linear
+SUPERLINEAR_EXPONENT = 1.5
+# Paths meant to cost the same whatever the history size are flagged above this exponent
+CONSTANT_EXPONENT = 0.5
+
+
+def make_message(rng: random.Random, length: int, signal_rate: float = 0.05) -> str:
+    """
+    Build a message of roughly `length` characters, mostly filler with a few emotion/crisis phrases
+    """
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(SIGNAL_PHRASES) if rng.random() < signal_rate else rng.choice(FILLER_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+
+def sample_message_lengths(rng: random.Random, count: int) -> List[int]:
+    """
+    Chat message lengths are roughly log-normal: mostly a sentence or two, with a long tail
+    """
+    return [max(4, min(int(rng.lognormvariate(math.log(90), 1.0)), 6000)) for _ in range(count)]
+
+
+def measure(fn: Callable[[], object], min_time: float = 0.05, repeats: int = 5) -> Dict:
+    """
+    Time `fn` (best of `repeats`) and measure its peak allocation per call
+    """
+    number = 1
+    while True:
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter_ns() - started
+        if elapsed >= min_time * 1e9 or number >= 1 << 20:
+            break
+        number *= 2
+
+    best = elapsed
+    for _ in range(repeats - 1):
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        best = min(best, time.perf_counter_ns() - started)
+
+    tracemalloc.start()
+    try:
+        fn()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"ns_per_op": round(best / number, 1), "peak_bytes_per_op": peak - baseline, "loops": number}
+
+
+def scaling_exponent(points: List[Dict], size_key: str) -> Optional[float]:
+    """
+    Least-squares slope of log(ns/op) against log(size), ignoring size 0
+    """
+    usable = [(math.log(p[size_key]), math.log(p["ns_per_op"])) for p in points if p[size_key] > 0]
+    if len(usable) < 2:
+        return None
+    mean_x = sum(x for x, _ in usable) / len(usable)
+    mean_y = sum(y for _, y in usable) / len(usable)
+    denominator = sum((x - mean_x) ** 2 for x, _ in usable)
+    if denominator == 0:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in usable) / denominator, 3)
+
+
+def fake_history(rng: random.Random, size: int) -> List[Dict]:
+    return [
+        {"timestamp": datetime.now(), "user_message": make_message(rng, length),
+         "ai_response": make_message(rng, 300, signal_rate=0.0),
+         "emotional_state": rng.choice(list(EmotionalState)).value,
+         "therapy_approach": "cognitive_behavioral_therapy",
+         "crisis_level": "medium" if rng.random() < 0.05 else "none",
+         "llm_timings": {"prompt_tokens": 900, "generated_tokens": 120, "prompt_eval_ms": 300.0,
+                         "eval_ms": 2400.0, "load_ms": 0.0, "cold_load": False},
+         "model_tier": rng.choice(["small", "large"])}
+        for length in sample_message_lengths(rng, size)
+    ]
+
+
+def history_curve(rng: random.Random, service: ChatService, path: Callable[[], object], min_time: float,
+                  max_exponent: float) -> Dict:
+    curve = []
+    for size in HISTORY_SIZES:
+        service.conversation_history = fake_history(rng, size)
+        point = measure(path, min_time)
+        point["history_turns"] = size
+        curve.append(point)
+    return {"by_history_size": curve, "scaling_exponent": scaling_exponent(curve, "history_turns"),
+            "max_exponent": max_exponent}
+
+
+def run(seed: int = 0, min_time: float = 0.05) -> Dict:
+    rng = random.Random(seed)
+    service = ChatService()
+    prompts = TherapyPrompts()
+    results: Dict[str, Dict] = {}
+
+    message_paths = {
+        "detect_crisis_level": lambda m: detect_crisis_level(m),
+        "detect_emotional_state": lambda m: service._detect_emotional_state(m),
+        "choose_therapy_approach": lambda m: service._choose_therapy_approach(m, EmotionalState.ANXIOUS, False),
+        "build_contextual_prompt": lambda m: prompts.build_contextual_prompt(
+            base_context=f"User: {m}", emotional_state=EmotionalState.ANXIOUS,
+            therapy_approach=TherapyApproach.CBT, crisis_indicators=True)
+    }
+
+    for name, path in message_paths.items():
+        curve = []
+        for length in MESSAGE_LENGTHS:
+            message = make_message(rng, length)
+            point = measure(lambda: path(message), min_time)
+            point["message_chars"] = length
+            curve.append(point)
+
+        # Realistic mix: average cost over a sampled length distribution
+        corpus = [make_message(rng, length) for length in sample_message_lengths(rng, 256)]
+        iterator = itertools.cycle(corpus)
+        realistic = measure(lambda: path(next(iterator)), min_time)
+
+        results[name] = {
+            "by_message_length": curve,
+            "realistic_mix": realistic,
+            "scaling_exponent": scaling_exponent(curve, "message_chars"),
+            "max_exponent": SUPERLINEAR_EXPONENT
+        }
+
+    # Whole-history walks: these grow with the session and must stay linear
+    results["generate_session_summary"] = history_curve(
+        rng, service, service._generate_session_summary, min_time, SUPERLINEAR_EXPONENT)
+    results["get_session_stats"] = history_curve(
+        rng, service, service.get_session_stats, min_time, SUPERLINEAR_EXPONENT)
+
+    # The prompt reads the last few turns only, so a longer session must not make it slower
+    message = make_message(rng, 120)
+    results["build_therapeutic_prompt"] = history_curve(
+        rng, service, lambda: service._build_therapeutic_prompt(
+            message, EmotionalState.ANXIOUS, TherapyApproach.CBT, False), min_time, CONSTANT_EXPONENT)
+
+    flagged = [name for name, r in results.items()
+               if r["scaling_exponent"] is not None and r["scaling_exponent"] > r["max_exponent"]]
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": seed,
+        "results": results,
+        "superlinear": flagged
+    }
+
+
+def print_report(report: Dict) -> None:
+    print("⏱️  Hot path microbenchmarks")
+    print("=" * 72)
+    for name, result in report["results"].items():
+        exponent = result["scaling_exponent"]
+        print(f"\n{name} (scaling exponent: {exponent if exponent is not None else 'n/a'})")
+        curve = result.get("by_message_length") or result.get("by_history_size")
+        size_key = "message_chars" if "by_message_length" in result else "history_turns"
+        for point in curve:
+            print(f"  {size_key}={point[size_key]:<6} {point['ns_per_op']:>12,.0f} ns/op "
+                  f"{point['peak_bytes_per_op']:>10,} B peak")
+        if "realistic_mix" in result:
+            mix = result["realistic_mix"]
+            print(f"  realistic mix  {mix['ns_per_op']:>12,.0f} ns/op {mix['peak_bytes_per_op']:>10,} B peak")
+    if report["superlinear"]:
+        print(f"\n⚠️  Scaling above the expected exponent: {', '.join(report['superlinear'])}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmark detection and prompt-building hot paths")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per timing loop")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--output", help="Also write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args.seed, args.min_time)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 1 if report["superlinear"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
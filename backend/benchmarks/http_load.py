@@ -0,0 +1,266 @@
+"""
+HTTP load test for the FastAPI endpoints
+Drives /start_session/, /chat/, /assessment/ and /end_session/ with
+concurrent simulated sessions against the fake Ollama server, either
+in-process (ASGI transport) or over real sockets, and reports throughput
+and latency percentiles
+
+Usage (from the repository root):
+    python -m backend.benchmarks.http_load --mode both --sessions 50 --concurrency 10
+    python -m backend.benchmarks.http_load --mix crisis-heavy --save baseline.json
+    python -m backend.benchmarks.http_load --compare baseline.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from ..fake_ollama import FakeOllamaServer
+from ..models.llm_handler import OllamaClient
+
+MESSAGE_MIXES = {
+    "default": [
+        ("I'm feeling really anxious about my presentation tomorrow", 3),
+        ("I've been so tired and sad lately", 2),
+        ("I'm overwhelmed with everything at work", 2),
+        ("Things have been getting a little better this week", 2),
+        ("I just wanted to talk about my day", 3),
+        ("I'm so frustrated with my roommate", 1),
+        ("Everything feels hopeless and nothing matters", 1)
+    ],
+    "crisis-heavy": [
+        ("I want to end my life", 3),
+        ("I keep thinking about hurting myself", 2),
+        ("Everything feels hopeless and I want to give up", 3),
+        ("I'm feeling really anxious today", 1),
+        ("I just wanted to talk", 1)
+    ]
+}
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class LoadRecorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, endpoint: str, payload: Optional[Dict] = None) -> Optional[Dict]:
+        started = time.perf_counter()
+        try:
+            response = await client.post(endpoint, json=payload or {})
+            response.raise_for_status()
+            body = response.json()
+        except (httpx.HTTPError, ValueError):
+            self.errors[endpoint] += 1
+            body = None
+        self.latencies[endpoint].append(time.perf_counter() - started)
+        if body is not None and "error" in body:
+            self.errors[endpoint] += 1
+        return body
+
+    def report(self, elapsed: float) -> Dict:
+        endpoints = {}
+        all_latencies = []
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            all_latencies.extend(values)
+            endpoints[endpoint] = self._summary(values, self.errors[endpoint], elapsed)
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "overall": self._summary(sorted(all_latencies), sum(self.errors.values()), elapsed),
+            "endpoints": endpoints
+        }
+
+    @staticmethod
+    def _summary(values: List[float], errors: int, elapsed: float) -> Dict:
+        summary = {
+            "requests": len(values),
+            "errors": errors,
+            "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            "max_ms": round(values[-1] * 1000, 3) if values else 0.0
+        }
+        for pct in PERCENTILES:
+            summary[f"p{pct}_ms"] = round(percentile(values, pct) * 1000, 3)
+        return summary
+
+
+async def run_session(client: httpx.AsyncClient, recorder: LoadRecorder, session_index: int,
+                      messages_per_session: int, mix: str, rng: random.Random) -> None:
+    user_id = f"load-user-{session_index}"
+    messages, weights = zip(*MESSAGE_MIXES[mix])
+    await recorder.call(client, "/start_session/", {"user_id": user_id})
+    for message in rng.choices(messages, weights=weights, k=messages_per_session):
+        await recorder.call(client, "/chat/", {"message": message, "user_id": user_id})
+    await recorder.call(client, "/assessment/", {"type": rng.choice(["phq9", "gad7"]),
+                                                 "answers": [rng.randint(0, 3) for _ in range(9)]})
+    await recorder.call(client, "/end_session/")
+
+
+async def run_load(client: httpx.AsyncClient, args) -> Dict:
+    recorder = LoadRecorder()
+    rng = random.Random(args.seed)
+    pending = asyncio.Queue()
+    for index in range(args.sessions):
+        pending.put_nowait(index)
+
+    async def worker():
+        while not pending.empty():
+            index = pending.get_nowait()
+            await run_session(client, recorder, index, args.messages, args.mix, rng)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return recorder.report(time.perf_counter() - started)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_in_process(app, args) -> Dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        return await run_load(client, args)
+
+
+async def run_over_socket(base_url: str, args) -> Dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        return await run_load(client, args)
+
+
+def start_uvicorn(app) -> Tuple[str, object]:
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", server
+
+
+def compare(results: Dict, baseline: Dict, threshold: float, min_delta_ms: float = 1.0) -> List[str]:
+    """
+    List regressions beyond `threshold` (fractional) relative to a saved baseline
+
+    Latency changes smaller than `min_delta_ms` are ignored so sub-millisecond
+    endpoints do not flap on scheduler noise.
+    """
+    regressions = []
+    for mode, current in results["modes"].items():
+        previous = baseline.get("modes", {}).get(mode)
+        if not previous:
+            continue
+        for endpoint, stats in current["endpoints"].items():
+            before = previous["endpoints"].get(endpoint)
+            if not before:
+                continue
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                if stats[key] > before[key] * (1 + threshold) and stats[key] - before[key] > min_delta_ms:
+                    regressions.append(f"{mode} {endpoint} {key}: {before[key]:.1f} -> {stats[key]:.1f}")
+            if before["throughput_rps"] > 0 and stats["throughput_rps"] < before["throughput_rps"] * (1 - threshold):
+                regressions.append(f"{mode} {endpoint} throughput_rps: "
+                                   f"{before['throughput_rps']:.1f} -> {stats['throughput_rps']:.1f}")
+            if stats["errors"] > before["errors"]:
+                regressions.append(f"{mode} {endpoint} errors: {before['errors']} -> {stats['errors']}")
+    return regressions
+
+
+def print_report(results: Dict) -> None:
+    print("🌐 HTTP load test")
+    print("=" * 78)
+    print(f"sessions={results['config']['sessions']} messages={results['config']['messages']} "
+          f"concurrency={results['config']['concurrency']} mix={results['config']['mix']}")
+    for mode, report in results["modes"].items():
+        print(f"\n[{mode}] {report['elapsed_seconds']:.2f}s, {report['overall']['throughput_rps']:.1f} req/s")
+        print(f"{'endpoint':<16}{'reqs':>7}{'err':>5}{'rps':>9}" + "".join(f"{f'p{p}':>9}" for p in PERCENTILES) + f"{'max':>9}")
+        for endpoint, stats in report["endpoints"].items():
+            print(f"{endpoint:<16}{stats['requests']:>7}{stats['errors']:>5}{stats['throughput_rps']:>9.1f}"
+                  + "".join(f"{stats[f'p{p}_ms']:>9.1f}" for p in PERCENTILES) + f"{stats['max_ms']:>9.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the FastAPI endpoints against a stub LLM")
+    parser.add_argument("--mode", choices=["inprocess", "socket", "both"], default="both")
+    parser.add_argument("--target", help="Benchmark an already running server at this URL instead")
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--messages", type=int, default=4, help="Chat messages per session")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", choices=sorted(MESSAGE_MIXES), default="default")
+    parser.add_argument("--ttft", type=float, default=0.02, help="Stub LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", help="Compare against a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed fractional regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore latency changes below this")
+    args = parser.parse_args(argv)
+
+    # Per-request client and server logging would dominate the output
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    results = {"config": {k: getattr(args, k) for k in ("sessions", "messages", "concurrency", "mix",
+                                                          "ttft", "tokens_per_second", "seed")},
+               "modes": {}}
+
+    if args.target:
+        results["modes"]["external"] = asyncio.run(run_over_socket(args.target, args))
+    else:
+        from .. import app as app_module
+
+        with FakeOllamaServer(ttft=args.ttft, tokens_per_second=args.tokens_per_second) as fake:
+            app_module.chat_service.llm_client = OllamaClient(fake.url, pool_size=args.concurrency)
+            if args.mode in ("inprocess", "both"):
+                results["modes"]["inprocess"] = asyncio.run(run_in_process(app_module.app, args))
+            if args.mode in ("socket", "both"):
+                base_url, server = start_uvicorn(app_module.app)
+                try:
+                    results["modes"]["socket"] = asyncio.run(run_over_socket(base_url, args))
+                finally:
+                    server.should_exit = True
+
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Import-time budget and cold-start benchmark for the API module
+Runs `python -X importtime -c "import backend.app"` in fresh interpreters,
+reports the slowest modules, fails when the backend's own import cost
+(everything except the web framework) exceeds its budget or a heavy
+subsystem is imported eagerly, and times cold start to the first served
+requests for autoscaled replicas
+
+Usage (from the repository root):
+    python -m backend.benchmarks.import_time
+    python -m backend.benchmarks.import_time --budget-ms 60 --runs 7 --json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Framework imports the app cannot avoid, loaded first so the budget only covers the backend. Registering a
+# route with query and header parameters also loads what FastAPI imports lazily on the first route
+# (pydantic.v1 for its compatibility checks, about 30 ms), which any app with parameters pays
+FRAMEWORK_PRELOAD = (
+    "import fastapi, fastapi.middleware.cors, fastapi.responses\n"
+    "from typing import Optional\n"
+    "_app = fastapi.FastAPI()\n"
+    "@_app.get('/')\n"
+    "def _route(q: int = 0, h: Optional[str] = fastapi.Header(None)):\n"
+    "    return {}\n"
+)
+
+# Subsystems that must only load on first use
+LAZY_MODULES = [
+    "requests",
+    "numpy",
+    "backend.services.chat_service",
+    "backend.services.assessment_service",
+    "backend.services.voice_service",
+    "backend.utils.therapy_prompts",
+    "cProfile"
+]
+
+COLD_START_SCRIPT = """
+import asyncio, json, time
+started = time.perf_counter()
+import backend.app as app_module
+imported = time.perf_counter()
+import httpx
+
+async def first_requests():
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        marks = []
+        for method, path, body in (("GET", "/", None), ("POST", "/start_session/", {"user_id": "cold"})):
+            begin = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            response.raise_for_status()
+            marks.append(time.perf_counter() - begin)
+        return marks
+
+root_request, first_session = asyncio.run(first_requests())
+print(json.dumps({"import_ms": (imported - started) * 1000, "first_request_ms": root_request * 1000,
+                  "first_session_ms": first_session * 1000}))
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, Dict[str, int]]:
+    """
+    Map module name to its self and cumulative import time in microseconds
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = {"self_us": int(self_us), "cumulative_us": int(cumulative_us)}
+    return modules
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    env = dict(os.environ, MODEL_WARMUP="0", PYTHONDONTWRITEBYTECODE="1")
+    return subprocess.run([sys.executable, *args], cwd=REPO_ROOT, env=env, capture_output=True,
+                          text=True, check=True)
+
+
+def measure_import(runs: int) -> Dict:
+    totals, backend = [], []
+    for _ in range(runs):
+        modules = parse_importtime(_run(["-X", "importtime", "-c", "import backend.app"]).stderr)
+        totals.append(modules["backend.app"]["cumulative_us"])
+        preloaded = parse_importtime(_run(["-X", "importtime", "-c",
+                                           f"{FRAMEWORK_PRELOAD}import backend.app"]).stderr)
+        backend.append(preloaded["backend.app"]["cumulative_us"])
+
+    total_ms = statistics.median(totals) / 1000
+    backend_ms = statistics.median(backend) / 1000
+    slowest = sorted(modules.items(), key=lambda item: -item[1]["self_us"])[:15]
+    return {
+        "total_ms": round(total_ms, 1),
+        "framework_ms": round(total_ms - backend_ms, 1),
+        "backend_ms": round(backend_ms, 1),
+        "eager_heavy_modules": [name for name in LAZY_MODULES if name in modules],
+        "slowest_modules": [{"module": name, "self_ms": round(t["self_us"] / 1000, 2),
+                             "cumulative_ms": round(t["cumulative_us"] / 1000, 2)} for name, t in slowest]
+    }
+
+
+def measure_cold_start(runs: int) -> Dict:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = json.loads(_run(["-c", COLD_START_SCRIPT]).stdout.strip().splitlines()[-1])
+        result["process_ms"] = (time.perf_counter() - started) * 1000
+        samples.append(result)
+    return {key: round(statistics.median(s[key] for s in samples), 1) for key in samples[0]}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check the API import-time budget and cold start")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="Allowed import time of backend.app excluding the web framework")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    report = {"import": measure_import(args.runs), "cold_start": measure_cold_start(args.runs),
+              "budget_ms": args.budget_ms}
+    over_budget = report["import"]["backend_ms"] > args.budget_ms
+    eager = report["import"]["eager_heavy_modules"]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        imports = report["import"]
+        print("🚀 API import time and cold start")
+        print("=" * 60)
+        print(f"import backend.app   {imports['total_ms']:>8.1f} ms (framework {imports['framework_ms']:.1f} ms, "
+              f"backend {imports['backend_ms']:.1f} ms, budget {args.budget_ms:.0f} ms)")
+        for key, value in report["cold_start"].items():
+            print(f"{key:<20} {value:>8.1f} ms")
+        print("\nSlowest modules by self time:")
+        for entry in imports["slowest_modules"][:10]:
+            print(f"  {entry['module']:<45} {entry['self_ms']:>7.2f} ms")
+
+    # Failures go to stderr, so --json output stays parseable
+    if over_budget:
+        print(f"\n❌ backend import time {report['import']['backend_ms']:.1f} ms exceeds {args.budget_ms:.0f} ms",
+              file=sys.stderr)
+    if eager:
+        print(f"\n❌ Imported eagerly, should load on first use: {', '.join(eager)}", file=sys.stderr)
+    return 1 if over_budget or eager else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Token cost of each prompt section, and what the compact profile saves
+Builds the contextual prompt for every (EmotionalState, TherapyApproach,
+crisis) combination in each prompt profile and estimates the tokens of
+every section (system, crisis banner, emotional context, session history,
+conversation, approach guidance, closing instruction). With --measure it
+also sends the prompts to the fake Ollama server, whose prompt evaluation
+time grows with prompt length, and with --ollama-url to a real server, and
+reports the prompt tokens and prompt-eval time each profile costs. Real
+servers reuse a cached prompt prefix; --no-prefix-cache puts a unique line
+first so every prompt is evaluated in full
+
+Usage (from the repository root):
+    python -m backend.benchmarks.prompt_tokens
+    python -m backend.benchmarks.prompt_tokens --matrix
+    python -m backend.benchmarks.prompt_tokens --measure --ollama-url http://localhost:11434 --json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from ..fake_ollama import FakeOllamaServer
+from ..models.llm_handler import OllamaClient
+from ..utils.therapy_prompts import PROMPT_PROFILES, EmotionalState, TherapyApproach, TherapyPrompts
+from ..utils.token_utils import BYTES_PER_TOKEN, estimate_tokens
+from .http_load import percentile
+
+SECTIONS = ["system", "crisis_banner", "emotional_context", "session_history", "conversation",
+            "approach_guidance", "closing_instruction"]
+
+# A typical mid-session turn: three earlier exchanges and one recalled memory
+CONTEXT = ("User: I've been really stressed about work lately\n"
+           "Alex: That sounds exhausting. What part of work weighs on you most?\n\n"
+           "User: The deadlines, I never feel like I'm doing enough\n"
+           "Alex: It sounds like you hold yourself to a very high standard.\n\n"
+           "User: Yeah, my manager keeps adding more\n"
+           "Alex: That's a lot to carry. How have you been sleeping?\n\n"
+           "User: Not well, I keep waking up at 3am thinking about it")
+MEMORIES = ["Session on 2024-05-01: Session focused on anxious experiences. Total of 6 exchanges occurred."]
+
+
+def combinations() -> List[Tuple[EmotionalState, TherapyApproach, bool]]:
+    return list(itertools.product(EmotionalState, TherapyApproach, (False, True)))
+
+
+def account(profile: str) -> Dict:
+    prompts = TherapyPrompts(profile=profile)
+    rows = []
+    for emotional_state, therapy_approach, crisis in combinations():
+        sections = prompts.build_prompt_sections(CONTEXT, emotional_state, therapy_approach, MEMORIES, crisis)
+        tokens = {name: estimate_tokens(text) for name, text in sections}
+        rows.append({"emotional_state": emotional_state.value, "therapy_approach": therapy_approach.value,
+                     "crisis": crisis, "sections": tokens, "total": sum(tokens.values())})
+    summary = {}
+    for section in SECTIONS:
+        costs = [row["sections"][section] for row in rows if section in row["sections"]]
+        if costs:
+            summary[section] = {"mean": round(sum(costs) / len(costs), 1), "min": min(costs), "max": max(costs)}
+    totals = [row["total"] for row in rows]
+    summary["total"] = {"mean": round(sum(totals) / len(totals), 1), "min": min(totals), "max": max(totals)}
+    return {"sections": summary, "combinations": rows}
+
+
+def measure(url: str, model: str, profile: str, requests: int, no_prefix_cache: bool) -> Dict:
+    client = OllamaClient(url)
+    prompts = TherapyPrompts(profile=profile)
+    counts, prompt_ms = [], []
+    for emotional_state, therapy_approach, crisis in itertools.islice(itertools.cycle(combinations()), requests):
+        prompt = prompts.build_contextual_prompt(CONTEXT, emotional_state, therapy_approach, MEMORIES, crisis)
+        if no_prefix_cache:
+            prompt = f"[{os.urandom(6).hex()}]\n{prompt}"
+        result = client.generate(model, prompt, options={"num_predict": 1, "temperature": 0})
+        counts.append(result.get("prompt_eval_count", 0))
+        prompt_ms.append(result.get("prompt_eval_duration", 0) / 1e6)
+    prompt_ms.sort()
+    return {
+        "mean_prompt_tokens": round(sum(counts) / len(counts), 1),
+        "mean_prompt_eval_ms": round(sum(prompt_ms) / len(prompt_ms), 1),
+        "p95_prompt_eval_ms": round(percentile(prompt_ms, 95), 1)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Token cost per prompt section for every prompt profile")
+    parser.add_argument("--matrix", action="store_true", help="Print every combination, not only the summary")
+    parser.add_argument("--measure", action="store_true", help="Measure prompt evaluation on the fake server")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=1000.0,
+                        help="Prompt evaluation rate of the fake server")
+    parser.add_argument("--ollama-url", default="", help="Also measure against this Ollama server")
+    parser.add_argument("--model", default="llama3.1:8b-instruct-q4_0")
+    parser.add_argument("--requests", type=int, default=12, help="Prompts sent per profile and backend")
+    parser.add_argument("--no-prefix-cache", action="store_true", help="Defeat prompt prefix reuse on real servers")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    report: Dict = {"accounting": {profile: account(profile) for profile in PROMPT_PROFILES}}
+    if args.measure or args.ollama_url:
+        report["latency"] = {}
+        with FakeOllamaServer(ttft=0.0, prompt_tokens_per_second=args.prompt_tokens_per_second) as server:
+            report["latency"]["stub"] = {profile: measure(server.url, args.model, profile, args.requests, False)
+                                         for profile in PROMPT_PROFILES}
+        if args.ollama_url:
+            report["latency"]["ollama"] = {
+                profile: measure(args.ollama_url, args.model, profile, args.requests, args.no_prefix_cache)
+                for profile in PROMPT_PROFILES}
+
+    if args.json:
+        if not args.matrix:
+            for accounting in report["accounting"].values():
+                del accounting["combinations"]
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"🧮 Prompt tokens per section ({len(combinations())} emotion x approach x crisis combinations, "
+          f"estimated at {BYTES_PER_TOKEN} bytes per token)")
+    print("=" * 78)
+    print(f"{'section':<22}" + "".join(f"{profile + ' mean':>14}{'min-max':>11}" for profile in PROMPT_PROFILES))
+    for section in SECTIONS + ["total"]:
+        line = f"{section:<22}"
+        for profile in PROMPT_PROFILES:
+            cost = report["accounting"][profile]["sections"].get(section)
+            line += f"{cost['mean']:>14.1f}{cost['min']:>6}-{cost['max']:<4}" if cost else f"{'-':>14}{'':>11}"
+        print(line)
+
+    if args.matrix:
+        for profile in PROMPT_PROFILES:
+            print(f"\n{profile}")
+            print(f"{'emotional_state':<14}{'therapy_approach':<30}{'crisis':<8}"
+                  + "".join(f"{section[:10]:>11}" for section in SECTIONS) + f"{'total':>8}")
+            for row in report["accounting"][profile]["combinations"]:
+                print(f"{row['emotional_state']:<14}{row['therapy_approach']:<30}{str(row['crisis']):<8}"
+                      + "".join(f"{row['sections'].get(section, 0):>11}" for section in SECTIONS)
+                      + f"{row['total']:>8}")
+
+    for backend, results in report.get("latency", {}).items():
+        print(f"\n⏱️  Prompt evaluation, {backend}")
+        print(f"{'profile':<10}{'prompt tokens':>15}{'mean ms':>10}{'p95 ms':>10}")
+        for profile, result in results.items():
+            print(f"{profile:<10}{result['mean_prompt_tokens']:>15.1f}{result['mean_prompt_eval_ms']:>10.1f}"
+                  f"{result['p95_prompt_eval_ms']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Ingest and group-by speed of the columnar session analytics store
+Times SessionAnalytics.record_turn on synthetic conversation entries, then
+bulk-writes millions of synthetic turns spread over many day partitions in
+the store's on-disk format and times typical reporting queries over them:
+emotion mix, crisis frequency per day, approach mix with latency, and
+distinct sessions with a crisis filter
+
+Usage (from the repository root):
+    python -m backend.benchmarks.session_analytics
+    python -m backend.benchmarks.session_analytics --turns 5000000 --days 90 --json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..services.session_analytics import TABLES, SECONDS_PER_DAY, SessionAnalytics, _column_file
+
+QUERIES = {
+    "emotion_mix": dict(group_by=["emotional_state"]),
+    "crisis_per_day": dict(group_by=["day", "crisis_level"]),
+    "approach_latency": dict(group_by=["therapy_approach"], aggregates=["llm_ms:mean", "llm_ms:max"]),
+    "crisis_sessions_per_day": dict(group_by=["day"], aggregates=["session:distinct"],
+                                    where={"crisis_level": ["medium", "high"]}),
+}
+
+
+def time_ingest(directory: str, rows: int, rng: np.random.Generator) -> float:
+    analytics = SessionAnalytics(directory)
+    emotions = analytics.dictionaries["emotional_state"]
+    approaches = analytics.dictionaries["therapy_approach"]
+    now = datetime.now()
+    entries = [{
+        "timestamp": now,
+        "emotional_state": emotions[i % len(emotions)],
+        "therapy_approach": approaches[i % len(approaches)],
+        "crisis_level": "none",
+        "llm_timings": {"total_ms": 850.0, "prompt_tokens": 900, "generated_tokens": 120},
+        "model_tier": "large"
+    } for i in range(rows)]
+    started = time.perf_counter()
+    for i, entry in enumerate(entries):
+        analytics.record_turn(f"session-{i // 8}", entry)
+    analytics.flush()
+    return time.perf_counter() - started
+
+
+def bulk_write(directory: str, turns: int, days: int, rng: np.random.Generator) -> None:
+    # Same files SessionAnalytics writes, generated directly so millions of rows take seconds
+    SessionAnalytics(directory)
+    first_day = int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()) // SECONDS_PER_DAY
+    per_day = turns // days
+    schema = TABLES["turns"]
+    for day in range(first_day, first_day + days):
+        columns = {
+            "ts": np.sort(day * SECONDS_PER_DAY + rng.uniform(0, SECONDS_PER_DAY, per_day)),
+            "session": rng.integers(0, per_day // 8 + 1, per_day) + day * per_day,
+            "emotional_state": rng.choice(7, per_day, p=[0.4, 0.2, 0.15, 0.08, 0.1, 0.05, 0.02]),
+            "therapy_approach": rng.integers(0, 6, per_day),
+            "crisis_level": rng.choice(3, per_day, p=[0.96, 0.03, 0.01]),
+            "model_tier": rng.integers(1, 3, per_day),
+            "degraded": rng.random(per_day) < 0.01,
+            "llm_ms": rng.gamma(4.0, 250.0, per_day),
+            "prompt_tokens": rng.integers(400, 2000, per_day),
+            "generated_tokens": rng.integers(40, 500, per_day),
+        }
+        partition = os.path.join(directory, "turns", "day=" + datetime.fromtimestamp(
+            day * SECONDS_PER_DAY, tz=timezone.utc).strftime("%Y-%m-%d"))
+        os.makedirs(partition, exist_ok=True)
+        for column, dtype in schema.items():
+            np.asarray(columns[column], dtype=dtype).tofile(_column_file(partition, column, dtype))
+
+
+def directory_bytes(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the columnar session analytics store")
+    parser.add_argument("--turns", type=int, default=2_000_000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--ingest", type=int, default=100_000, help="Turns recorded through record_turn")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    report: Dict = {}
+    with tempfile.TemporaryDirectory() as directory:
+        ingest_seconds = time_ingest(os.path.join(directory, "ingest"), args.ingest, rng)
+        report["ingest_us_per_turn"] = round(ingest_seconds / args.ingest * 1e6, 2)
+
+        store = os.path.join(directory, "store")
+        bulk_write(store, args.turns, args.days, rng)
+        turns = args.turns // args.days * args.days
+        report["turns"] = turns
+        report["bytes_per_turn"] = round(directory_bytes(store) / turns, 1)
+
+        analytics = SessionAnalytics(store)
+        for name, query in QUERIES.items():
+            started = time.perf_counter()
+            rows = analytics.query("turns", **query)
+            elapsed = time.perf_counter() - started
+            report[f"{name}_seconds"] = round(elapsed, 3)
+            report[f"{name}_groups"] = len(rows)
+        slowest = max(report[f"{name}_seconds"] for name in QUERIES)
+        report["slowest_query_million_turns_per_second"] = round(turns / slowest / 1e6, 1)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"📊 Session analytics ({turns} turns over {args.days} days)")
+        print("=" * 60)
+        for key, value in report.items():
+            print(f"{key:<40} {value:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
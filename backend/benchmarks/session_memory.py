@@ -0,0 +1,112 @@
+"""
+Build, query and memory cost of the session memory index
+Fills a SessionMemoryIndex with synthetic session summaries and turns for
+many users, then times per-turn retrieval (embedding plus top-k scoring)
+and reports memory per user. With --persist the index is written to a
+temporary directory and reopened to time a cold start from the memory map
+
+Usage (from the repository root):
+    python -m backend.benchmarks.session_memory
+    python -m backend.benchmarks.session_memory --users 5000 --memories 80 --persist --json
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from ..services.session_memory import SessionMemoryIndex
+from .http_load import percentile
+
+FEELINGS = ["anxious", "depressed", "angry", "overwhelmed", "hopeful", "neutral"]
+TOPICS = ["exams", "work deadlines", "my sister", "sleep", "money", "my breakup", "the gym", "moving house",
+          "my manager", "panic attacks", "loneliness", "my diagnosis", "friends", "my dad", "presentations"]
+DETAILS = ["keeps getting worse", "felt a bit easier this week", "kept me up all night", "came up again",
+           "I tried the breathing exercise", "I couldn't stop thinking about it", "I talked to someone about it"]
+
+
+def synthetic_memory(rng: random.Random) -> str:
+    return f"User felt {rng.choice(FEELINGS)}: {rng.choice(TOPICS)} {rng.choice(DETAILS)}"
+
+
+def build(index: SessionMemoryIndex, users: int, memories: int, rng: random.Random) -> float:
+    started = time.perf_counter()
+    for user in range(users):
+        for i in range(memories):
+            kind = "summary" if i % 10 == 0 else "turn"
+            index.add(f"user-{user}", synthetic_memory(rng), kind=kind)
+    index.flush()
+    return time.perf_counter() - started
+
+
+def time_queries(index: SessionMemoryIndex, users: int, queries: int, k: int, rng: random.Random) -> Dict:
+    samples: List[float] = []
+    embed_samples: List[float] = []
+    for _ in range(queries):
+        text = f"{rng.choice(TOPICS)} {rng.choice(DETAILS)}"
+        user = f"user-{rng.randrange(users)}"
+        started = time.perf_counter()
+        index.embedder.embed(text)
+        embedded = time.perf_counter()
+        index.query(user, text, k=k)  # embeds again, so this is the full per-turn cost
+        samples.append(time.perf_counter() - embedded)
+        embed_samples.append(embedded - started)
+    samples.sort()
+    embed_samples.sort()
+    return {
+        "query_p50_us": round(percentile(samples, 50) * 1e6, 1),
+        "query_p99_us": round(percentile(samples, 99) * 1e6, 1),
+        "embed_p50_us": round(percentile(embed_samples, 50) * 1e6, 1)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the session memory index")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--memories", type=int, default=60, help="Memories per user")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--persist", action="store_true", help="Memory-map the index from a temporary directory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        index = SessionMemoryIndex(directory=directory if args.persist else "", dim=args.dim)
+        build_seconds = build(index, args.users, args.memories, rng)
+        total = args.users * args.memories
+        record_bytes = sum(len(json.dumps(record)) for record in index._records)
+        report = {
+            "memories": total,
+            "build_seconds": round(build_seconds, 3),
+            "build_us_per_memory": round(build_seconds / total * 1e6, 1),
+            **time_queries(index, args.users, args.queries, args.k, rng),
+            "vector_bytes_per_user": args.memories * args.dim * 4,
+            "record_bytes_per_user": round(record_bytes / args.users),
+        }
+        if args.persist:
+            started = time.perf_counter()
+            reopened = SessionMemoryIndex(directory=directory, dim=args.dim)
+            report["reopen_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            first = time.perf_counter()
+            reopened.query("user-0", "exams keep getting worse", k=args.k)
+            report["first_query_after_reopen_us"] = round((time.perf_counter() - first) * 1e6, 1)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"🧠 Session memory index ({args.users} users x {args.memories} memories, dim {args.dim}, "
+              f"{'memory-mapped' if args.persist else 'in memory'})")
+        print("=" * 60)
+        for key, value in report.items():
+            print(f"{key:<30} {value:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
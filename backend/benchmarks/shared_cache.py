@@ -0,0 +1,146 @@
+"""
+Per-worker memory and hit rates: in-process caches vs the shared cache
+Starts N worker processes that each serve a Zipf-distributed stream of
+cache lookups (think live TTS clips or replayed chat results), filling the
+cache on every miss. With --mode process each worker keeps its own LRU, the
+way every uvicorn worker does today; with --mode shared all of them use one
+SharedLRU file of the same capacity. Reports the aggregate and per-worker
+hit rates, microseconds per lookup, and each worker's RSS and PSS growth
+over the run (PSS splits shared pages between the processes mapping them,
+so its sum is the real memory cost on the host)
+
+Usage (from the repository root):
+    python -m backend.benchmarks.shared_cache
+    python -m backend.benchmarks.shared_cache --workers 8 --value-bytes 65536 --json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..services.shared_cache import SharedLRU
+
+MODES = ["process", "shared"]
+
+
+def memory_kb() -> Dict[str, int]:
+    # RSS counts every resident page; PSS charges shared pages 1/N to each of the N mappers
+    usage = {"rss": 0, "pss": 0}
+    for path, field, name in (("/proc/self/status", "VmRSS:", "rss"), ("/proc/self/smaps_rollup", "Pss:", "pss")):
+        try:
+            with open(path) as handle:
+                for line in handle:
+                    if line.startswith(field):
+                        usage[name] = int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return usage
+
+
+def worker(mode: str, path: str, args: Dict, seed: int, start, results) -> None:
+    rng = np.random.default_rng(seed)
+    keys = [f"key-{k}" for k in (rng.zipf(args["zipf"], args["requests"]) - 1) % args["keys"]]
+    shared = SharedLRU(path, capacity_bytes=args["capacity"] * (args["value_bytes"] + 64),
+                       slot_bytes=args["value_bytes"]) if mode == "shared" else None
+    local: "OrderedDict[str, bytes]" = OrderedDict()
+    before = memory_kb()
+    start.wait()
+    hits = 0
+    started = time.perf_counter()
+    for key in keys:
+        if shared is not None:
+            value = shared.get(key)
+        else:
+            value = local.get(key)
+            if value is not None:
+                local.move_to_end(key)
+        if value is not None:
+            hits += 1
+            continue
+        # The miss path: produce the value (real synthesis or generation would go here) and cache it
+        value = key.encode("utf-8").ljust(args["value_bytes"], b"\x01")
+        if shared is not None:
+            shared.put(key, value)
+        else:
+            local[key] = value
+            if len(local) > args["capacity"]:
+                local.popitem(last=False)
+    elapsed = time.perf_counter() - started
+    after = memory_kb()
+    results.put({"hits": hits, "lookups": len(keys), "seconds": elapsed,
+                 "rss_growth_kb": after["rss"] - before["rss"], "pss_growth_kb": after["pss"] - before["pss"],
+                 "rss_kb": after["rss"], "pss_kb": after["pss"]})
+    # Stay mapped until every worker has measured, so PSS splits the shared pages between all of them
+    start.wait()
+
+
+def run(mode: str, directory: str, args: Dict) -> Dict:
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(args["workers"] + 1)
+    results = context.Queue()
+    path = os.path.join(directory, f"{mode}.lru")
+    processes = [context.Process(target=worker, args=(mode, path, args, seed, start, results))
+                 for seed in range(args["workers"])]
+    for process in processes:
+        process.start()
+    start.wait()
+    workers = [results.get() for _ in processes]
+    start.wait()
+    for process in processes:
+        process.join()
+    hits, lookups = sum(w["hits"] for w in workers), sum(w["lookups"] for w in workers)
+    return {
+        "hit_rate": round(hits / lookups, 3),
+        "worker_hit_rates": [round(w["hits"] / w["lookups"], 3) for w in workers],
+        "us_per_lookup": round(sum(w["seconds"] for w in workers) / lookups * 1e6, 2),
+        "mean_worker_rss_growth_mb": round(sum(w["rss_growth_kb"] for w in workers) / len(workers) / 1024, 1),
+        "mean_worker_pss_growth_mb": round(sum(w["pss_growth_kb"] for w in workers) / len(workers) / 1024, 1),
+        "total_pss_growth_mb": round(sum(w["pss_growth_kb"] for w in workers) / 1024, 1),
+        "mean_worker_rss_mb": round(sum(w["rss_kb"] for w in workers) / len(workers) / 1024, 1),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare per-worker caches with the cross-worker shared cache")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=20000, help="Lookups per worker")
+    parser.add_argument("--keys", type=int, default=20000, help="Distinct keys in the workload")
+    parser.add_argument("--capacity", type=int, default=2000, help="Entries each cache holds")
+    parser.add_argument("--value-bytes", type=int, default=16384)
+    parser.add_argument("--zipf", type=float, default=1.2, help="Zipf exponent of key popularity")
+    parser.add_argument("--mode", choices=MODES, action="append", help="Modes to run (default: all)")
+    parser.add_argument("--dir", default="/dev/shm" if os.path.isdir("/dev/shm") else "",
+                        help="Where the shared cache file lives")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    settings = {name: getattr(args, name) for name in ("workers", "requests", "keys", "capacity", "value_bytes",
+                                                       "zipf")}
+    with tempfile.TemporaryDirectory(dir=args.dir or None) as directory:
+        report = {mode: run(mode, directory, settings) for mode in args.mode or MODES}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"🧠 Cache memory and hit rates ({args.workers} workers, {args.requests} lookups each, "
+          f"{args.capacity} x {args.value_bytes} B capacity)")
+    print("=" * 78)
+    for mode, result in report.items():
+        print(f"\n{mode}")
+        for key, value in result.items():
+            print(f"  {key:<28} {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+End-to-end time-to-first-audio benchmark for the voice reply path
+Compares "generate the whole reply, then synthesize it" with the
+sentence-pipelined SpeechPipeline, using local stub LLM and TTS engines
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Dict, Iterator, List
+
+from ..services.speech_pipeline import SpeechPipeline
+
+SAMPLE_REPLY = (
+    "It sounds like you've been carrying a lot on your own lately. "
+    "Feeling anxious before a big presentation is very common, and it doesn't mean you'll do badly. "
+    "Let's slow down for a moment and look at what is worrying you most. "
+    "When you picture the presentation, what is the first thing that comes to mind? "
+    "We can work through it one step at a time."
+)
+
+
+def stub_llm(reply: str, ttft: float, tokens_per_second: float) -> Iterator[str]:
+    """Yield the reply word by word at a fixed generation rate"""
+    time.sleep(ttft)
+    for i, word in enumerate(reply.split(" ")):
+        if i:
+            time.sleep(1.0 / tokens_per_second)
+        yield word if i == 0 else " " + word
+
+
+def stub_tts(seconds_per_char: float, overhead: float):
+    """TTS engine whose cost grows with text length"""
+    def synthesize(text: str) -> bytes:
+        time.sleep(overhead + seconds_per_char * len(text))
+        return text.encode("utf-8")
+    return synthesize
+
+
+def run_sequential(args) -> Dict:
+    tts = stub_tts(args.tts_seconds_per_char, args.tts_overhead)
+    start = time.perf_counter()
+    reply = "".join(stub_llm(SAMPLE_REPLY, args.ttft, args.tokens_per_second))
+    tts(reply)
+    elapsed = time.perf_counter() - start
+    return {"time_to_first_audio": elapsed, "total": elapsed}
+
+
+def run_pipelined(args, pipeline: SpeechPipeline) -> Dict:
+    start = time.perf_counter()
+    first_audio = None
+    for _chunk in pipeline.stream(stub_llm(SAMPLE_REPLY, args.ttft, args.tokens_per_second)):
+        if first_audio is None:
+            first_audio = time.perf_counter() - start
+    return {"time_to_first_audio": first_audio, "total": time.perf_counter() - start}
+
+
+def summarize(samples: List[Dict]) -> Dict:
+    return {
+        key: {
+            "median_ms": statistics.median(s[key] for s in samples) * 1000,
+            "max_ms": max(s[key] for s in samples) * 1000
+        }
+        for key in ("time_to_first_audio", "total")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ttft", type=float, default=0.3, help="Stub LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--tts-seconds-per-char", type=float, default=0.0008)
+    parser.add_argument("--tts-overhead", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    pipeline = SpeechPipeline(stub_tts(args.tts_seconds_per_char, args.tts_overhead), max_workers=args.workers)
+    sequential = summarize([run_sequential(args) for _ in range(args.runs)])
+    pipelined = summarize([run_pipelined(args, pipeline) for _ in range(args.runs)])
+    pipeline.shutdown()
+
+    first_sentence = SAMPLE_REPLY.split(". ")[0] + "."
+    expected = (args.ttft + len(first_sentence.split(" ")) / args.tokens_per_second
+                + args.tts_overhead + args.tts_seconds_per_char * len(first_sentence)) * 1000
+
+    results = {"sequential": sequential, "pipelined": pipelined, "expected_first_audio_ms": expected}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("🔊 Voice reply latency (stub engines)")
+    print("=" * 50)
+    for name in ("sequential", "pipelined"):
+        r = results[name]
+        print(f"{name:>10}: first audio {r['time_to_first_audio']['median_ms']:7.1f} ms, "
+              f"total {r['total']['median_ms']:7.1f} ms")
+    print(f"First sentence + one synthesis ≈ {expected:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
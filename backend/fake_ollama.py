@@ -0,0 +1,311 @@
+"""
+Deterministic local stand-in for the Ollama server
+Implements /api/generate, /api/chat and /api/tags (streaming and
+non-streaming, plus the /api/show lookup the ollama CLI makes) with configurable time-to-first-token, tokens/sec, cold model
+loads, and error/stall injection, so service-layer latency and throughput
+can be measured without a model
+
+Usage (from the repository root):
+    python -m backend.fake_ollama --port 11435 --ttft 0.2 --tokens-per-second 30
+    OLLAMA_HOST=127.0.0.1:11435 uvicorn backend.app:app
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from .utils.durations import parse_duration
+
+DEFAULT_MODELS = ["llama3.1:8b-instruct-q4_0", "llama3.2:3b-instruct-q4_0"]
+
+REPLY_SENTENCES = [
+    "I hear how much you're carrying right now.",
+    "That sounds really difficult, and it makes sense that you feel this way.",
+    "Can you tell me more about what has been on your mind?",
+    "Let's take this one step at a time together.",
+    "What has helped you get through hard moments like this before?",
+    "You're not alone in this, and I'm glad you reached out.",
+    "When you notice that feeling, what thoughts come up for you?",
+    "It might help to take a slow breath with me before we go on."
+]
+
+
+def deterministic_reply(prompt: str, sentences: int = 3) -> str:
+    """
+    Pick reply sentences from a hash of the prompt, so equal prompts get equal replies
+    """
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return " ".join(REPLY_SENTENCES[b % len(REPLY_SENTENCES)] for b in digest[:sentences])
+
+
+def tokenize(text: str) -> List[str]:
+    words = text.split(" ")
+    return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+
+class FakeOllamaServer:
+    """
+    Threaded HTTP server speaking enough of the Ollama API for the backend
+
+    Args:
+        host, port: Bind address; port 0 picks a free port
+        ttft: Seconds before the first token, covers prompt evaluation
+        tokens_per_second: Generation rate after the first token
+        load_seconds: Extra delay when the model is not loaded (cold start)
+        keep_alive: Seconds a model stays loaded after its last request
+        error_rate: Probability a request fails with HTTP 500
+        stall_rate: Probability a request stalls for `stall_seconds` (timeout injection)
+        stall_seconds: Length of an injected stall
+        reply_sentences: Sentences per deterministic reply
+        models: Model names reported by /api/tags
+        seed: Seed for the error/stall injection RNG
+        num_parallel: Generations served at once, later ones queue (OLLAMA_NUM_PARALLEL); 0 is unlimited
+        prompt_tokens_per_second: Prompt evaluation rate added to ttft, so long prompts start later; 0 disables
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, ttft: float = 0.05,
+                 tokens_per_second: float = 200.0, load_seconds: float = 0.0, keep_alive: float = 300.0,
+                 error_rate: float = 0.0, stall_rate: float = 0.0, stall_seconds: float = 60.0,
+                 reply_sentences: int = 3, models: Optional[List[str]] = None, seed: int = 0,
+                 num_parallel: int = 0, prompt_tokens_per_second: float = 0.0):
+        self.ttft = ttft
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.tokens_per_second = tokens_per_second
+        self.load_seconds = load_seconds
+        self.keep_alive = keep_alive
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.reply_sentences = reply_sentences
+        self.models = models or list(DEFAULT_MODELS)
+        self.stats = {"requests": 0, "errors": 0, "stalls": 0, "cold_loads": 0}
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(num_parallel) if num_parallel > 0 else contextlib.nullcontext()
+        self._loaded_until: Dict[str, float] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _roll(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self._rng.random() < rate
+
+    def _load(self, model: str, keep_alive) -> float:
+        """
+        Mark `model` loaded and return the load delay this request pays
+        """
+        now = time.monotonic()
+        if isinstance(keep_alive, str):
+            keep_alive = parse_duration(keep_alive)
+        keep_alive = self.keep_alive if keep_alive is None else keep_alive
+        with self._lock:
+            cold = self._loaded_until.get(model, 0.0) < now
+            if cold:
+                self.stats["cold_loads"] += 1
+            self._loaded_until[model] = float("inf") if keep_alive < 0 else now + keep_alive
+        return self.load_seconds if cold else 0.0
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json(200, {"models": [{"name": name, "model": name} for name in server.models]})
+                elif self.path == "/api/version":
+                    self._send_json(200, {"version": "0.0.0-fake"})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": "invalid JSON"})
+                    return
+
+                if self.path == "/api/show":
+                    # Queried by the `ollama run` CLI before it starts a chat
+                    if body.get("model", body.get("name")) not in server.models:
+                        self._send_json(404, {"error": "model not found"})
+                    else:
+                        self._send_json(200, {"modelfile": "", "parameters": "", "template": "{{ .Prompt }}",
+                                              "details": {"family": "fake"}, "model_info": {}})
+                    return
+                if self.path not in ("/api/generate", "/api/chat"):
+                    self._send_json(404, {"error": "not found"})
+                    return
+                with server._lock:
+                    server.stats["requests"] += 1
+
+                model = body.get("model", "")
+                if model not in server.models:
+                    self._send_json(404, {"error": f"model '{model}' not found"})
+                    return
+                if server._roll(server.error_rate):
+                    with server._lock:
+                        server.stats["errors"] += 1
+                    self._send_json(500, {"error": "injected failure"})
+                    return
+                if server._roll(server.stall_rate):
+                    with server._lock:
+                        server.stats["stalls"] += 1
+                    time.sleep(server.stall_seconds)
+
+                try:
+                    with server._slots:
+                        self._generate(body, chat=self.path == "/api/chat")
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client gave up (e.g. its timeout fired during an injected stall)
+                    pass
+
+            def _generate(self, body: Dict, chat: bool):
+                started = time.perf_counter()
+                model = body["model"]
+                load_delay = server._load(model, body.get("keep_alive"))
+                if chat:
+                    prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+                else:
+                    prompt = body.get("prompt", "")
+
+                # An empty prompt only loads the model, as in Ollama
+                if not prompt:
+                    time.sleep(load_delay)
+                    self._send_json(200, self._final(model, chat, "", 0, 0, load_delay, 0.0, 0.0, started))
+                    return
+
+                tokens = tokenize(deterministic_reply(prompt, server.reply_sentences))
+                num_predict = body.get("options", {}).get("num_predict")
+                if num_predict is not None and num_predict >= 0:
+                    tokens = tokens[:num_predict]
+                prompt_tokens = max(len(prompt) // 4, 1)
+                token_interval = 1.0 / server.tokens_per_second if server.tokens_per_second > 0 else 0.0
+                ttft = server.ttft
+                if server.prompt_tokens_per_second > 0:
+                    ttft += prompt_tokens / server.prompt_tokens_per_second
+
+                time.sleep(load_delay + ttft)
+                if body.get("stream", True):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for i, token in enumerate(tokens):
+                        if i:
+                            time.sleep(token_interval)
+                        self._write_chunk(self._chunk(model, chat, token))
+                    self._write_chunk(self._final(model, chat, "", prompt_tokens, len(tokens), load_delay,
+                                                  ttft, token_interval * max(len(tokens) - 1, 0), started))
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    time.sleep(token_interval * max(len(tokens) - 1, 0))
+                    self._send_json(200, self._final(model, chat, "".join(tokens), prompt_tokens, len(tokens),
+                                                     load_delay, ttft,
+                                                     token_interval * max(len(tokens) - 1, 0), started))
+
+            def _chunk(self, model: str, chat: bool, text: str) -> Dict:
+                chunk = {"model": model, "created_at": _now(), "done": False}
+                if chat:
+                    chunk["message"] = {"role": "assistant", "content": text}
+                else:
+                    chunk["response"] = text
+                return chunk
+
+            def _final(self, model, chat, text, prompt_tokens, eval_tokens, load_delay, ttft, eval_time, started):
+                final = self._chunk(model, chat, text)
+                final.update({
+                    "done": True,
+                    "done_reason": "stop",
+                    "total_duration": int((time.perf_counter() - started) * 1e9),
+                    "load_duration": int(load_delay * 1e9),
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": int(ttft * 1e9),
+                    "eval_count": eval_tokens,
+                    "eval_duration": int(eval_time * 1e9)
+                })
+                return final
+
+            def _write_chunk(self, payload: Dict):
+                data = (json.dumps(payload) + "\n").encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def _send_json(self, status: int, payload: Dict):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a deterministic fake Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--load-seconds", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall-seconds", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--num-parallel", type=int, default=0)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(args.host, args.port, ttft=args.ttft, tokens_per_second=args.tokens_per_second,
+                              load_seconds=args.load_seconds, error_rate=args.error_rate,
+                              stall_rate=args.stall_rate, stall_seconds=args.stall_seconds, seed=args.seed,
+                              num_parallel=args.num_parallel,
+                              prompt_tokens_per_second=args.prompt_tokens_per_second)
+    print(f"Fake Ollama listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
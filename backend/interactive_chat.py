@@ -1,5 +1,14 @@
-import subprocess
+import statistics
+import time
+from collections import deque
+
+import requests
+
+from models.llm_handler import OllamaClient
 from utils.therapy_prompts import TherapyPrompts, EmotionalState, TherapyApproach, detect_crisis_level
+from utils.token_utils import TokenBudgetHistory, estimate_tokens
+
+STAGES = ["detection", "prompt_build", "time_to_first_token", "generation"]
 
 def detect_emotion(user_input):
     # Simple keyword-based detection (replace with your advanced logic if available)
@@ -15,48 +24,84 @@ def detect_emotion(user_input):
         return EmotionalState.HOPEFUL
     return EmotionalState.NEUTRAL
 
+def print_stats(turn_stats, history):
+    if not turn_stats:
+        print("No turns yet.\n")
+        return
+
+    print(f"\n{'turn':>4} " + " ".join(f"{stage:>20}" for stage in STAGES) + f" {'prompt tok':>10}")
+    for i, turn in enumerate(turn_stats, 1):
+        print(f"{i:>4} " + " ".join(f"{turn[stage] * 1000:>17.1f} ms" for stage in STAGES) + f" {turn['prompt_tokens']:>10}")
+    print(f"{'p50':>4} " + " ".join(f"{statistics.median(t[stage] for t in turn_stats) * 1000:>17.1f} ms" for stage in STAGES))
+    print(f"History: {len(history)} turns, ~{history.total_tokens}/{history.max_tokens} tokens, "
+          f"{history.evicted_turns} evicted\n")
+
 def main():
     model_name = "llama3.1:8b-instruct-q4_0"
     therapy_prompts = TherapyPrompts()
-    session_history = []
+    client = OllamaClient()
+    history = TokenBudgetHistory(max_tokens=1500)
+    turn_stats = deque(maxlen=50)
+
+    # The system prompt is identical every turn, so Ollama can keep it in its prompt cache
+    system_message = {"role": "system", "content": therapy_prompts.base_system_prompt}
 
-    print("Welcome to the AI Mental Health Counselor. Type 'exit' to quit.\n")
+    print("Welcome to the AI Mental Health Counselor. Type 'exit' to quit, '/stats' for latency.\n")
 
     while True:
         user_input = input("You: ")
         if user_input.strip().lower() in ["exit", "quit"]:
             print("Session ended. Take care!")
             break
+        if user_input.strip() == "/stats":
+            print_stats(turn_stats, history)
+            continue
 
         # Detect emotion and crisis
+        started = time.perf_counter()
         emotion = detect_emotion(user_input)
         crisis_level = detect_crisis_level(user_input)
         approach = TherapyApproach.CBT  # You can make this dynamic
+        detected = time.perf_counter()
 
-        # Build prompt using your TherapyPrompts logic
-        prompt = therapy_prompts.build_contextual_prompt(
-            base_context=f"User just said: '{user_input}'",
+        # Only the short per-turn guidance changes between turns
+        guidance = therapy_prompts.build_turn_guidance(
             emotional_state=emotion,
             therapy_approach=approach,
-            session_history=session_history,
             crisis_indicators=(crisis_level in ["high", "medium"])
         )
+        messages = [system_message, *history.as_messages(),
+                    {"role": "system", "content": guidance},
+                    {"role": "user", "content": user_input}]
+        built = time.perf_counter()
 
-        # Call Ollama CLI
-        result = subprocess.run(
-            ["ollama", "run", model_name],
-            input=prompt,
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            timeout=120
-        )
-        if result.returncode == 0:
-            ai_response = result.stdout.strip()
-            print(f"Alex: {ai_response}\n")
-            session_history.append(f"User: {user_input}\nAlex: {ai_response}")
-        else:
-            print(f"Error: {result.stderr.strip()}\n")
+        first_token = None
+        reply = []
+        try:
+            print("Alex: ", end="", flush=True)
+            for chunk in client.stream_chat(model_name, messages):
+                content = chunk.get("message", {}).get("content", "")
+                if content:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    reply.append(content)
+                    print(content, end="", flush=True)
+            print("\n")
+        except (requests.exceptions.RequestException, RuntimeError) as e:
+            print(f"\nError: {e}\n")
+            continue
+        finished = time.perf_counter()
+
+        ai_response = "".join(reply).strip()
+        history.append(user_input, ai_response)
+        first_token = first_token or finished
+        turn_stats.append({
+            "detection": detected - started,
+            "prompt_build": built - detected,
+            "time_to_first_token": first_token - built,
+            "generation": finished - first_token,
+            "prompt_tokens": sum(estimate_tokens(m["content"]) for m in messages)
+        })
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,323 @@
+"""
+Pool of Ollama backends behind the OllamaClient interface
+Spreads generations over several Ollama endpoints with least-outstanding
+routing, keeps each session on the backend that already holds its prompt
+cache, checks backend health via /api/tags, and can hedge latency-critical
+requests by racing a second backend when the first is slow
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import requests
+
+from .llm_handler import OllamaClient, DEFAULT_OLLAMA_URL, _normalize_host
+from ..utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+BACKEND_REQUESTS = REGISTRY.counter(
+    "llm_backend_requests_total", "Generations per backend by outcome", labels=("backend", "outcome"))
+BACKEND_SECONDS = REGISTRY.histogram(
+    "llm_backend_request_seconds", "Generation latency per backend", labels=("backend",))
+BACKEND_OUTSTANDING = REGISTRY.gauge(
+    "llm_backend_outstanding", "Generations in flight per backend", labels=("backend",))
+BACKEND_HEALTHY = REGISTRY.gauge("llm_backend_healthy", "1 if the backend passed its last health check",
+                                 labels=("backend",))
+ROUTING_DECISIONS = REGISTRY.counter(
+    "llm_routing_decisions_total", "Backend choices by reason", labels=("reason",))
+HEDGES = REGISTRY.counter("llm_hedged_requests_total", "Hedged requests by which attempt won", labels=("winner",))
+
+# Consecutive connection failures before a backend is taken out of rotation until its next health check
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+class Backend:
+    """
+    One Ollama endpoint and its routing state
+    """
+
+    def __init__(self, url: str, pool_size: int, timeout: float):
+        self.url = _normalize_host(url)
+        self.client = OllamaClient(self.url, pool_size=pool_size, timeout=timeout)
+        self.outstanding = 0
+        self.healthy = True
+        self.models: Optional[set] = None  # None until the first health check
+        self.consecutive_failures = 0
+        self.latency_ewma: Optional[float] = None
+        BACKEND_HEALTHY.set(1, self.url)
+
+    def serves(self, model: Optional[str]) -> bool:
+        return self.healthy and (model is None or self.models is None or model in self.models)
+
+    def snapshot(self) -> Dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "models": sorted(self.models) if self.models is not None else None
+        }
+
+
+class OllamaBackendPool:
+    """
+    Drop-in replacement for OllamaClient that routes over several backends
+
+    Generation methods accept two routing hints on top of the OllamaClient
+    arguments: `affinity_key` keeps a session on one backend while that
+    backend is healthy and not much busier than the least-loaded one, and
+    `hedge` (non-streaming only) sends a second copy to another backend if
+    the first has not answered within `hedge_delay` seconds.
+
+    Args:
+        urls: Ollama base URLs
+        pool_size: Connections kept per backend
+        timeout: Default request timeout
+        health_interval: Seconds between /api/tags health checks, 0 to disable the checker thread
+        affinity_slack: Extra in-flight requests tolerated on a session's backend before it is moved
+        max_affinity_keys: Sessions remembered for affinity (least recently used are forgotten)
+        hedge_delay: Seconds before a hedged request is duplicated
+    """
+
+    def __init__(self, urls: Sequence[str], pool_size: int = 4, timeout: float = 120,
+                 health_interval: float = 10.0, affinity_slack: int = 2, max_affinity_keys: int = 10000,
+                 hedge_delay: float = 2.0):
+        if not urls:
+            raise ValueError("OllamaBackendPool needs at least one backend URL")
+        self.backends = [Backend(url, pool_size, timeout) for url in urls]
+        self.timeout = timeout
+        self.affinity_slack = affinity_slack
+        self.max_affinity_keys = max_affinity_keys
+        self.hedge_delay = hedge_delay
+        self._affinity: "OrderedDict[str, Backend]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hedge_executor = ThreadPoolExecutor(max_workers=max(2, pool_size * len(self.backends)),
+                                                  thread_name_prefix="llm-hedge")
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+        if health_interval > 0:
+            self._health_thread = threading.Thread(target=self._health_loop, args=(health_interval,),
+                                                   name="llm-health", daemon=True)
+            self._health_thread.start()
+
+    @property
+    def clients(self) -> List[OllamaClient]:
+        return [backend.client for backend in self.backends]
+
+    def _pick(self, model: Optional[str], affinity_key: Optional[str] = None,
+              exclude: Sequence[Backend] = ()) -> Backend:
+        """
+        Choose a backend and count the request as outstanding on it
+        """
+        with self._lock:
+            candidates = [b for b in self.backends if b.serves(model) and b not in exclude]
+            reason = "least_outstanding"
+            if not candidates:
+                # Everything looks unhealthy; try anyway rather than failing without a request
+                candidates = [b for b in self.backends if b not in exclude] or list(self.backends)
+                reason = "no_healthy_backend"
+            least = min(candidates, key=lambda b: (b.outstanding, b.latency_ewma or 0.0))
+            chosen = least
+            if affinity_key is not None:
+                sticky = self._affinity.get(affinity_key)
+                if sticky in candidates and sticky.outstanding <= least.outstanding + self.affinity_slack:
+                    chosen = sticky
+                    reason = "affinity"
+                    self._affinity.move_to_end(affinity_key)
+                else:
+                    self._affinity[affinity_key] = least
+                    self._affinity.move_to_end(affinity_key)
+                    if len(self._affinity) > self.max_affinity_keys:
+                        self._affinity.popitem(last=False)
+            if exclude:
+                reason = "failover" if reason != "no_healthy_backend" else reason
+            chosen.outstanding += 1
+            BACKEND_OUTSTANDING.set(chosen.outstanding, chosen.url)
+        ROUTING_DECISIONS.inc(reason)
+        return chosen
+
+    def _unpick(self, backend: Backend) -> None:
+        with self._lock:
+            backend.outstanding -= 1
+            BACKEND_OUTSTANDING.set(backend.outstanding, backend.url)
+
+    def _release(self, backend: Backend, started: float, outcome: str) -> None:
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            backend.outstanding -= 1
+            BACKEND_OUTSTANDING.set(backend.outstanding, backend.url)
+            if outcome == "ok":
+                backend.consecutive_failures = 0
+                backend.latency_ewma = elapsed if backend.latency_ewma is None else \
+                    0.8 * backend.latency_ewma + 0.2 * elapsed
+            elif outcome == "connection_error":
+                backend.consecutive_failures += 1
+                if backend.consecutive_failures >= MAX_CONSECUTIVE_FAILURES and backend.healthy:
+                    backend.healthy = False
+                    BACKEND_HEALTHY.set(0, backend.url)
+                    logger.warning("Backend %s taken out of rotation after %d failures",
+                                   backend.url, backend.consecutive_failures)
+        BACKEND_REQUESTS.inc(backend.url, outcome)
+        BACKEND_SECONDS.observe(elapsed, backend.url)
+
+    def _call(self, backend: Backend, method: str, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = getattr(backend.client, method)(*args, **kwargs)
+        except requests.exceptions.ConnectionError:
+            self._release(backend, started, "connection_error")
+            raise
+        except requests.exceptions.RequestException:
+            self._release(backend, started, "error")
+            raise
+        self._release(backend, started, "ok")
+        return result
+
+    def generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                 timeout: Optional[float] = None, affinity_key: Optional[str] = None,
+                 hedge: bool = False, **extra) -> Dict[str, Any]:
+        """
+        Non-streaming /api/generate on the chosen backend, failing over once on connection errors
+
+        An empty prompt only loads the model, so it is sent to every healthy backend.
+        """
+        if not prompt:
+            return self._broadcast_load(model, options, timeout, **extra)
+        backend = self._pick(model, affinity_key)
+        if hedge and len(self.backends) > 1:
+            return self._hedged_generate(backend, model, prompt, options, timeout, **extra)
+        try:
+            return self._call(backend, "generate", model, prompt, options=options, timeout=timeout, **extra)
+        except requests.exceptions.ConnectionError:
+            retry = self._pick(model, affinity_key, exclude=[backend])
+            if retry is backend:
+                self._unpick(retry)
+                raise
+            return self._call(retry, "generate", model, prompt, options=options, timeout=timeout, **extra)
+
+    def _hedged_generate(self, primary: Backend, model: str, prompt: str, options, timeout, **extra) -> Dict:
+        attempts = {self._hedge_executor.submit(self._call, primary, "generate", model, prompt,
+                                                options=options, timeout=timeout, **extra): "primary"}
+        done, _ = wait(attempts, timeout=self.hedge_delay, return_when=FIRST_COMPLETED)
+        if not done or next(iter(done)).exception() is not None:
+            secondary = self._pick(model, exclude=[primary])
+            if secondary is not primary:
+                attempts[self._hedge_executor.submit(self._call, secondary, "generate", model, prompt,
+                                                     options=options, timeout=timeout, **extra)] = "hedge"
+            else:
+                self._unpick(secondary)
+
+        # First successful answer wins; the slower attempt finishes in the background and is dropped
+        pending = set(attempts)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    HEDGES.inc(attempts[future])
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _broadcast_load(self, model: str, options, timeout, **extra) -> Dict[str, Any]:
+        targets = [b for b in self.backends if b.serves(model)] or list(self.backends)
+        result, error = None, None
+        for backend in targets:
+            with self._lock:
+                backend.outstanding += 1
+            try:
+                result = self._call(backend, "generate", model, "", options=options, timeout=timeout, **extra)
+            except requests.exceptions.RequestException as e:
+                error = e
+        if result is None:
+            raise error
+        return result
+
+    def stream_generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                        timeout: Optional[float] = None, affinity_key: Optional[str] = None,
+                        **extra) -> Iterator[Dict[str, Any]]:
+        backend = self._pick(model, affinity_key)
+        yield from self._stream(backend, "stream_generate", model, prompt, options=options, timeout=timeout, **extra)
+
+    def stream_chat(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None,
+                    timeout: Optional[float] = None, affinity_key: Optional[str] = None,
+                    **extra) -> Iterator[Dict[str, Any]]:
+        backend = self._pick(model, affinity_key)
+        yield from self._stream(backend, "stream_chat", model, messages, options=options, timeout=timeout, **extra)
+
+    def _stream(self, backend: Backend, method: str, *args, **kwargs) -> Iterator[Dict[str, Any]]:
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield from getattr(backend.client, method)(*args, **kwargs)
+        except requests.exceptions.ConnectionError:
+            outcome = "connection_error"
+            raise
+        except (requests.exceptions.RequestException, RuntimeError):
+            outcome = "error"
+            raise
+        finally:
+            self._release(backend, started, outcome)
+
+    def list_models(self, timeout: float = 5) -> List[str]:
+        """
+        Models available on at least one healthy backend
+        """
+        self.check_health(timeout)
+        models = set()
+        for backend in self.backends:
+            if backend.healthy and backend.models:
+                models |= backend.models
+        return sorted(models)
+
+    def check_health(self, timeout: float = 5) -> None:
+        """
+        Probe every backend's /api/tags and update its health and model list
+        """
+        for backend in self.backends:
+            try:
+                models = set(backend.client.list_models(timeout=timeout))
+                healthy = True
+            except requests.exceptions.RequestException as e:
+                models, healthy = None, False
+                logger.warning("Health check failed for %s: %s", backend.url, e)
+            with self._lock:
+                if healthy:
+                    backend.models = models
+                    backend.consecutive_failures = 0
+                backend.healthy = healthy
+            BACKEND_HEALTHY.set(1 if healthy else 0, backend.url)
+
+    def _health_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.check_health()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"backends": [backend.snapshot() for backend in self.backends],
+                    "affinity_sessions": len(self._affinity)}
+
+    def close(self) -> None:
+        self._stop.set()
+        self._hedge_executor.shutdown(wait=False)
+        for backend in self.backends:
+            backend.client.close()
+
+
+def create_llm_client(pool_size: int = 4):
+    """
+    OllamaClient for a single host, OllamaBackendPool when OLLAMA_HOSTS lists several
+
+    OLLAMA_HOSTS is comma separated and follows the OLLAMA_HOST format.
+    """
+    hosts = [h.strip() for h in os.environ.get("OLLAMA_HOSTS", "").split(",") if h.strip()]
+    if len(hosts) > 1:
+        return OllamaBackendPool(hosts, pool_size=pool_size)
+    return OllamaClient(hosts[0] if hosts else DEFAULT_OLLAMA_URL, pool_size=pool_size)
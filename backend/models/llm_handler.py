@@ -1,9 +1,104 @@
+import json
+import os
 import subprocess
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List
+
+import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+
+def _normalize_host(host: str) -> str:
+    # OLLAMA_HOST follows the ollama CLI convention and may omit the scheme
+    if "://" not in host:
+        host = f"http://{host}"
+    return host.rstrip("/")
+
+
+DEFAULT_OLLAMA_URL = _normalize_host(os.environ.get("OLLAMA_HOST", "http://localhost:11434"))
+
+# Sent with every request: a request without keep_alive resets the model's timer to the server default (5m)
+DEFAULT_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+
+class OllamaClient:
+    """
+    Pooled HTTP client for the Ollama REST API.
+
+    Keeps connections alive across requests, so each turn skips TCP setup,
+    and exposes streaming variants that yield Ollama's NDJSON chunks as they arrive.
+    """
+    def __init__(self, base_url: str = DEFAULT_OLLAMA_URL, pool_size: int = 4, timeout: float = 120):
+        self.base_url = _normalize_host(base_url)
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                 timeout: Optional[float] = None, affinity_key: Optional[str] = None,
+                 hedge: bool = False, **extra) -> Dict[str, Any]:
+        """
+        Non-streaming /api/generate call.
+
+        `affinity_key` and `hedge` are routing hints for OllamaBackendPool and
+        have no effect on a single server.
+
+        Returns:
+            Ollama's full response body, including timing fields.
+        """
+        payload = {"model": model, "prompt": prompt, "stream": False, "options": options or {}, **extra}
+        response = self.session.post(f"{self.base_url}/api/generate", json=payload,
+                                     timeout=timeout or self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def stream_generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                        timeout: Optional[float] = None, affinity_key: Optional[str] = None,
+                        **extra) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming /api/generate call; yields each chunk, the last one has done=True.
+        """
+        payload = {"model": model, "prompt": prompt, "stream": True, "options": options or {}, **extra}
+        yield from self._stream("/api/generate", payload, timeout)
+
+    def stream_chat(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None,
+                    timeout: Optional[float] = None, affinity_key: Optional[str] = None,
+                    **extra) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming /api/chat call; yields each chunk, the last one has done=True.
+        """
+        payload = {"model": model, "messages": messages, "stream": True, "options": options or {}, **extra}
+        yield from self._stream("/api/chat", payload, timeout)
+
+    def list_models(self, timeout: float = 5) -> List[str]:
+        """
+        Names of the models available on the server, via /api/tags.
+        """
+        response = self.session.get(f"{self.base_url}/api/tags", timeout=timeout)
+        response.raise_for_status()
+        return [model["name"] for model in response.json().get("models", [])]
+
+    def _stream(self, path: str, payload: Dict[str, Any], timeout: Optional[float]) -> Iterator[Dict[str, Any]]:
+        with self.session.post(f"{self.base_url}{path}", json=payload, stream=True,
+                               timeout=timeout or self.timeout) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+                yield chunk
+                if chunk.get("done"):
+                    break
+
+    def close(self) -> None:
+        self.session.close()
+
 class LLMHandler:
     """
     Handles communication with the Llama 3.1 LLM via local Ollama CLI.
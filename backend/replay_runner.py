@@ -0,0 +1,149 @@
+"""
+Offline transcript replay and evaluation runner
+Drives recorded multi-turn conversations through the full ChatService
+pipeline against a configurable Ollama backend and writes one structured
+result per turn, so prompt or detector changes can be regression-tested
+over large transcript sets
+
+Usage (from the repository root):
+    python -m backend.replay_runner transcripts.jsonl -o results.jsonl --concurrency 16
+
+Transcript format, one conversation per line:
+    {"id": "conv-1", "user_id": "u1", "turns": ["I'm anxious", {"user": "...", "expect": {"crisis_level": "high"}}]}
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
+
+from .models.llm_handler import OllamaClient, DEFAULT_OLLAMA_URL
+from .services.chat_service import ChatService
+
+
+def load_transcripts(paths: List[str]) -> Iterator[Dict]:
+    """
+    Read conversations from JSONL transcript files
+    """
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                conversation = json.loads(line)
+                conversation.setdefault("id", f"{path}:{line_number}")
+                conversation["turns"] = [
+                    turn if isinstance(turn, dict) else {"user": turn}
+                    for turn in conversation.get("turns", [])
+                ]
+                yield conversation
+
+
+def replay_conversation(conversation: Dict, model_name: str, llm_client: OllamaClient) -> List[Dict]:
+    """
+    Replay one conversation in a fresh session
+
+    Returns:
+        One result record per turn
+    """
+    chat_service = ChatService(model_name=model_name, llm_client=llm_client)
+    chat_service.start_session(conversation.get("user_id"))
+
+    results = []
+    for index, turn in enumerate(conversation["turns"]):
+        started = time.perf_counter()
+        response = chat_service.process_message(turn["user"], conversation.get("user_id"))
+        latency = time.perf_counter() - started
+
+        record = {
+            "conversation_id": conversation["id"],
+            "turn": index,
+            "crisis_level": response.get("crisis_level"),
+            "emotional_state": response.get("emotional_state"),
+            "therapy_approach": response.get("therapy_approach"),
+            "latency_ms": round(latency * 1000, 3),
+            "response_length": len(response.get("message", "")),
+            "error": response.get("error")
+        }
+        mismatches = {
+            field: {"expected": expected, "actual": record.get(field)}
+            for field, expected in turn.get("expect", {}).items()
+            if record.get(field) != expected
+        }
+        if mismatches:
+            record["mismatches"] = mismatches
+        results.append(record)
+    return results
+
+
+def run_replay(conversations: Iterator[Dict], output, model_name: str, ollama_url: str,
+               concurrency: int = 8) -> Dict:
+    """
+    Replay conversations `concurrency` at a time and stream results to `output`
+
+    Returns:
+        Aggregate summary of the run
+    """
+    llm_client = OllamaClient(ollama_url, pool_size=concurrency)
+    latencies = []
+    crisis_levels = Counter()
+    conversations_run = errors = mismatched = 0
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(replay_conversation, conversation, model_name, llm_client)
+                   for conversation in conversations]
+        for future in as_completed(futures):
+            conversations_run += 1
+            for record in future.result():
+                output.write(json.dumps(record) + "\n")
+                latencies.append(record["latency_ms"])
+                crisis_levels[record["crisis_level"]] += 1
+                errors += record["error"] is not None
+                mismatched += "mismatches" in record
+
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "conversations": conversations_run,
+        "turns": len(latencies),
+        "elapsed_seconds": round(elapsed, 3),
+        "turns_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": statistics.median(latencies) if latencies else 0.0,
+            "p95": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+            "max": latencies[-1] if latencies else 0.0
+        },
+        "crisis_levels": dict(crisis_levels),
+        "errors": errors,
+        "mismatched_turns": mismatched
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay transcripts through the ChatService pipeline")
+    parser.add_argument("transcripts", nargs="+", help="JSONL transcript files")
+    parser.add_argument("-o", "--output", default="-", help="Per-turn results file (JSONL), '-' for stdout")
+    parser.add_argument("--concurrency", type=int, default=8, help="Conversations replayed in parallel")
+    parser.add_argument("--model", default="llama3.1:8b-instruct-q4_0")
+    parser.add_argument("--ollama-url", default=DEFAULT_OLLAMA_URL)
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = run_replay(load_transcripts(args.transcripts), output, args.model,
+                             args.ollama_url, args.concurrency)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return 1 if summary["mismatched_turns"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""
+Batch chat jobs for non-interactive integrations
+Email-style check-ins and journaling uploads submit many messages at once
+and poll for the replies later. Crisis and emotion detection for a whole
+batch is one vectorized pass: the messages are joined into a single byte
+array, each keyword is located across the whole batch with NumPy
+comparisons, and hits are reduced back to their messages. Generations then
+run at background priority in the shared scheduler, so batches soak up idle
+LLM capacity without delaying interactive turns. Workers take the next
+item from each queued job in turn, so jobs share the batch capacity rather
+than running one after another. Crisis messages (is_priority_crisis) never
+wait behind other items: they run on their own threads and are admitted
+like interactive crisis turns
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.metrics import REGISTRY
+from ..utils.therapy_prompts import CRISIS_KEYWORDS, EmotionalState, is_priority_crisis
+from .fair_scheduler import SchedulerTimeout
+
+if TYPE_CHECKING:
+    from .chat_service import ChatService
+
+MAX_BATCH_ITEMS = 1000
+
+# Threads answering crisis batch items; the scheduler admits these at once, so they never block for long
+CRISIS_WORKERS = 4
+
+# Batch work may wait this long for an idle slot before being answered from templates
+BATCH_SLOT_TIMEOUT = 3600.0
+
+_CRISIS_LEVELS = ["none", "medium", "high"]
+
+BATCH_JOBS = REGISTRY.counter("chat_batch_jobs_total", "Batch chat jobs by final status", labels=("status",))
+BATCH_ITEMS = REGISTRY.counter("chat_batch_items_total", "Batch chat items processed", labels=("outcome",))
+BATCH_DETECTION_SECONDS = REGISTRY.histogram(
+    "chat_batch_detection_seconds", "Time to run detection for a whole batch")
+
+
+class BatchDetector:
+    """
+    Crisis level and emotional state for many messages in one scan
+
+    Gives the same answers as detect_crisis_level and
+    ChatService._detect_emotional_state applied message by message.
+
+    Args:
+        emotion_keywords: (state, keywords) pairs in priority order
+    """
+
+    def __init__(self, emotion_keywords: Sequence[Tuple[EmotionalState, List[str]]]):
+        self._crisis_code: Dict[str, int] = {}
+        for keyword in CRISIS_KEYWORDS["medium_risk"]:
+            self._crisis_code.setdefault(keyword, 1)
+        for keyword in CRISIS_KEYWORDS["high_risk"] + CRISIS_KEYWORDS["self_harm"]:
+            self._crisis_code[keyword] = 2
+
+        # Lower rank wins; the rank past the last state means neutral
+        self._states = [state for state, _ in emotion_keywords] + [EmotionalState.NEUTRAL]
+        self._emotion_rank: Dict[str, int] = {}
+        for rank, (_, keywords) in enumerate(emotion_keywords):
+            for keyword in keywords:
+                self._emotion_rank.setdefault(keyword, rank)
+
+    def detect(self, messages: Sequence[str]) -> Tuple[List[str], List[EmotionalState]]:
+        """
+        Returns:
+            Crisis levels and emotional states, one per message
+        """
+        if not messages:
+            return [], []
+        encoded = [message.lower().encode("utf-8") for message in messages]
+        # Keywords contain no newline, so no match can span two messages
+        data = np.frombuffer(b"\n".join(encoded), dtype=np.uint8)
+        starts = np.zeros(len(encoded), dtype=np.int64)
+        np.cumsum([len(message) + 1 for message in encoded[:-1]], out=starts[1:])
+        # Every position's byte and the next one as a single code, to find keyword prefixes in one comparison
+        pairs = data[:-1].astype(np.uint16) << 8 | data[1:]
+        prefixes: Dict[int, np.ndarray] = {}
+
+        crisis = np.zeros(len(messages), dtype=np.int8)
+        for keyword, code in self._crisis_code.items():
+            rows = self._rows(data, pairs, starts, prefixes, keyword)
+            np.maximum.at(crisis, rows, code)
+
+        emotion = np.full(len(messages), len(self._states) - 1, dtype=np.int8)
+        for keyword, rank in self._emotion_rank.items():
+            rows = self._rows(data, pairs, starts, prefixes, keyword)
+            np.minimum.at(emotion, rows, rank)
+
+        return [_CRISIS_LEVELS[code] for code in crisis], [self._states[rank] for rank in emotion]
+
+    @staticmethod
+    def _rows(data: np.ndarray, pairs: np.ndarray, starts: np.ndarray, prefixes: Dict[int, np.ndarray],
+              keyword: str) -> np.ndarray:
+        # Positions of the keyword's first two bytes, shared between keywords, narrowed one byte at a time
+        pattern = keyword.encode("utf-8")
+        if len(pattern) < 2:
+            return np.searchsorted(starts, np.flatnonzero(data == pattern[0]), side="right") - 1
+        prefix = pattern[0] << 8 | pattern[1]
+        if prefix not in prefixes:
+            prefixes[prefix] = np.flatnonzero(pairs == prefix)
+        candidates = prefixes[prefix]
+        candidates = candidates[candidates <= len(data) - len(pattern)]
+        for offset in range(2, len(pattern)):
+            candidates = candidates[data[candidates + offset] == pattern[offset]]
+        return np.searchsorted(starts, candidates, side="right") - 1
+
+
+class BatchJob:
+    """
+    One submitted batch and its results so far
+    """
+
+    def __init__(self, job_id: str, items: List[Dict]):
+        self.job_id = job_id
+        self.items = items
+        self.results: List[Optional[Dict]] = [None] * len(items)
+        self.status = "queued"
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.completed = 0
+        self.crisis_items: List[int] = []
+
+    def view(self, offset: int = 0, limit: int = 100) -> Dict:
+        page = [dict(result, index=i) for i, result in enumerate(self.results[offset:offset + limit], offset)
+                if result is not None]
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": len(self.items),
+            "completed": self.completed,
+            "crisis_items": self.crisis_items,
+            "created": self.created,
+            "finished": self.finished,
+            "offset": offset,
+            "results": page
+        }
+
+
+class BatchJobManager:
+    """
+    Runs batch jobs in the background and keeps their results for polling
+
+    Args:
+        chat_service: Service whose LLM client, router, scheduler and prompts are reused
+        workers: Items generated concurrently; the scheduler still decides when each runs.
+            Crisis items run on separate threads and do not count against this
+        max_jobs: Finished jobs kept for polling; the oldest are dropped first
+        result_ttl: Seconds a finished job stays available
+    """
+
+    def __init__(self, chat_service: "ChatService", workers: Optional[int] = None, max_jobs: int = 200,
+                 result_ttl: float = 3600.0):
+        from .chat_service import EMOTION_KEYWORDS
+
+        self.chat_service = chat_service
+        self.detector = BatchDetector(EMOTION_KEYWORDS)
+        self.max_jobs = max_jobs
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers or chat_service.scheduler.slots,
+                                            thread_name_prefix="batch-chat")
+        self._crisis_executor = ThreadPoolExecutor(max_workers=CRISIS_WORKERS,
+                                                   thread_name_prefix="batch-chat-crisis")
+        self._jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+        # Jobs with items not yet started, in round-robin order; each executor task runs the next one
+        self._queued: "OrderedDict[str, Tuple[BatchJob, Deque[Tuple[int, str, EmotionalState]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, items: List[Dict]) -> BatchJob:
+        """
+        Detect all items in one pass and queue their generations
+
+        Args:
+            items: Dicts with "message" and optional "session_id" / "user_id"
+
+        Raises:
+            ValueError: No items, too many items, or an item without a message
+        """
+        if not items:
+            raise ValueError("batch has no items")
+        if len(items) > MAX_BATCH_ITEMS:
+            raise ValueError(f"batch has {len(items)} items, the limit is {MAX_BATCH_ITEMS}")
+        if any(not isinstance(item, dict) or not isinstance(item.get("message"), str) for item in items):
+            raise ValueError("every item needs a message string")
+
+        job = BatchJob(os.urandom(8).hex(), items)
+        started = time.perf_counter()
+        crisis_levels, emotional_states = self.detector.detect([item["message"] for item in items])
+        BATCH_DETECTION_SECONDS.observe(time.perf_counter() - started)
+        job.crisis_items = [i for i, level in enumerate(crisis_levels) if level == "high"]
+
+        queued = deque((i, crisis_levels[i], emotional_states[i]) for i in range(len(items))
+                       if not is_priority_crisis(crisis_levels[i]))
+        with self._lock:
+            self._expire()
+            self._jobs[job.job_id] = job
+            if queued:
+                self._queued[job.job_id] = (job, queued)
+        # Crisis items skip the queue of earlier jobs, so their replies are ready when the caller first polls
+        for i in [i for i, level in enumerate(crisis_levels) if is_priority_crisis(level)]:
+            self._crisis_executor.submit(self._run_item, job, i, crisis_levels[i], emotional_states[i])
+        for _ in range(len(queued)):
+            self._executor.submit(self._run_next)
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def _expire(self) -> None:
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished is not None and now - job.finished > self.result_ttl]:
+            del self._jobs[job_id]
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished is not None]
+        for job_id in finished[:max(len(finished) - self.max_jobs, 0)]:
+            del self._jobs[job_id]
+
+    def _run_next(self) -> None:
+        with self._lock:
+            job_id, (job, queued) = next(iter(self._queued.items()))
+            index, crisis_level, emotional_state = queued.popleft()
+            if queued:
+                self._queued.move_to_end(job_id)
+            else:
+                del self._queued[job_id]
+        self._run_item(job, index, crisis_level, emotional_state)
+
+    def _run_item(self, job: BatchJob, index: int, crisis_level: str, emotional_state: EmotionalState) -> None:
+        item = job.items[index]
+        try:
+            result = self._generate(job, item, crisis_level, emotional_state)
+            BATCH_ITEMS.inc("degraded" if result.get("degraded") else "generated")
+        except Exception as e:
+            result = {"error": str(e), "crisis_level": crisis_level}
+            BATCH_ITEMS.inc("error")
+        with self._lock:
+            job.status = "running"
+            job.results[index] = result
+            job.completed += 1
+            if job.completed == len(job.items):
+                job.finished = time.time()
+                job.status = "completed" if all("error" not in r for r in job.results) else "completed_with_errors"
+                BATCH_JOBS.inc(job.status)
+
+    def _generate(self, job: BatchJob, item: Dict, crisis_level: str, emotional_state: EmotionalState) -> Dict:
+        service = self.chat_service
+        message = item["message"]
+        crisis_detected = crisis_level in ("high", "medium")
+        therapy_approach = service._choose_therapy_approach(message, emotional_state, crisis_detected)
+        prompt = service.therapy_prompts.build_contextual_prompt(
+            base_context=f"User: {message}",
+            emotional_state=emotional_state,
+            therapy_approach=therapy_approach,
+            crisis_indicators=crisis_detected
+        )
+        tier, model = service.model_router.route(message, crisis_level, emotional_state, therapy_approach)
+        high_risk = crisis_level == "high"
+        priority = is_priority_crisis(crisis_level)
+
+        reply, reason = None, "overloaded"
+        try:
+            with service.scheduler.slot(f"batch:{job.job_id}", crisis=priority, background=not priority,
+                                        timeout=BATCH_SLOT_TIMEOUT):
+                reply, _, _, _, reason = service._call_llm(prompt, crisis_level, tier, model,
+                                                           service.generation_budget.max_predict)
+        except SchedulerTimeout:
+            pass
+
+        result = {
+            "session_id": item.get("session_id"),
+            "message": reply,
+            "emotional_state": emotional_state.value,
+            "therapy_approach": therapy_approach.value,
+            "crisis_level": crisis_level
+        }
+        if reply is None:
+            result["message"] = service._degraded_response(emotional_state, therapy_approach, crisis_level, reason)
+            result["degraded"] = True
+        if high_risk:
+            result["crisis_resources"] = service._get_crisis_resources()
+        return result
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "jobs": len(self._jobs),
+                "running": sum(1 for job in self._jobs.values() if job.finished is None)
+            }
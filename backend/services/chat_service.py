@@ -3,32 +3,108 @@ Chat Service for AI Mental Health Counselor
 Integrates therapy prompts with Llama 3.1 for therapeutic conversations
 """
 
+import copy
 import requests
 import json
 import logging
-from typing import Dict, List, Optional, Tuple
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
+from ..models.llm_handler import OllamaClient, DEFAULT_OLLAMA_URL, DEFAULT_KEEP_ALIVE
+from .circuit_breaker import CircuitBreaker
+from .degraded_responder import DegradedResponder
+from .fair_scheduler import FairScheduler, SchedulerTimeout
+from .generation_budget import GenerationBudget
+from .model_router import LARGE, SMALL, TIER_ESCALATIONS, ModelRouter
+from .session_analytics import SessionAnalytics
+from .session_memory import SessionMemoryIndex
+from ..utils.metrics import REGISTRY
+from ..utils.structured_logging import bind_context, reset_context
 from ..utils.therapy_prompts import (
     TherapyPrompts,
     TherapyApproach,
     EmotionalState,
     detect_crisis_level,
-    create_therapy_session_prompt
+    is_priority_crisis,
+    create_therapy_session_prompt,
+    CRISIS_RESOURCES
 )
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Handlers are configured by the application (see utils.structured_logging), not on import
 logger = logging.getLogger(__name__)
 
+# Per-stage latency and outcome metrics, exported on /metrics
+STAGE_SECONDS = REGISTRY.histogram(
+    "chat_stage_seconds", "Time spent in each process_message stage", labels=("stage",))
+PROMPT_CHARS = REGISTRY.histogram(
+    "chat_prompt_chars", "Size of the prompt sent to the LLM in characters",
+    buckets=(1000, 2000, 3000, 4000, 6000, 8000, 12000, 16000, 32000))
+CRISIS_LEVELS = REGISTRY.counter("chat_crisis_level_total", "Turns by detected crisis level", labels=("level",))
+EMOTIONAL_STATES = REGISTRY.counter(
+    "chat_emotional_state_total", "Turns by detected emotional state", labels=("state",))
+THERAPY_APPROACHES = REGISTRY.counter(
+    "chat_therapy_approach_total", "Turns by chosen therapy approach", labels=("approach",))
+LLM_ERRORS = REGISTRY.counter("chat_llm_errors_total", "Failed LLM calls by kind", labels=("kind",))
+LLM_TIMEOUTS = REGISTRY.counter("chat_llm_timeouts_total", "LLM calls that hit the request timeout")
+DEGRADED_RESPONSES = REGISTRY.counter(
+    "chat_degraded_responses_total", "Turns answered from templates instead of the LLM", labels=("reason",))
+
+# Generation timings reported by Ollama with each completed response
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 200, 500, 1000, 2000, 5000)
+LLM_PROMPT_TOKENS = REGISTRY.histogram("llm_prompt_tokens", "Prompt tokens evaluated per turn", buckets=TOKEN_BUCKETS)
+LLM_GENERATED_TOKENS = REGISTRY.histogram(
+    "llm_generated_tokens", "Tokens generated per turn", buckets=TOKEN_BUCKETS)
+LLM_PROMPT_RATE = REGISTRY.histogram(
+    "llm_prompt_tokens_per_second", "Prompt evaluation throughput per turn", buckets=RATE_BUCKETS)
+LLM_GENERATION_RATE = REGISTRY.histogram(
+    "llm_generation_tokens_per_second", "Generation throughput per turn", buckets=RATE_BUCKETS)
+LLM_LOAD_SECONDS = REGISTRY.histogram("llm_load_seconds", "Model load time reported per turn")
+LLM_COLD_LOADS = REGISTRY.counter("llm_cold_loads_total", "Turns that paid for loading the model")
+
+# High-risk turns wait at most this long for the LLM before getting the crisis template reply
+CRISIS_LLM_TIMEOUT = 10
+
+# Emotion indicators in priority order; the first state with a matching keyword wins
+EMOTION_KEYWORDS = [
+    (EmotionalState.ANXIOUS, ["anxious", "worried", "nervous", "stress", "panic", "fear", "scared"]),
+    (EmotionalState.DEPRESSED, ["sad", "depressed", "hopeless", "worthless", "tired", "exhausted", "empty"]),
+    (EmotionalState.ANGRY, ["angry", "furious", "mad", "frustrated", "irritated", "rage"]),
+    (EmotionalState.OVERWHELMED, ["overwhelmed", "too much", "can't handle", "drowning", "swamped"]),
+    (EmotionalState.HOPEFUL, ["hope", "better", "improving", "progress", "optimistic", "positive"])
+]
+
+# Past-session memories added to a returning user's prompt, and notable turns kept per session
+MEMORY_TOP_K = 3
+MEMORY_TURNS_PER_SESSION = 5
+
+# A load_duration above this means the model was not resident; warm turns report a few milliseconds
+COLD_LOAD_SECONDS = 0.5
+
 class ChatService:
     """
     Main chat service that handles therapeutic conversations
     """
     
-    def __init__(self, model_name: str = "llama3.1:8b-instruct-q4_0"):
+    def __init__(self, model_name: str = "llama3.1:8b-instruct-q4_0",
+                 ollama_url: str = DEFAULT_OLLAMA_URL,
+                 llm_client: Optional[OllamaClient] = None, keep_alive=DEFAULT_KEEP_ALIVE,
+                 circuit_breaker: Optional[CircuitBreaker] = None, model_router: Optional[ModelRouter] = None,
+                 generation_budget: Optional[GenerationBudget] = None, scheduler: Optional[FairScheduler] = None,
+                 session_memory: Optional[SessionMemoryIndex] = None,
+                 analytics: Optional[SessionAnalytics] = None):
         self.model_name = model_name
+        self.model_router = model_router or ModelRouter(large_model=model_name)
+        self.generation_budget = generation_budget or GenerationBudget()
+        self.scheduler = scheduler or FairScheduler(slots=self.generation_budget.capacity)
+        self.session_memory = session_memory or SessionMemoryIndex()
+        self.analytics = analytics or SessionAnalytics()
+        self.llm_client = llm_client or OllamaClient(ollama_url)
+        self.keep_alive = keep_alive
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
         self.therapy_prompts = TherapyPrompts()
+        self.degraded_responder = DegradedResponder(self.therapy_prompts)
         self.conversation_history: List[Dict] = []
         self.session_context: Dict = {
             "session_start": datetime.now(),
@@ -58,17 +134,19 @@ class ChatService:
             "user_id": user_id
         }
         
-        # Get welcome message
+        # Get welcome message; users with stored memories are greeted as returning
+        returning_user = self.session_memory.has_user(user_id)
         welcome_message = self.therapy_prompts.get_prompt(
             "conversation_starters", 
-            "first_session"
+            "returning_user" if returning_user else "first_session"
         )
         
         return {
             "message": welcome_message,
             "session_id": str(self.session_context["session_start"].timestamp()),
             "emotional_state": self.session_context["emotional_state"].value,
-            "therapy_approach": self.session_context["therapy_approach"].value
+            "therapy_approach": self.session_context["therapy_approach"].value,
+            "returning_user": returning_user
         }
     
     def process_message(self, user_message: str, user_id: str = None) -> Dict:
@@ -82,38 +160,74 @@ class ChatService:
         Returns:
             Response with AI counselor message and metadata
         """
+        session_id = self._session_id()
+        context_token = bind_context(session_id=session_id)
         try:
-            # Detect crisis level
-            crisis_level = detect_crisis_level(user_message)
-            crisis_detected = crisis_level in ["high", "medium"]
-            
-            # Update session context
-            self.session_context["crisis_detected"] = crisis_detected
-            
-            # Determine emotional state (simplified - in production, use emotion detection model)
-            emotional_state = self._detect_emotional_state(user_message)
-            self.session_context["emotional_state"] = emotional_state
-            
-            # Choose therapy approach based on context
-            therapy_approach = self._choose_therapy_approach(user_message, emotional_state, crisis_detected)
-            self.session_context["therapy_approach"] = therapy_approach
-            
-            # Build contextual prompt
-            prompt = self._build_therapeutic_prompt(user_message, emotional_state, therapy_approach, crisis_detected)
+            return self._process_turn(user_message, session_id, user_id)
+        except Exception as e:
+            logger.exception("Error processing message")
+            return {
+                "message": "I'm having trouble processing your message right now. Please try again, and if you're in crisis, please contact a crisis helpline immediately.",
+                "error": str(e),
+                "crisis_level": "unknown"
+            }
+        finally:
+            reset_context(context_token)
+    
+    def _process_turn(self, user_message: str, session_id: str, user_id: Optional[str] = None) -> Dict:
+        """
+        Run one turn of process_message while it counts as in flight for the generation budget
+        """
+        with self.generation_budget.track():
+            started = time.perf_counter()
+            stages: Dict[str, float] = {}
+            budget: Dict = {}
+            crisis_level, emotional_state, therapy_approach, prompt = self._prepare_turn(user_message, stages, budget,
+                                                                                        user_id)
+            tier, model = self.model_router.route(user_message, crisis_level, emotional_state, therapy_approach,
+                                                  len(self.conversation_history))
             
-            # Generate response using Llama 3.1
-            ai_response = self._generate_response(prompt)
+            # Wait for a fair share of the generation slots; crisis turns are admitted at once
+            mark = time.perf_counter()
+            degraded = False
+            try:
+                with self.scheduler.slot(user_id or session_id, crisis=is_priority_crisis(crisis_level)):
+                    ai_response, llm_timings, tier, model, reason = self._call_llm(
+                        prompt, crisis_level, tier, model, budget["num_predict"])
+            except SchedulerTimeout:
+                ai_response, llm_timings, reason = None, None, "overloaded"
+            if ai_response is None:
+                ai_response = self._degraded_response(emotional_state, therapy_approach, crisis_level, reason)
+                degraded = True
+            now = time.perf_counter()
+            stages["llm"] = now - mark
+            STAGE_SECONDS.observe(stages["llm"], "llm")
+            if not degraded:
+                self.model_router.observe(tier, stages["llm"])
             
             # Store conversation
-            conversation_entry = {
-                "timestamp": datetime.now(),
-                "user_message": user_message,
-                "ai_response": ai_response,
-                "emotional_state": emotional_state.value,
-                "therapy_approach": therapy_approach.value,
-                "crisis_level": crisis_level
-            }
-            self.conversation_history.append(conversation_entry)
+            mark = now
+            self._record_exchange(user_message, ai_response, emotional_state, therapy_approach, crisis_level,
+                                  llm_timings, None if degraded else tier, user_id)
+            now = time.perf_counter()
+            stages["history_append"] = now - mark
+            stages["total"] = now - started
+            STAGE_SECONDS.observe(stages["history_append"], "history_append")
+            STAGE_SECONDS.observe(stages["total"], "total")
+            
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("chat_turn", extra={
+                    "user_message": user_message,
+                    "crisis_level": crisis_level,
+                    "emotional_state": emotional_state.value,
+                    "therapy_approach": therapy_approach.value,
+                    "model_tier": tier,
+                    "model": model,
+                    "num_predict": budget["num_predict"],
+                    "history_turns": budget["history_turns"],
+                    "stage_ms": {stage: round(seconds * 1000, 3) for stage, seconds in stages.items()},
+                    "llm_timings": llm_timings
+                })
             
             # Prepare response
             response = {
@@ -121,54 +235,186 @@ class ChatService:
                 "emotional_state": emotional_state.value,
                 "therapy_approach": therapy_approach.value,
                 "crisis_level": crisis_level,
-                "session_id": str(self.session_context["session_start"].timestamp())
+                "session_id": session_id
             }
+            if degraded:
+                response["degraded"] = True
             
             # Add crisis resources if needed
             if crisis_level == "high":
                 response["crisis_resources"] = self._get_crisis_resources()
             
             return response
+    
+    def _call_llm(self, prompt: str, crisis_level: str, tier: str, model: str,
+                  num_predict: int) -> Tuple[Optional[str], Optional[Dict], str, str, str]:
+        """
+        Generate with the routed model, or fail fast when the circuit is open
+        
+        Returns:
+            Response text (None on failure), timings, the tier and model that answered,
+            and the degraded reason to use if the text is None
+        """
+        if not self.circuit_breaker.allow_request():
+            return None, None, tier, model, "circuit_open"
+        priority = is_priority_crisis(crisis_level)
+        timeout = CRISIS_LLM_TIMEOUT if priority else 30
+        ai_response, llm_timings = self._generate_response(prompt, timeout=timeout, crisis=priority,
+                                                           model=model, num_predict=num_predict)
+        # A failing small model escalates to the large one before falling back to templates
+        if ai_response is None and tier == SMALL and self.circuit_breaker.allow_request():
+            TIER_ESCALATIONS.inc()
+            tier, model = LARGE, self.model_router.tiers[LARGE]
+            ai_response, llm_timings = self._generate_response(prompt, timeout=timeout, crisis=priority,
+                                                               model=model, num_predict=num_predict)
+        return ai_response, llm_timings, tier, model, "llm_error"
+    
+    def stream_message(self, user_message: str, user_id: str = None) -> Iterator[str]:
+        """
+        Process a user message and stream the therapeutic response as it is generated
+        
+        Used by the voice flow so speech synthesis can start before the reply
+        is complete. The exchange is recorded once the stream is exhausted.
+        
+        Args:
+            user_message: The user's message
+            user_id: Optional user identifier
             
-        except Exception as e:
-            logger.error(f"Error processing message: {e}")
-            return {
-                "message": "I'm having trouble processing your message right now. Please try again, and if you're in crisis, please contact a crisis helpline immediately.",
-                "error": str(e),
-                "crisis_level": "unknown"
-            }
+        Yields:
+            Response text fragments in generation order
+        """
+        with self.generation_budget.track():
+            budget: Dict = {}
+            crisis_level, emotional_state, therapy_approach, prompt = self._prepare_turn(user_message, budget=budget,
+                                                                                        user_id=user_id)
+            tier, model = self.model_router.route(user_message, crisis_level, emotional_state, therapy_approach,
+                                                  len(self.conversation_history))
+            
+            mark = time.perf_counter()
+            fragments = []
+            llm_timings: Dict = {}
+            try:
+                with self.scheduler.slot(user_id or self._session_id(), crisis=is_priority_crisis(crisis_level)):
+                    if self.circuit_breaker.allow_request():
+                        for fragment in self._stream_response(prompt, llm_timings, model=model,
+                                                              num_predict=budget["num_predict"]):
+                            fragments.append(fragment)
+                            yield fragment
+                        reason = "llm_error"
+                    else:
+                        reason = "circuit_open"
+            except SchedulerTimeout:
+                reason = "overloaded"
+            if not fragments:
+                fragments.append(self._degraded_response(emotional_state, therapy_approach, crisis_level, reason))
+                yield fragments[0]
+                tier = None
+        elapsed = time.perf_counter() - mark
+        STAGE_SECONDS.observe(elapsed, "llm")
+        if tier is not None:
+            self.model_router.observe(tier, elapsed)
+        
+        self._record_exchange(user_message, "".join(fragments), emotional_state, therapy_approach, crisis_level,
+                              llm_timings or None, tier, user_id)
     
-    def _detect_emotional_state(self, message: str) -> EmotionalState:
+    def _prepare_turn(self, user_message: str, stages: Optional[Dict[str, float]] = None,
+                      budget: Optional[Dict] = None,
+                      user_id: Optional[str] = None) -> Tuple[str, EmotionalState, TherapyApproach, str]:
         """
-        Simple emotion detection based on keywords
-        In production, use a proper emotion detection model
+        Run detection and approach selection, update the session context and build the prompt
+        
+        Args:
+            user_message: The user's message
+            stages: Optional dict filled with the seconds spent in each stage
+            budget: Optional dict filled with the generation budget planned for the turn
+            user_id: The requesting user; only the session owner gets their memories recalled
         """
-        message_lower = message.lower()
+        stages = {} if stages is None else stages
+        budget = {} if budget is None else budget
+        
+        # Detect crisis level
+        mark = time.perf_counter()
+        crisis_level = detect_crisis_level(user_message)
+        crisis_detected = crisis_level in ["high", "medium"]
+        now = time.perf_counter()
+        stages["crisis_detection"] = now - mark
+        STAGE_SECONDS.observe(stages["crisis_detection"], "crisis_detection")
+        
+        # Size the reply and prompt history to the current load; crisis turns keep the full budget
+        budget.update(self.generation_budget.plan(crisis=is_priority_crisis(crisis_level)))
+        
+        # Update session context
+        self.session_context["crisis_detected"] = crisis_detected
         
-        # Anxiety indicators
-        anxiety_keywords = ["anxious", "worried", "nervous", "stress", "panic", "fear", "scared"]
-        if any(keyword in message_lower for keyword in anxiety_keywords):
-            return EmotionalState.ANXIOUS
+        # Determine emotional state (simplified - in production, use emotion detection model)
+        mark = now
+        emotional_state = self._detect_emotional_state(user_message)
+        self.session_context["emotional_state"] = emotional_state
+        now = time.perf_counter()
+        stages["emotion_detection"] = now - mark
+        STAGE_SECONDS.observe(stages["emotion_detection"], "emotion_detection")
         
-        # Depression indicators
-        depression_keywords = ["sad", "depressed", "hopeless", "worthless", "tired", "exhausted", "empty"]
-        if any(keyword in message_lower for keyword in depression_keywords):
-            return EmotionalState.DEPRESSED
+        # Choose therapy approach based on context
+        mark = now
+        therapy_approach = self._choose_therapy_approach(user_message, emotional_state, crisis_detected)
+        self.session_context["therapy_approach"] = therapy_approach
+        now = time.perf_counter()
+        stages["approach_selection"] = now - mark
+        STAGE_SECONDS.observe(stages["approach_selection"], "approach_selection")
         
-        # Anger indicators
-        anger_keywords = ["angry", "furious", "mad", "frustrated", "irritated", "rage"]
-        if any(keyword in message_lower for keyword in anger_keywords):
-            return EmotionalState.ANGRY
+        # Recall relevant memories from the user's past sessions
+        mark = now
+        memories = self._recall_memories(user_message, user_id)
+        now = time.perf_counter()
+        stages["memory_retrieval"] = now - mark
+        STAGE_SECONDS.observe(stages["memory_retrieval"], "memory_retrieval")
         
-        # Overwhelmed indicators
-        overwhelmed_keywords = ["overwhelmed", "too much", "can't handle", "drowning", "swamped"]
-        if any(keyword in message_lower for keyword in overwhelmed_keywords):
-            return EmotionalState.OVERWHELMED
+        # Build contextual prompt
+        mark = now
+        prompt = self._build_therapeutic_prompt(user_message, emotional_state, therapy_approach, crisis_detected,
+                                                budget["history_turns"], memories)
+        stages["prompt_build"] = time.perf_counter() - mark
+        STAGE_SECONDS.observe(stages["prompt_build"], "prompt_build")
+        PROMPT_CHARS.observe(len(prompt))
+        
+        CRISIS_LEVELS.inc(crisis_level)
+        EMOTIONAL_STATES.inc(emotional_state.value)
+        THERAPY_APPROACHES.inc(therapy_approach.value)
+        
+        return crisis_level, emotional_state, therapy_approach, prompt
+    
+    def _record_exchange(self, user_message: str, ai_response: str, emotional_state: EmotionalState,
+                         therapy_approach: TherapyApproach, crisis_level: str,
+                         llm_timings: Optional[Dict] = None, model_tier: Optional[str] = None,
+                         user_id: Optional[str] = None) -> Dict:
+        """
+        Append a completed exchange to the conversation history
+        """
+        conversation_entry = {
+            "timestamp": datetime.now(),
+            "user_id": user_id,
+            "user_message": user_message,
+            "ai_response": ai_response,
+            "emotional_state": emotional_state.value,
+            "therapy_approach": therapy_approach.value,
+            "crisis_level": crisis_level,
+            "llm_timings": llm_timings,
+            "model_tier": model_tier
+        }
+        self.conversation_history.append(conversation_entry)
+        self.analytics.record_turn(self._session_id(), conversation_entry)
+        return conversation_entry
+    
+    def _detect_emotional_state(self, message: str) -> EmotionalState:
+        """
+        Simple emotion detection based on keywords
+        In production, use a proper emotion detection model
+        """
+        message_lower = message.lower()
         
-        # Hopeful indicators
-        hopeful_keywords = ["hope", "better", "improving", "progress", "optimistic", "positive"]
-        if any(keyword in message_lower for keyword in hopeful_keywords):
-            return EmotionalState.HOPEFUL
+        for emotional_state, keywords in EMOTION_KEYWORDS:
+            if any(keyword in message_lower for keyword in keywords):
+                return emotional_state
         
         return EmotionalState.NEUTRAL
     
@@ -192,14 +438,15 @@ class ChatService:
             return TherapyApproach.CBT
     
     def _build_therapeutic_prompt(self, user_message: str, emotional_state: EmotionalState, 
-                                therapy_approach: TherapyApproach, crisis_detected: bool) -> str:
+                                therapy_approach: TherapyApproach, crisis_detected: bool,
+                                history_turns: int = 3, memories: Optional[List[str]] = None) -> str:
         """
         Build comprehensive therapeutic prompt
         """
         # Get recent conversation context
         recent_context = ""
-        if self.conversation_history:
-            recent_exchanges = self.conversation_history[-3:]  # Last 3 exchanges
+        if self.conversation_history and history_turns > 0:
+            recent_exchanges = self.conversation_history[-history_turns:]  # Last exchanges, fewer under load
             for exchange in recent_exchanges:
                 recent_context += f"User: {exchange['user_message']}\n"
                 recent_context += f"Alex: {exchange['ai_response']}\n\n"
@@ -210,65 +457,205 @@ class ChatService:
             base_context=current_context,
             emotional_state=emotional_state,
             therapy_approach=therapy_approach,
+            session_history=memories,
             crisis_indicators=crisis_detected
         )
     
-    def _generate_response(self, prompt: str) -> str:
+    def _memory_owner(self, user_id: Optional[str]) -> Optional[str]:
+        """
+        The user whose memories a turn may use: the session owner, unless the request names someone else
+        """
+        owner = self.session_context.get("user_id")
+        return owner if user_id is None or user_id == owner else None
+    
+    def _recall_memories(self, user_message: str, user_id: Optional[str] = None) -> List[str]:
+        """
+        Memories from the user's past sessions relevant to the message, or their latest summary
+        """
+        user_id = self._memory_owner(user_id)
+        if not self.session_memory.has_user(user_id):
+            return []
+        records = self.session_memory.query(user_id, user_message, k=MEMORY_TOP_K)
+        if not records:
+            records = self.session_memory.recent(user_id, kind="summary")
+        return [record["text"] for record in records]
+    
+    def _remember_session(self) -> None:
         """
-        Generate response using Llama 3.1 via Ollama
+        Index a summary of the owner's turns and the most notable of them for the user's next sessions
         """
+        user_id = self.session_context.get("user_id")
+        if not user_id or self.session_context.get("remembered"):
+            return
+        # Turns sent under another user id belong to someone else and never reach the owner's memories
+        history = [entry for entry in self.conversation_history if self._memory_owner(entry.get("user_id")) == user_id]
+        if not history:
+            return
+        self.session_context["remembered"] = True
+        session_id = self._session_id()
+        started = self.session_context["session_start"].strftime("%Y-%m-%d")
+        self.session_memory.add(user_id, f"Session on {started}: {self._generate_session_summary(history)}",
+                                kind="summary", session_id=session_id)
+        notable = [entry for entry in history
+                   if entry["crisis_level"] != "none" or entry["emotional_state"] != EmotionalState.NEUTRAL.value]
+        for entry in notable[-MEMORY_TURNS_PER_SESSION:]:
+            self.session_memory.add(user_id, f"User felt {entry['emotional_state']}: {entry['user_message']}",
+                                    kind="turn", session_id=session_id)
+        self.session_memory.flush()
+    
+    def _generate_response(self, prompt: str, timeout: float = 30, crisis: bool = False,
+                           model: Optional[str] = None,
+                           num_predict: Optional[int] = None) -> Tuple[Optional[str], Optional[Dict]]:
+        """
+        Generate response via Ollama with the routed model, the large model by default
+        
+        The session id is sent as a routing affinity key so a backend pool keeps
+        the session's prompt cache warm; crisis turns are hedged across backends.
+        
+        Returns:
+            Response text and the generation timings Ollama reported; (None, None)
+            when the call failed, so the caller can fall back
+        """
+        started = time.perf_counter()
         try:
-            response = requests.post(
-                'http://localhost:11434/api/generate',
-                json={
-                    'model': self.model_name,
-                    'prompt': prompt,
-                    'stream': False,
-                    'options': {
-                        'temperature': 0.7,
-                        'top_p': 0.9,
-                        'max_tokens': 500
-                    }
-                },
-                timeout=30
-            )
+            result = self.llm_client.generate(model or self.model_name, prompt,
+                                              options=self._generation_options(num_predict),
+                                              timeout=timeout, keep_alive=self.keep_alive,
+                                              affinity_key=self._session_id(), hedge=crisis)
+            self.circuit_breaker.record_success(time.perf_counter() - started)
+            return result.get('response', 'I understand. Can you tell me more about that?'), self._record_timings(result)
             
-            if response.status_code == 200:
-                result = response.json()
-                return result.get('response', 'I understand. Can you tell me more about that?')
-            else:
-                logger.error(f"Ollama API error: {response.status_code}")
-                return "I'm having trouble connecting right now. Please try again."
-                
+        except requests.exceptions.HTTPError as e:
+            LLM_ERRORS.inc("http")
+            logger.error("Ollama API error: %s", e.response.status_code)
+        except requests.exceptions.Timeout as e:
+            LLM_TIMEOUTS.inc()
+            logger.error("Ollama request timed out: %s", e)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Connection error: {e}")
-            return "I'm unable to connect to my language model right now. Please try again later."
+            LLM_ERRORS.inc("connection")
+            logger.error("Connection error: %s", e)
+        self.circuit_breaker.record_failure()
+        return None, None
     
-    def _get_crisis_resources(self) -> Dict:
+    def _stream_response(self, prompt: str, timings: Optional[Dict] = None, model: Optional[str] = None,
+                         num_predict: Optional[int] = None) -> Iterator[str]:
         """
-        Get crisis intervention resources
+        Stream a response via Ollama, yielding text as tokens arrive
+        
+        Args:
+            prompt: Full prompt to send
+            timings: Optional dict filled with the generation timings from the final chunk
+            model: Model to use, the large model by default
+            num_predict: Token limit for the reply, the full budget by default
+        
+        Yields nothing more once the call fails; the caller falls back if no text arrived.
+        """
+        started = time.perf_counter()
+        try:
+            for chunk in self.llm_client.stream_generate(model or self.model_name, prompt,
+                                                         options=self._generation_options(num_predict), timeout=30,
+                                                         keep_alive=self.keep_alive,
+                                                         affinity_key=self._session_id()):
+                if chunk.get('response'):
+                    yield chunk['response']
+                if chunk.get('done'):
+                    recorded = self._record_timings(chunk)
+                    if recorded and timings is not None:
+                        timings.update(recorded)
+            self.circuit_breaker.record_success(time.perf_counter() - started)
+            return
+        except GeneratorExit:
+            # Consumer stopped reading; the backend was answering, so this is not a failure
+            self.circuit_breaker.record_success(time.perf_counter() - started)
+            raise
+                    
+        except requests.exceptions.HTTPError as e:
+            LLM_ERRORS.inc("http")
+            logger.error("Ollama API error: %s", e.response.status_code)
+        except requests.exceptions.Timeout as e:
+            LLM_TIMEOUTS.inc()
+            logger.error("Ollama request timed out: %s", e)
+        except (requests.exceptions.RequestException, RuntimeError) as e:
+            LLM_ERRORS.inc("connection")
+            logger.error("Connection error: %s", e)
+        self.circuit_breaker.record_failure()
+    
+    def _session_id(self) -> str:
+        return str(self.session_context["session_start"].timestamp())
+    
+    def _degraded_response(self, emotional_state: EmotionalState, therapy_approach: TherapyApproach,
+                           crisis_level: str, reason: str) -> str:
+        """
+        Template reply for a turn the LLM could not answer
+        """
+        DEGRADED_RESPONSES.inc(reason)
+        return self.degraded_responder.respond(emotional_state, therapy_approach, crisis_level)
+    
+    def _record_timings(self, result: Dict) -> Optional[Dict]:
+        """
+        Convert the timing fields of a completed Ollama response and export them as metrics
+        
+        Ollama reports durations in nanoseconds; a response without eval_count
+        (e.g. from an older server or a stub) yields None.
+        """
+        if "eval_count" not in result:
+            return None
+        
+        prompt_tokens = result.get("prompt_eval_count", 0)
+        generated_tokens = result.get("eval_count", 0)
+        prompt_seconds = result.get("prompt_eval_duration", 0) / 1e9
+        generation_seconds = result.get("eval_duration", 0) / 1e9
+        load_seconds = result.get("load_duration", 0) / 1e9
+        timings = {
+            "prompt_tokens": prompt_tokens,
+            "generated_tokens": generated_tokens,
+            "prompt_eval_ms": round(prompt_seconds * 1000, 3),
+            "eval_ms": round(generation_seconds * 1000, 3),
+            "load_ms": round(load_seconds * 1000, 3),
+            "total_ms": round(result.get("total_duration", 0) / 1e6, 3),
+            "prompt_tokens_per_second": round(prompt_tokens / prompt_seconds, 2) if prompt_seconds else None,
+            "generation_tokens_per_second": round(generated_tokens / generation_seconds, 2) if generation_seconds else None,
+            "cold_load": load_seconds >= COLD_LOAD_SECONDS
+        }
+        
+        LLM_PROMPT_TOKENS.observe(prompt_tokens)
+        LLM_GENERATED_TOKENS.observe(generated_tokens)
+        LLM_LOAD_SECONDS.observe(load_seconds)
+        if timings["prompt_tokens_per_second"] is not None:
+            LLM_PROMPT_RATE.observe(timings["prompt_tokens_per_second"])
+        if timings["generation_tokens_per_second"] is not None:
+            LLM_GENERATION_RATE.observe(timings["generation_tokens_per_second"])
+        if timings["cold_load"]:
+            LLM_COLD_LOADS.inc()
+        self.generation_budget.observe(timings)
+        return timings
+    
+    def _generation_options(self, num_predict: Optional[int] = None) -> Dict:
+        """
+        Sampling options sent with every generation request
+        
+        Ollama limits reply length with num_predict (it ignores max_tokens).
         """
         return {
-            "emergency_contacts": {
-                "national_suicide_prevention": "988",
-                "crisis_text_line": "Text HOME to 741741",
-                "emergency_services": "911"
-            },
-            "immediate_actions": [
-                "Remove any means of self-harm from your environment",
-                "Contact a trusted friend or family member",
-                "Go to the nearest emergency room if you're in immediate danger",
-                "Call 988 for immediate crisis support"
-            ],
-            "safety_plan": "Consider creating a safety plan with a mental health professional"
+            'temperature': 0.7,
+            'top_p': 0.9,
+            'num_predict': num_predict or self.generation_budget.max_predict
         }
     
+    def _get_crisis_resources(self) -> Dict:
+        """
+        Get crisis intervention resources
+        """
+        return copy.deepcopy(CRISIS_RESOURCES)
+    
     def end_session(self) -> Dict:
         """
         End the current therapy session and provide summary
         """
-        # Generate session summary
+        # Generate session summary and keep it, with the notable turns, for the user's next session
         session_summary = self._generate_session_summary()
+        self._remember_session()
+        self._export_session()
         
         # Get closing message
         closing_message = self.therapy_prompts.get_prompt("closing_prompts", "session_summary")
@@ -281,16 +668,34 @@ class ChatService:
             "emotional_states_observed": self._get_emotional_state_summary()
         }
     
-    def _generate_session_summary(self) -> str:
+    def _export_session(self) -> None:
+        """
+        Append the session's metadata row to the analytics store, once per session
+        """
+        if self.session_context.get("exported"):
+            return
+        self.session_context["exported"] = True
+        emotional_counts = self._get_emotional_state_summary()
+        self.analytics.record_session(
+            self._session_id(),
+            started=self.session_context["session_start"],
+            ended=datetime.now(),
+            turns=len(self.conversation_history),
+            crisis_turns=sum(1 for entry in self.conversation_history if entry["crisis_level"] != "none"),
+            primary_emotion=max(emotional_counts, key=emotional_counts.get) if emotional_counts else "neutral"
+        )
+    
+    def _generate_session_summary(self, history: Optional[List[Dict]] = None) -> str:
         """
-        Generate a summary of the therapy session
+        Generate a summary of the therapy session, or of the given subset of its turns
         """
-        if not self.conversation_history:
+        history = self.conversation_history if history is None else history
+        if not history:
             return "Session ended without any conversation."
         
         # Count different emotional states
         emotional_counts = {}
-        for entry in self.conversation_history:
+        for entry in history:
             emotion = entry["emotional_state"]
             emotional_counts[emotion] = emotional_counts.get(emotion, 0) + 1
         
@@ -298,13 +703,13 @@ class ChatService:
         primary_emotion = max(emotional_counts.items(), key=lambda x: x[1])[0] if emotional_counts else "neutral"
         
         # Count crisis mentions
-        crisis_count = sum(1 for entry in self.conversation_history if entry["crisis_level"] != "none")
+        crisis_count = sum(1 for entry in history if entry["crisis_level"] != "none")
         
         summary = f"Session focused on {primary_emotion} experiences. "
         if crisis_count > 0:
             summary += f"Crisis indicators were detected {crisis_count} times. "
         
-        summary += f"Total of {len(self.conversation_history)} exchanges occurred."
+        summary += f"Total of {len(history)} exchanges occurred."
         
         return summary
     
@@ -329,7 +734,47 @@ class ChatService:
             "current_emotional_state": self.session_context["emotional_state"].value,
             "current_therapy_approach": self.session_context["therapy_approach"].value,
             "crisis_detected": self.session_context["crisis_detected"],
-            "emotional_states_observed": self._get_emotional_state_summary()
+            "emotional_states_observed": self._get_emotional_state_summary(),
+            "llm_timings": self._get_llm_timing_summary(),
+            "model_tiers": self._get_model_tier_summary(),
+            "generation_budget": self.generation_budget.snapshot(),
+            "scheduler": self.scheduler.snapshot()
+        }
+    
+    def _get_model_tier_summary(self) -> Dict:
+        """
+        Turns per model tier in the current session, plus the process-wide routing share
+        """
+        session_turns: Dict[str, int] = {}
+        for entry in self.conversation_history:
+            if entry.get("model_tier"):
+                session_turns[entry["model_tier"]] = session_turns.get(entry["model_tier"], 0) + 1
+        return {"session_turns": session_turns, "router": self.model_router.snapshot()}
+    
+    def _get_llm_timing_summary(self) -> Dict:
+        """
+        Aggregate the per-turn generation timings of the current session
+        
+        Throughputs are token-weighted (total tokens over total time), so one
+        short reply does not skew the session figure.
+        """
+        measured = [entry["llm_timings"] for entry in self.conversation_history if entry.get("llm_timings")]
+        prompt_tokens = sum(t["prompt_tokens"] for t in measured)
+        generated_tokens = sum(t["generated_tokens"] for t in measured)
+        prompt_ms = sum(t["prompt_eval_ms"] for t in measured)
+        eval_ms = sum(t["eval_ms"] for t in measured)
+        cold_loads = sum(1 for t in measured if t["cold_load"])
+        
+        return {
+            "turns_measured": len(measured),
+            "prompt_tokens": prompt_tokens,
+            "generated_tokens": generated_tokens,
+            "avg_prompt_tokens": round(prompt_tokens / len(measured), 1) if measured else 0.0,
+            "prompt_tokens_per_second": round(prompt_tokens / (prompt_ms / 1000), 2) if prompt_ms else None,
+            "generation_tokens_per_second": round(generated_tokens / (eval_ms / 1000), 2) if eval_ms else None,
+            "load_ms_total": round(sum(t["load_ms"] for t in measured), 3),
+            "cold_loads": cold_loads,
+            "cold_load_rate": round(cold_loads / len(measured), 3) if measured else 0.0
         }
 
 # Example usage
@@ -0,0 +1,136 @@
+"""
+Circuit breaker for the LLM backend
+Tracks failures and slow calls over a rolling window of recent requests;
+when either rate crosses its threshold the circuit opens and callers fail
+fast to a degraded reply instead of waiting out the request timeout.
+After a cool-down a limited number of half-open probes decide whether to
+close the circuit again
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+from ..utils.metrics import REGISTRY
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = REGISTRY.gauge(
+    "llm_circuit_state", "LLM circuit breaker state (0 closed, 1 half-open, 2 open)", labels=("circuit",))
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    "llm_circuit_transitions_total", "Circuit breaker state changes", labels=("circuit", "to"))
+CIRCUIT_REJECTED = REGISTRY.counter(
+    "llm_circuit_rejected_total", "Calls failed fast because the circuit was open", labels=("circuit",))
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker
+
+    Args:
+        name: Label used in metrics
+        window_size: Number of recent calls the rates are computed over
+        min_calls: Calls needed in the window before the circuit may open
+        failure_rate: Fraction of failed calls that opens the circuit
+        slow_call_seconds: Calls slower than this count as slow
+        slow_call_rate: Fraction of slow calls that opens the circuit
+        open_seconds: Cool-down before half-open probes are allowed
+        half_open_probes: Successful probes needed to close the circuit
+    """
+
+    def __init__(self, name: str = "llm", window_size: int = 20, min_calls: int = 5,
+                 failure_rate: float = 0.5, slow_call_seconds: float = 15.0, slow_call_rate: float = 0.8,
+                 open_seconds: float = 15.0, half_open_probes: int = 2):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self._calls: deque = deque(maxlen=window_size)  # (failed, slow) per call
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(0, name)
+
+    def allow_request(self) -> bool:
+        """
+        Whether a call may go to the backend now; half-open admits one probe at a time
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    CIRCUIT_REJECTED.inc(self.name)
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= 1:
+                    CIRCUIT_REJECTED.inc(self.name)
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def record_success(self, duration: float) -> None:
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                if slow:
+                    self._trip()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._calls.clear()
+                    self._transition(CLOSED)
+                return
+            self._calls.append((False, slow))
+            self._evaluate()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                self._trip()
+                return
+            self._calls.append((True, False))
+            self._evaluate()
+
+    def _evaluate(self) -> None:
+        if self.state != CLOSED or len(self._calls) < self.min_calls:
+            return
+        failures = sum(1 for failed, _ in self._calls if failed)
+        slow = sum(1 for _, is_slow in self._calls if is_slow)
+        if failures / len(self._calls) >= self.failure_rate or slow / len(self._calls) >= self.slow_call_rate:
+            self._trip()
+
+    def _trip(self) -> None:
+        self._opened_at = time.monotonic()
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        CIRCUIT_STATE.set(_STATE_VALUES[state], self.name)
+        CIRCUIT_TRANSITIONS.inc(self.name, state)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            calls = len(self._calls)
+            return {
+                "state": self.state,
+                "window_calls": calls,
+                "failure_rate": round(sum(1 for f, _ in self._calls if f) / calls, 3) if calls else 0.0,
+                "slow_call_rate": round(sum(1 for _, s in self._calls if s) / calls, 3) if calls else 0.0,
+                "seconds_until_probe": round(max(self.open_seconds - (time.monotonic() - self._opened_at), 0.0), 3)
+                if self.state == OPEN else 0.0
+            }
@@ -0,0 +1,57 @@
+"""
+Template replies used when the LLM is unavailable
+Builds a short, safe response from the TherapyPrompts library without
+calling the model: crisis prompts for at-risk turns, otherwise an
+emotion-specific reflection followed by a technique from the chosen
+therapy approach
+"""
+
+from typing import Optional
+
+from ..utils.therapy_prompts import EmotionalState, TherapyApproach, TherapyPrompts
+
+# Techniques per approach whose templates need no placeholders
+APPROACH_TECHNIQUES = {
+    TherapyApproach.CBT: "behavioral_activation",
+    TherapyApproach.DBT: "distress_tolerance",
+    TherapyApproach.HUMANISTIC: "unconditional_positive_regard",
+    TherapyApproach.SOLUTION_FOCUSED: "exception_finding",
+    TherapyApproach.MINDFULNESS: "present_moment"
+}
+
+CRISIS_SEQUENCES = {
+    "high": ("immediate_safety", "professional_referral"),
+    "medium": ("de_escalation", "safety_planning")
+}
+
+
+class DegradedResponder:
+    """
+    Model-free fallback replies built from TherapyPrompts
+    """
+
+    def __init__(self, therapy_prompts: Optional[TherapyPrompts] = None):
+        self.therapy_prompts = therapy_prompts or TherapyPrompts()
+
+    def respond(self, emotional_state: EmotionalState, therapy_approach: TherapyApproach,
+                crisis_level: str = "none") -> str:
+        """
+        Build a fallback reply for the turn
+
+        Args:
+            emotional_state: Detected emotional state
+            therapy_approach: Approach chosen for the turn
+            crisis_level: Detected crisis level; 'high' and 'medium' get crisis prompts
+
+        Returns:
+            Reply text
+        """
+        if crisis_level in CRISIS_SEQUENCES:
+            return " ".join(self.therapy_prompts.get_crisis_intervention_prompt(category)
+                            for category in CRISIS_SEQUENCES[crisis_level])
+
+        reply = self.therapy_prompts.get_emotional_response(emotional_state)
+        technique = APPROACH_TECHNIQUES.get(therapy_approach)
+        if technique:
+            reply += " " + self.therapy_prompts.get_therapeutic_response(therapy_approach, technique)
+        return reply
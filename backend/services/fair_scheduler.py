@@ -0,0 +1,174 @@
+"""
+Weighted fair queuing for LLM generation slots
+Limits concurrent generations to the backend's serving capacity and,
+when turns have to wait, hands freed slots out by start-time fair queuing:
+each turn is tagged with a virtual finish time that grows with how much
+its user already has queued, divided by the user's weight. A client that
+fires many turns at once only gets its fair share of slots while other
+users are waiting. Crisis turns skip the queue and are admitted at once;
+background work (batch jobs) only uses slots no interactive turn wants
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from ..utils.metrics import REGISTRY
+from .generation_budget import DEFAULT_CAPACITY
+
+SCHEDULER_QUEUE_DEPTH = REGISTRY.gauge("chat_scheduler_queue_depth", "Turns waiting for a generation slot")
+SCHEDULER_WAIT_SECONDS = REGISTRY.histogram(
+    "chat_scheduler_wait_seconds", "Time turns waited for a generation slot")
+SCHEDULER_ADMITTED = REGISTRY.counter(
+    "chat_scheduler_admitted_total", "Turns given a generation slot, by path", labels=("path",))
+SCHEDULER_TIMEOUTS = REGISTRY.counter(
+    "chat_scheduler_timeouts_total", "Turns that gave up waiting for a generation slot")
+
+
+class SchedulerTimeout(Exception):
+    """Raised when a turn waits longer than the scheduler timeout for a slot"""
+
+
+class FairScheduler:
+    """
+    Slot gate with per-user weighted fair queuing
+
+    Args:
+        slots: Concurrent generations allowed
+        weights: Per-key weights, 1.0 for keys not listed; a weight of 2 gets twice the share
+        timeout: Seconds a turn waits for a slot before SchedulerTimeout
+        background_reserve: Slots background work leaves free for interactive turns arriving
+    """
+
+    def __init__(self, slots: int = DEFAULT_CAPACITY, weights: Optional[Dict[str, float]] = None,
+                 timeout: float = 60.0, background_reserve: Optional[int] = None):
+        self.slots = max(slots, 1)
+        self.weights = dict(weights or {})
+        self.timeout = timeout
+        if background_reserve is None:
+            background_reserve = 1 if self.slots > 1 else 0
+        self.background_slots = self.slots - background_reserve
+        self.active = 0
+        self._virtual_time = 0.0
+        self._finish: Dict[str, float] = {}
+        self._pending: Counter = Counter()
+        # [background, finish tag, sequence, start tag, key, event]; event None marks a cancelled entry.
+        # Background entries sort after every interactive one
+        self._queue: List[list] = []
+        self._waiting = 0
+        self._waiting_interactive = 0
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, key: str, crisis: bool = False, cost: float = 1.0, background: bool = False,
+             timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Hold a generation slot for the block
+
+        Args:
+            key: Fairness key, the user id or session
+            crisis: Admit immediately, even above the slot limit
+            cost: Work the turn represents in the fair share
+            background: Run only on capacity no interactive turn is waiting for
+            timeout: Seconds to wait for a slot, the scheduler default when None
+        """
+        self._acquire(key, crisis, cost, background, self.timeout if timeout is None else timeout)
+        try:
+            yield
+        finally:
+            self._release(key)
+
+    def _acquire(self, key: str, crisis: bool, cost: float, background: bool, timeout: float) -> None:
+        with self._lock:
+            self._pending[key] += 1
+            if crisis:
+                # Crisis turns are neither queued nor charged to the user's share
+                self.active += 1
+                SCHEDULER_ADMITTED.inc("crisis")
+                return
+            start = max(self._virtual_time, self._finish.get(key, 0.0))
+            finish = start + cost / self.weights.get(key, 1.0)
+            self._finish[key] = finish
+            if background:
+                free = self.active < self.background_slots and not self._waiting
+            else:
+                free = self.active < self.slots and not self._waiting_interactive
+            if free:
+                self.active += 1
+                self._virtual_time = max(self._virtual_time, start)
+                SCHEDULER_ADMITTED.inc("background" if background else "immediate")
+                return
+            entry = [background, finish, next(self._sequence), start, key, threading.Event()]
+            heapq.heappush(self._queue, entry)
+            self._waiting += 1
+            if not background:
+                self._waiting_interactive += 1
+            SCHEDULER_QUEUE_DEPTH.set(self._waiting)
+
+        event = entry[5]
+        started = time.perf_counter()
+        granted = event.wait(timeout)
+        if not granted:
+            with self._lock:
+                granted = event.is_set()
+                if not granted:
+                    entry[5] = None
+                    self._dequeued(entry)
+                    self._forget(key)
+        SCHEDULER_WAIT_SECONDS.observe(time.perf_counter() - started)
+        if not granted:
+            SCHEDULER_TIMEOUTS.inc()
+            raise SchedulerTimeout(f"no generation slot within {timeout:.0f}s")
+        SCHEDULER_ADMITTED.inc("queued_background" if background else "queued")
+
+    def _release(self, key: str) -> None:
+        with self._lock:
+            self.active -= 1
+            self._forget(key)
+            while self._queue and self.active < self.slots:
+                entry = self._queue[0]
+                if entry[5] is not None and entry[0] and self.active >= self.background_slots:
+                    # Only background work is left and the reserved slots stay free for interactive turns
+                    break
+                heapq.heappop(self._queue)
+                if entry[5] is None:
+                    continue
+                self._virtual_time = max(self._virtual_time, entry[3])
+                self.active += 1
+                self._dequeued(entry)
+                entry[5].set()
+            if not self.active and not self._waiting:
+                # Nothing contends for slots, so past shares no longer matter
+                self._finish.clear()
+            elif len(self._finish) > 2 * (len(self._pending) + self.slots) + 64:
+                self._finish = {k: f for k, f in self._finish.items()
+                                if k in self._pending or f > self._virtual_time}
+
+    def _dequeued(self, entry: list) -> None:
+        self._waiting -= 1
+        if not entry[0]:
+            self._waiting_interactive -= 1
+        SCHEDULER_QUEUE_DEPTH.set(self._waiting)
+
+    def _forget(self, key: str) -> None:
+        # Drop per-user state once the user has nothing queued or running and is not ahead of the clock
+        self._pending[key] -= 1
+        if self._pending[key] <= 0:
+            del self._pending[key]
+            if self._finish.get(key, 0.0) <= self._virtual_time:
+                self._finish.pop(key, None)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "active": self.active,
+                "waiting": self._waiting,
+                "waiting_interactive": self._waiting_interactive,
+                "users_tracked": len(self._pending)
+            }
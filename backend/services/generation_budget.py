@@ -0,0 +1,143 @@
+"""
+SLO-driven generation budget
+Sizes each turn's `num_predict` and the number of history exchanges in the
+prompt from how loaded the LLM is: the turns in flight against its serving
+capacity, plus smoothed generation throughput and service time taken from
+the timings Ollama reports. When a queue forms, replies get shorter so
+queued turns still finish inside the latency objective. Crisis turns
+always get the full budget
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from ..utils.metrics import REGISTRY
+
+# Concurrent generations the backend serves without queueing (OLLAMA_NUM_PARALLEL times backends)
+DEFAULT_CAPACITY = int(os.environ.get("LLM_CAPACITY", "4"))
+
+BUDGET_NUM_PREDICT = REGISTRY.histogram(
+    "chat_budget_num_predict", "num_predict chosen per turn",
+    buckets=(32, 64, 96, 128, 192, 256, 320, 400, 512))
+BUDGET_IN_FLIGHT = REGISTRY.gauge("chat_llm_in_flight", "Turns currently waiting on the LLM")
+BUDGET_REDUCED = REGISTRY.counter(
+    "chat_budget_reduced_total", "Turns given less than the full generation budget")
+
+
+class GenerationBudget:
+    """
+    Per-turn generation limits that shrink under load
+
+    While every turn has a serving slot the full budget is used. Once a
+    queue forms, the expected queueing delay is the queue beyond `capacity`
+    times the smoothed service time per turn, spread over the serving slots;
+    whatever is left of the SLO after that delay and prompt evaluation is
+    converted into tokens at the smoothed generation rate. num_ctx is deliberately
+    left alone, because changing it makes Ollama reload the model; the
+    prompt is shortened by including fewer history exchanges instead.
+
+    Args:
+        slo_seconds: Target LLM latency per turn
+        max_predict: num_predict when the system is idle, and always for crisis turns
+        min_predict: Floor for num_predict under overload
+        max_history: History exchanges in the prompt when idle
+        min_history: History exchanges in the prompt under overload
+        capacity: Concurrent generations served without queueing
+        headroom: Fraction of the remaining SLO spent on generation
+        alpha: Smoothing factor for the throughput and service time averages
+        initial_rate: Generation tokens/sec assumed before the first measurement
+    """
+
+    def __init__(self, slo_seconds: float = 8.0, max_predict: int = 500, min_predict: int = 64,
+                 max_history: int = 3, min_history: int = 1, capacity: int = DEFAULT_CAPACITY,
+                 headroom: float = 0.8, alpha: float = 0.2, initial_rate: float = 30.0):
+        self.slo_seconds = slo_seconds
+        self.max_predict = max_predict
+        self.min_predict = min_predict
+        self.max_history = max_history
+        self.min_history = min_history
+        self.capacity = max(capacity, 1)
+        self.headroom = headroom
+        self.alpha = alpha
+
+        self.generation_rate = initial_rate
+        self.prompt_seconds = 0.0
+        self.service_seconds = max_predict / initial_rate
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """
+        Count a turn as in flight while the block runs
+        """
+        with self._lock:
+            self.in_flight += 1
+            BUDGET_IN_FLIGHT.set(self.in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                BUDGET_IN_FLIGHT.set(self.in_flight)
+
+    def plan(self, crisis: bool = False) -> Dict:
+        """
+        Limits for the next turn; call inside track() so the turn counts itself
+
+        Returns:
+            num_predict, history_turns and the load figures they were derived from
+        """
+        with self._lock:
+            in_flight = self.in_flight
+            rate, prompt_seconds, service_seconds = self.generation_rate, self.prompt_seconds, self.service_seconds
+
+        queued = max(in_flight - self.capacity, 0)
+        expected_wait = queued * service_seconds / self.capacity
+        if crisis or not queued:
+            num_predict = self.max_predict
+        else:
+            available = max(self.slo_seconds - expected_wait - prompt_seconds, 0.0)
+            num_predict = int(available * rate * self.headroom)
+            num_predict = min(max(num_predict, self.min_predict), self.max_predict)
+
+        span = self.max_predict - self.min_predict
+        pressure = (self.max_predict - num_predict) / span if span else 0.0
+        history_turns = round(self.max_history - pressure * (self.max_history - self.min_history))
+
+        BUDGET_NUM_PREDICT.observe(num_predict)
+        if num_predict < self.max_predict:
+            BUDGET_REDUCED.inc()
+        return {
+            "num_predict": num_predict,
+            "history_turns": history_turns,
+            "in_flight": in_flight,
+            "expected_wait_seconds": round(expected_wait, 3),
+            "generation_rate": round(rate, 2)
+        }
+
+    def observe(self, timings: Optional[Dict]) -> None:
+        """
+        Fold a completed turn's Ollama timings into the smoothed averages
+        """
+        if not timings:
+            return
+        service = (timings["prompt_eval_ms"] + timings["eval_ms"] + timings["load_ms"]) / 1000
+        with self._lock:
+            if timings.get("generation_tokens_per_second"):
+                self.generation_rate += self.alpha * (timings["generation_tokens_per_second"] - self.generation_rate)
+            self.prompt_seconds += self.alpha * (timings["prompt_eval_ms"] / 1000 - self.prompt_seconds)
+            self.service_seconds += self.alpha * (service - self.service_seconds)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "capacity": self.capacity,
+                "generation_rate": round(self.generation_rate, 2),
+                "prompt_seconds": round(self.prompt_seconds, 3),
+                "service_seconds": round(self.service_seconds, 3),
+                "slo_seconds": self.slo_seconds
+            }
@@ -0,0 +1,175 @@
+"""
+Idempotency keys for chat turns
+A retried request carrying the same key attaches to the generation still
+in flight, or replays the stored result while it is within its TTL,
+instead of generating (and recording) the turn again. The generation runs
+as its own task, so a client that times out and disconnects does not
+cancel the work its retry is about to attach to. With a shared cache, a
+completed result is also replayed when the retry lands on another worker.
+
+In-process state lives on the event loop thread and needs no locking. The
+shared cache is a memory-mapped file behind an flock: a lookup blocks the
+loop for microseconds, so run() does at most one per request, and only
+when the key is neither stored nor in flight locally and its result would
+be stored. A shared cache that cannot be used acts as an empty one
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from ..utils.metrics import REGISTRY
+from .shared_cache import SharedLRU
+
+COMPUTED = "computed"
+REPLAYED = "replayed"
+ATTACHED = "attached"
+CONFLICT = "conflict"
+# Not counted as an outcome: the admit hook turned the request away before any work
+REJECTED = "rejected"
+
+IDEMPOTENCY_REQUESTS = REGISTRY.counter(
+    "idempotency_requests_total", "Chat requests checked for duplicates, by outcome", labels=("outcome",))
+IDEMPOTENCY_DUPLICATE_RATIO = REGISTRY.gauge(
+    "idempotency_duplicate_ratio", "Fraction of checked chat requests answered without a new generation")
+
+
+class IdempotencyConflict(Exception):
+    """Raised when a key is reused for a different request body"""
+
+
+def fingerprint(*parts: Optional[str]) -> str:
+    """
+    Stable digest of the request fields a key must match
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class IdempotencyCache:
+    """
+    In-flight generations plus a bounded TTL cache of completed results
+
+    Args:
+        ttl_seconds: How long a completed result can be replayed
+        max_entries: Upper bound on stored results; the oldest are dropped first
+        shared: Cross-worker cache completed results are also stored in
+    """
+
+    def __init__(self, ttl_seconds: float = 600.0, max_entries: int = 10000, shared: Optional[SharedLRU] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.shared = shared
+        # key -> (fingerprint, expires at, result), in insertion order, which is also expiry order
+        self._results: "OrderedDict[str, Tuple[str, float, Dict]]" = OrderedDict()
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._outcomes: Dict[str, int] = {COMPUTED: 0, REPLAYED: 0, ATTACHED: 0, CONFLICT: 0}
+
+    def __contains__(self, key: str) -> bool:
+        # True when this worker would attach or replay a request with this key; the shared cache is not consulted
+        self._expire(time.monotonic())
+        return key in self._in_flight or key in self._results
+
+    async def run(self, key: str, request_fingerprint: str, compute: Callable[[], Awaitable[Dict]],
+                  store: bool = True,
+                  cacheable: Callable[[Dict], bool] = lambda result: True,
+                  admit: Callable[[], bool] = lambda: True) -> Tuple[Optional[Dict], str]:
+        """
+        Return the result for `key`, computing it only if no equal request is in flight or stored
+
+        Args:
+            key: Idempotency key, already scoped to the client
+            request_fingerprint: Digest of the request body the key was first used with
+            compute: Coroutine factory producing the result
+            store: Keep the result for replay after completion; False only suppresses concurrent duplicates
+            cacheable: Whether a completed result may be stored (errors should be retried, not replayed)
+            admit: Called only when the request would be computed, e.g. a rate limit duplicates do not pay
+
+        Returns:
+            The result and the outcome: computed, replayed or attached; (None, rejected) when admit said no
+
+        Raises:
+            IdempotencyConflict: The key was used with a different request body
+        """
+        self._expire(time.monotonic())
+
+        stored = self._results.get(key)
+        in_flight = self._in_flight.get(key)
+        if store and stored is None and in_flight is None:
+            # Keys that are never stored (double-submit guards) cannot be in the shared cache either
+            stored = self._shared_result(key)
+        if stored is not None:
+            self._check(stored[0], request_fingerprint)
+            self._count(REPLAYED)
+            return stored[2], REPLAYED
+
+        if in_flight is not None:
+            self._check(in_flight[0], request_fingerprint)
+            self._count(ATTACHED)
+            return await asyncio.shield(in_flight[1]), ATTACHED
+
+        if not admit():
+            return None, REJECTED
+        task = asyncio.ensure_future(compute())
+        self._in_flight[key] = (request_fingerprint, task)
+        self._count(COMPUTED)
+        task.add_done_callback(lambda done: self._complete(key, request_fingerprint, done, store, cacheable))
+        return await asyncio.shield(task), COMPUTED
+
+    def _complete(self, key: str, request_fingerprint: str, task: asyncio.Future, store: bool,
+                  cacheable: Callable[[Dict], bool]) -> None:
+        self._in_flight.pop(key, None)
+        if not store or task.cancelled() or task.exception() is not None or not cacheable(task.result()):
+            return
+        self._results[key] = (request_fingerprint, time.monotonic() + self.ttl_seconds, task.result())
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        if self.shared is not None:
+            # Wall-clock expiry: monotonic clocks are not comparable between processes
+            self.shared.put(key, json.dumps([request_fingerprint, time.time() + self.ttl_seconds,
+                                             task.result()]).encode("utf-8"))
+
+    def _shared_result(self, key: str) -> Optional[Tuple[str, float, Dict]]:
+        raw = self.shared.get(key) if self.shared is not None else None
+        if raw is None:
+            return None
+        request_fingerprint, expires_at, result = json.loads(raw)
+        return (request_fingerprint, expires_at, result) if expires_at > time.time() else None
+
+    def _check(self, expected: str, actual: str) -> None:
+        if expected != actual:
+            self._count(CONFLICT)
+            raise IdempotencyConflict("Idempotency key was already used with a different request")
+
+    def _expire(self, now: float) -> None:
+        while self._results:
+            key, (_, expires_at, _) = next(iter(self._results.items()))
+            if expires_at > now:
+                break
+            del self._results[key]
+
+    def _count(self, outcome: str) -> None:
+        self._outcomes[outcome] += 1
+        IDEMPOTENCY_REQUESTS.inc(outcome)
+        IDEMPOTENCY_DUPLICATE_RATIO.set(self.duplicate_ratio)
+
+    @property
+    def duplicate_ratio(self) -> float:
+        total = sum(self._outcomes.values())
+        return (self._outcomes[REPLAYED] + self._outcomes[ATTACHED]) / total if total else 0.0
+
+    def snapshot(self) -> Dict:
+        return {
+            "stored": len(self._results),
+            "in_flight": len(self._in_flight),
+            "shared": self.shared.snapshot() if self.shared is not None else None,
+            "outcomes": dict(self._outcomes),
+            "duplicate_ratio": round(self.duplicate_ratio, 3)
+        }
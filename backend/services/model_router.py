@@ -0,0 +1,135 @@
+"""
+Model cascade for chat turns
+Picks a model tier per turn from the signals the chat service already
+computes (crisis level, emotional state, therapy approach, message length
+and how long the session has run). Light check-ins and neutral small talk
+go to a small, fast model; crisis and emotionally heavy or long turns go to
+the large one, so its capacity is kept for the turns that need it
+"""
+
+import os
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+from ..utils.metrics import REGISTRY
+from ..utils.therapy_prompts import EmotionalState, TherapyApproach
+
+SMALL = "small"
+LARGE = "large"
+
+DEFAULT_LARGE_MODEL = "llama3.1:8b-instruct-q4_0"
+# Unset disables the cascade: every turn goes to the large model
+DEFAULT_SMALL_MODEL = os.environ.get("SMALL_CHAT_MODEL", "")
+
+TIER_TURNS = REGISTRY.counter("chat_model_tier_total", "Turns routed to each model tier", labels=("tier", "reason"))
+TIER_SECONDS = REGISTRY.histogram("chat_model_tier_seconds", "LLM latency per model tier", labels=("tier",))
+TIER_SHARE = REGISTRY.gauge("chat_model_tier_share", "Fraction of routed turns sent to each tier", labels=("tier",))
+TIER_ESCALATIONS = REGISTRY.counter(
+    "chat_model_escalations_total", "Small-tier calls that failed and were retried on the large model")
+
+
+class RoutingPolicy:
+    """
+    Rules that send a turn to the large model; everything else goes to the small one
+
+    Args:
+        large_crisis_levels: Crisis levels always answered by the large model
+        large_emotional_states: Emotional states that need the large model
+        large_approaches: Therapy approaches that need the large model
+        long_message_chars: Messages at least this long count as complex
+        deep_session_turns: Turns into a session after which non-neutral turns use the large model
+    """
+
+    def __init__(self, large_crisis_levels: Iterable[str] = ("high", "medium", "low"),
+                 large_emotional_states: Iterable[EmotionalState] = (EmotionalState.DEPRESSED,
+                                                                     EmotionalState.OVERWHELMED),
+                 large_approaches: Iterable[TherapyApproach] = (TherapyApproach.CRISIS_INTERVENTION,),
+                 long_message_chars: int = 280, deep_session_turns: int = 6):
+        self.large_crisis_levels = set(large_crisis_levels)
+        self.large_emotional_states = set(large_emotional_states)
+        self.large_approaches = set(large_approaches)
+        self.long_message_chars = long_message_chars
+        self.deep_session_turns = deep_session_turns
+
+    def choose(self, user_message: str, crisis_level: str, emotional_state: EmotionalState,
+               therapy_approach: TherapyApproach, history_turns: int = 0) -> Tuple[str, str]:
+        """
+        Pick the tier for a turn
+
+        Returns:
+            Tier name and the rule that decided it
+        """
+        if crisis_level in self.large_crisis_levels:
+            return LARGE, "crisis"
+        if therapy_approach in self.large_approaches:
+            return LARGE, "approach"
+        if emotional_state in self.large_emotional_states:
+            return LARGE, "emotional_state"
+        if len(user_message) >= self.long_message_chars:
+            return LARGE, "long_message"
+        if emotional_state != EmotionalState.NEUTRAL and history_turns >= self.deep_session_turns:
+            return LARGE, "deep_session"
+        return SMALL, "simple"
+
+
+class ModelRouter:
+    """
+    Map turns to models through a RoutingPolicy and track per-tier share
+
+    Args:
+        large_model: Model for crisis and complex turns
+        small_model: Model for simple turns; empty routes everything to the large model
+        policy: Routing rules, the defaults when omitted
+    """
+
+    def __init__(self, large_model: str = DEFAULT_LARGE_MODEL, small_model: str = DEFAULT_SMALL_MODEL,
+                 policy: Optional[RoutingPolicy] = None):
+        self.tiers = {LARGE: large_model}
+        if small_model and small_model != large_model:
+            self.tiers[SMALL] = small_model
+        self.policy = policy or RoutingPolicy()
+        self._turns: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return SMALL in self.tiers
+
+    @property
+    def models(self):
+        return list(self.tiers.values())
+
+    def route(self, user_message: str, crisis_level: str, emotional_state: EmotionalState,
+              therapy_approach: TherapyApproach, history_turns: int = 0) -> Tuple[str, str]:
+        """
+        Pick the model for a turn and count the decision
+
+        Returns:
+            Tier name and model name
+        """
+        if self.enabled:
+            tier, reason = self.policy.choose(user_message, crisis_level, emotional_state, therapy_approach,
+                                              history_turns)
+        else:
+            tier, reason = LARGE, "single_tier"
+        TIER_TURNS.inc(tier, reason)
+        with self._lock:
+            self._turns[tier] += 1
+            total = sum(self._turns.values())
+            for name in (SMALL, LARGE):
+                TIER_SHARE.set(self._turns[name] / total, name)
+        return tier, self.tiers[tier]
+
+    def observe(self, tier: str, seconds: float) -> None:
+        TIER_SECONDS.observe(seconds, tier)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            total = sum(self._turns.values())
+            return {
+                "enabled": self.enabled,
+                "tiers": dict(self.tiers),
+                "turns": dict(self._turns),
+                "share": {tier: round(count / total, 3) for tier, count in self._turns.items()} if total else {}
+            }
@@ -0,0 +1,180 @@
+"""
+Model preload and warm-keeping for the chat backend
+Loads the configured models into Ollama at startup, primes the system
+prompt prefix with a one-token generation, and keeps the models resident
+with periodic keep_alive refreshes so the first turn after a deploy or a
+quiet period does not pay the model load inside the request timeout
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+from ..models.llm_handler import OllamaClient, DEFAULT_KEEP_ALIVE
+from ..utils.durations import parse_duration
+from ..utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+MODEL_READY = REGISTRY.gauge("llm_model_ready", "1 once a model is loaded and warmed", labels=("model",))
+KEEPER_REFRESHES = REGISTRY.counter(
+    "llm_keepalive_refreshes_total", "keep_alive refreshes sent by the warm keeper", labels=("outcome",))
+
+# Startup loads can take well over the per-turn timeout on a cold disk
+LOAD_TIMEOUT = 300
+
+
+class ModelWarmer:
+    """
+    Preloads models, primes their prompt cache and keeps them loaded
+
+    Args:
+        llm_client: Client for the Ollama server
+        models: Models to load; the first is the chat model, the only one readiness waits for
+        system_prompt: Prompt prefix every turn starts with, evaluated once so it is cached
+        keep_alive: How long Ollama keeps a model loaded after a request
+        refresh_interval: Seconds between keeper refreshes; defaults to half of keep_alive
+    """
+
+    def __init__(self, llm_client: OllamaClient, models: List[str], system_prompt: str = "",
+                 keep_alive=DEFAULT_KEEP_ALIVE, refresh_interval: Optional[float] = None):
+        self.llm_client = llm_client
+        self.models = list(models)
+        self.system_prompt = system_prompt
+        self.keep_alive = keep_alive
+        keep_alive_seconds = parse_duration(keep_alive)
+        if refresh_interval is None:
+            # A negative keep_alive keeps models loaded forever; refresh rarely to notice server restarts
+            refresh_interval = keep_alive_seconds / 2 if keep_alive_seconds > 0 else 600
+        self.refresh_interval = max(refresh_interval, 0.05)
+        self.status: Dict[str, Dict] = {
+            model: {"available": False, "loaded": False, "warm": False, "load_ms": None,
+                    "warmup_ms": None, "error": None}
+            for model in self.models
+        }
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        # The chat model can answer every turn; others (e.g. a small tier that is not pulled) only speed some up
+        return bool(self.models) and self.status[self.models[0]]["warm"]
+
+    @property
+    def all_warm(self) -> bool:
+        return bool(self.models) and all(state["warm"] for state in self.status.values())
+
+    def check_available(self) -> List[str]:
+        """
+        Mark which configured models the server has, via /api/tags
+
+        Returns:
+            Configured models missing from the server
+        """
+        available = set(self.llm_client.list_models())
+        missing = []
+        for model in self.models:
+            self.status[model]["available"] = model in available
+            if model not in available:
+                missing.append(model)
+        if missing:
+            logger.warning("Models not found on the Ollama server: %s", missing)
+        return missing
+
+    def warm_model(self, model: str) -> bool:
+        """
+        Load `model` and evaluate the system prompt so later turns reuse its cache
+        """
+        state = self.status[model]
+        try:
+            # An empty prompt only loads the model
+            started = time.perf_counter()
+            self.llm_client.generate(model, "", timeout=LOAD_TIMEOUT, keep_alive=self.keep_alive)
+            state["loaded"] = True
+            state["load_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+            started = time.perf_counter()
+            self.llm_client.generate(model, self.system_prompt + "\n\nUser: Hello\nAlex:",
+                                     options={"num_predict": 1}, timeout=LOAD_TIMEOUT,
+                                     keep_alive=self.keep_alive)
+            state["warmup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            state["warm"] = True
+            state["error"] = None
+            MODEL_READY.set(1, model)
+            logger.info("Model warm", extra={"model": model, "load_ms": state["load_ms"],
+                                             "warmup_ms": state["warmup_ms"]})
+            return True
+        except requests.exceptions.RequestException as e:
+            state["warm"] = False
+            state["error"] = str(e)
+            MODEL_READY.set(0, model)
+            logger.error("Warmup failed for %s: %s", model, e)
+            return False
+
+    def warm(self) -> bool:
+        """
+        Check availability and warm every available model that is not warm yet
+
+        Returns:
+            True when all configured models are warm
+        """
+        try:
+            missing = self.check_available()
+        except requests.exceptions.RequestException as e:
+            logger.error("Ollama not reachable for warmup: %s", e)
+            for state in self.status.values():
+                state["error"] = str(e)
+            return False
+        for model in self.models:
+            if model in missing:
+                self.status[model]["error"] = "model not available"
+            elif not self.status[model]["warm"]:
+                self.warm_model(model)
+        return self.all_warm
+
+    def refresh(self) -> None:
+        """
+        Reset each model's keep_alive timer, re-warming models that fell out
+        """
+        for model, state in self.status.items():
+            if not state["warm"]:
+                continue
+            try:
+                self.llm_client.generate(model, "", timeout=LOAD_TIMEOUT, keep_alive=self.keep_alive)
+                KEEPER_REFRESHES.inc("ok")
+            except requests.exceptions.RequestException as e:
+                KEEPER_REFRESHES.inc("error")
+                state["warm"] = False
+                state["error"] = str(e)
+                MODEL_READY.set(0, model)
+                logger.error("keep_alive refresh failed for %s: %s", model, e)
+        if not self.all_warm:
+            self.warm()
+
+    def start(self) -> "ModelWarmer":
+        """
+        Warm in the background, then keep refreshing until stop()
+        """
+        self._thread = threading.Thread(target=self._run, name="model-warmer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        if not self.warm():
+            # Retry quickly until the first warmup succeeds, then settle into the refresh cadence
+            while not self._stop.wait(min(self.refresh_interval, 10)) and not self.warm():
+                pass
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+
+    def readiness(self) -> Dict:
+        return {"ready": self.ready, "all_warm": self.all_warm, "keep_alive": self.keep_alive,
+                "models": self.status}
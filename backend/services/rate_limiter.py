@@ -0,0 +1,100 @@
+"""
+Per-client token-bucket rate limiting
+Buckets are refilled lazily on each check, so a check is O(1) with no
+background timer. Idle buckets expire once they would have refilled
+completely, which is indistinguishable from a fresh bucket, so expiry
+never lets a client burst more than it could anyway
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from ..utils.metrics import REGISTRY
+
+# Sustained chat turns per minute per client, and the burst allowed on top
+DEFAULT_RATE_PER_MINUTE = float(os.environ.get("CHAT_RATE_PER_MINUTE", "20"))
+DEFAULT_BURST = float(os.environ.get("CHAT_RATE_BURST", "10"))
+
+RATE_LIMIT_THROTTLED = REGISTRY.counter(
+    "rate_limit_throttled_total", "Requests rejected by the per-client rate limiter", labels=("scope",))
+RATE_LIMIT_CRISIS_BYPASS = REGISTRY.counter(
+    "rate_limit_crisis_bypass_total", "Over-limit requests let through because they carried crisis language",
+    labels=("scope",))
+RATE_LIMIT_BUCKETS = REGISTRY.gauge("rate_limit_buckets", "Active client buckets", labels=("scope",))
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket per key (user id, session or client address)
+
+    Args:
+        rate_per_minute: Sustained requests per minute per key
+        burst: Bucket size, the requests a key can make at once after being idle
+        max_keys: Upper bound on tracked keys; the longest-idle bucket is dropped first
+        scope: Label used in metrics
+    """
+
+    def __init__(self, rate_per_minute: float = DEFAULT_RATE_PER_MINUTE, burst: float = DEFAULT_BURST,
+                 max_keys: int = 100000, scope: str = "chat"):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self.scope = scope
+        # A bucket idle this long is full again and can be forgotten
+        self.idle_seconds = burst / self.rate if self.rate > 0 else float("inf")
+        # key -> [tokens, last refill time], oldest access first
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        """
+        Take `cost` tokens from the key's bucket if it has them
+
+        Returns:
+            Whether the request is allowed, and the seconds until it would be when not
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [self.burst, now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                self._buckets.move_to_end(key)
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                allowed, retry_after = True, 0.0
+            else:
+                allowed = False
+                retry_after = (cost - bucket[0]) / self.rate if self.rate > 0 else float("inf")
+            RATE_LIMIT_BUCKETS.set(len(self._buckets), self.scope)
+
+        if not allowed:
+            RATE_LIMIT_THROTTLED.inc(self.scope)
+        return allowed, retry_after
+
+    def _expire(self, now: float) -> None:
+        # Buckets are kept in access order, so only the front can be idle; amortised O(1)
+        while self._buckets:
+            key, (_, last) = next(iter(self._buckets.items()))
+            if now - last < self.idle_seconds:
+                break
+            del self._buckets[key]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "scope": self.scope,
+                "rate_per_minute": self.rate * 60,
+                "burst": self.burst,
+                "buckets": len(self._buckets)
+            }
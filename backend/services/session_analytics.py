@@ -0,0 +1,432 @@
+"""
+Columnar export of conversation metadata for clinical reporting
+Every turn and every ended session is appended as one row of typed,
+fixed-width columns: one raw little-endian file per column, partitioned by
+UTC day (`turns/day=2024-05-01/llm_ms.f4`). Enum columns are stored as
+one-byte codes into append-only dictionaries kept in schema.json. Message
+text is never exported. Queries read only the columns and day partitions
+they need and aggregate with NumPy group-bys. Workers sharing a directory
+take an flock on a partition for each flush, and on the store for each
+dictionary change, so rows stay aligned and codes mean the same everywhere
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..utils.therapy_prompts import EmotionalState, TherapyApproach
+
+# Export is opt-in; without a directory nothing is recorded
+DEFAULT_ANALYTICS_DIR = os.environ.get("ANALYTICS_DIR", "")
+
+SCHEMA_FILE = "schema.json"
+LOCK_FILE = ".lock"
+SECONDS_PER_DAY = 86400
+
+# Column name -> dtype per table; u1 columns listed in DICTIONARIES hold dictionary codes
+TABLES: Dict[str, Dict[str, str]] = {
+    "turns": {
+        "ts": "<f8",
+        "session": "<u8",
+        "emotional_state": "u1",
+        "therapy_approach": "u1",
+        "crisis_level": "u1",
+        "model_tier": "u1",
+        "degraded": "u1",
+        "llm_ms": "<f4",
+        "prompt_tokens": "<u4",
+        "generated_tokens": "<u4",
+    },
+    "sessions": {
+        "ts": "<f8",
+        "session": "<u8",
+        "duration_seconds": "<f4",
+        "turns": "<u4",
+        "crisis_turns": "<u4",
+        "primary_emotion": "u1",
+    },
+}
+
+DICTIONARIES: Dict[str, List[str]] = {
+    "emotional_state": [state.value for state in EmotionalState],
+    "primary_emotion": [state.value for state in EmotionalState],
+    "therapy_approach": [approach.value for approach in TherapyApproach],
+    "crisis_level": ["none", "medium", "high"],
+    "model_tier": ["", "small", "large"],
+}
+
+# Columns derived from the timestamp that can be grouped by
+TIME_BUCKETS = {"day": SECONDS_PER_DAY, "hour": 3600}
+AGGREGATES = ("count", "sum", "mean", "min", "max", "distinct")
+
+Timestamp = Union[float, str, datetime, None]
+
+
+def session_key(session_id: str) -> int:
+    """
+    Pseudonymous 64-bit key for a session id; sessions can be counted and joined but not read back
+    """
+    return int.from_bytes(hashlib.blake2b(session_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _epoch(value: Timestamp) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _column_file(partition: str, column: str, dtype: str) -> str:
+    # e.g. llm_ms.f4, so the files are readable with np.fromfile without the schema
+    dtype = np.dtype(dtype)
+    return os.path.join(partition, f"{column}.{dtype.kind}{dtype.itemsize}")
+
+
+@contextmanager
+def _exclusive(directory: str) -> Iterator[None]:
+    # Closing the lock file releases the flock, also when the worker dies holding it
+    with open(os.path.join(directory, LOCK_FILE), "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+
+
+def _partition_day(name: str) -> Optional[int]:
+    if not name.startswith("day="):
+        return None
+    day = datetime.strptime(name[4:], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return int(day.timestamp()) // SECONDS_PER_DAY
+
+
+class SessionAnalytics:
+    """
+    Append-only columnar store of turn and session metadata with a group-by query API
+
+    Args:
+        directory: Root of the store; empty disables recording
+        flush_rows: Buffered rows per table before they are written out
+    """
+
+    def __init__(self, directory: str = DEFAULT_ANALYTICS_DIR, flush_rows: int = 4096):
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.dictionaries = {column: list(values) for column, values in DICTIONARIES.items()}
+        self._codes = {column: {value: code for code, value in enumerate(values)}
+                       for column, values in self.dictionaries.items()}
+        self._buffers: Dict[str, Dict[str, list]] = {table: {column: [] for column in columns}
+                                                     for table, columns in TABLES.items()}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            with _exclusive(directory):
+                self._load_schema()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def _load_schema(self) -> None:
+        path = os.path.join(self.directory, SCHEMA_FILE)
+        if not os.path.exists(path):
+            self._write_schema()
+            return
+        with open(path, encoding="utf-8") as handle:
+            schema = json.load(handle)
+        # Stored dictionaries win: codes already on disk must keep their meaning
+        for column, values in schema.get("dictionaries", {}).items():
+            self.dictionaries[column] = values + [v for v in self.dictionaries.get(column, []) if v not in values]
+            self._codes[column] = {value: code for code, value in enumerate(self.dictionaries[column])}
+
+    def _write_schema(self) -> None:
+        path = os.path.join(self.directory, SCHEMA_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as handle:
+            json.dump({"version": 1, "tables": TABLES, "dictionaries": self.dictionaries}, handle, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def _encode(self, column: str, value: Optional[str]) -> int:
+        value = value or ""
+        code = self._codes[column].get(value)
+        if code is None:
+            with _exclusive(self.directory):
+                # Another worker may have added this value, or taken the next code, since the schema was read
+                self._load_schema()
+                code = self._codes[column].get(value)
+                if code is None:
+                    if len(self.dictionaries[column]) > 255:
+                        raise ValueError(f"too many distinct values for {column}")
+                    code = len(self.dictionaries[column])
+                    self.dictionaries[column].append(value)
+                    self._codes[column][value] = code
+                    self._write_schema()
+        return code
+
+    def record_turn(self, session_id: str, entry: Dict) -> None:
+        """
+        Buffer one conversation entry (see ChatService._record_exchange); the message text is not kept
+        """
+        if not self.enabled:
+            return
+        timings = entry.get("llm_timings") or {}
+        with self._lock:
+            self._append("turns", {
+                "ts": entry["timestamp"].timestamp(),
+                "session": session_key(session_id),
+                "emotional_state": self._encode("emotional_state", entry["emotional_state"]),
+                "therapy_approach": self._encode("therapy_approach", entry["therapy_approach"]),
+                "crisis_level": self._encode("crisis_level", entry["crisis_level"]),
+                "model_tier": self._encode("model_tier", entry.get("model_tier")),
+                "degraded": entry.get("model_tier") is None,
+                "llm_ms": timings.get("total_ms", np.nan),
+                "prompt_tokens": timings.get("prompt_tokens", 0),
+                "generated_tokens": timings.get("generated_tokens", 0),
+            })
+
+    def record_session(self, session_id: str, started: datetime, ended: datetime, turns: int,
+                       crisis_turns: int, primary_emotion: str) -> None:
+        """
+        Buffer one ended session and flush, so a session's rows are on disk once it ends
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._append("sessions", {
+                "ts": ended.timestamp(),
+                "session": session_key(session_id),
+                "duration_seconds": (ended - started).total_seconds(),
+                "turns": turns,
+                "crisis_turns": crisis_turns,
+                "primary_emotion": self._encode("primary_emotion", primary_emotion),
+            })
+            self._flush()
+
+    def _append(self, table: str, row: Dict) -> None:
+        buffer = self._buffers[table]
+        for column, value in row.items():
+            buffer[column].append(value)
+        if len(buffer["ts"]) >= self.flush_rows:
+            self._flush_table(table)
+
+    def flush(self) -> None:
+        if self.enabled:
+            with self._lock:
+                self._flush()
+
+    def _flush(self) -> None:
+        for table in TABLES:
+            self._flush_table(table)
+
+    def _flush_table(self, table: str) -> None:
+        buffer = self._buffers[table]
+        if not buffer["ts"]:
+            return
+        columns = {column: np.asarray(values, dtype=TABLES[table][column]) for column, values in buffer.items()}
+        for values in buffer.values():
+            values.clear()
+        days = (columns["ts"] // SECONDS_PER_DAY).astype(np.int64)
+        for day in np.unique(days):
+            rows = days == day
+            partition = os.path.join(self.directory, table, "day=" + datetime.fromtimestamp(
+                int(day) * SECONDS_PER_DAY, tz=timezone.utc).strftime("%Y-%m-%d"))
+            os.makedirs(partition, exist_ok=True)
+            paths = {column: _column_file(partition, column, dtype) for column, dtype in TABLES[table].items()}
+            # Other workers append to the same partition: their rows must not interleave with ours column by column
+            with _exclusive(partition):
+                # Drop the tail of a flush cut short, so this one starts aligned in every column
+                stored = {column: os.path.getsize(path) if os.path.exists(path) else 0
+                          for column, path in paths.items()}
+                aligned = min(size // np.dtype(TABLES[table][column]).itemsize for column, size in stored.items())
+                for column, values in columns.items():
+                    with open(paths[column], "ab") as handle:
+                        end = aligned * values.itemsize
+                        if stored[column] > end:
+                            handle.truncate(end)
+                        values[rows].tofile(handle)
+
+    def load(self, table: str, columns: Iterable[str], since: Timestamp = None,
+             until: Timestamp = None) -> Dict[str, np.ndarray]:
+        """
+        Read `columns` of `table`, skipping day partitions outside [since, until)
+
+        Returns:
+            One array per column, rows aligned; dictionary columns as codes
+        """
+        schema = TABLES[table]
+        columns = list(dict.fromkeys(["ts"] + list(columns)))
+        since, until = _epoch(since), _epoch(until)
+        self.flush()
+        parts: Dict[str, List[np.ndarray]] = {column: [] for column in columns}
+        root = os.path.join(self.directory, table)
+        for name in sorted(os.listdir(root)) if self.enabled and os.path.isdir(root) else []:
+            day = _partition_day(name)
+            if day is None or (since is not None and (day + 1) * SECONDS_PER_DAY <= since) or \
+                    (until is not None and day * SECONDS_PER_DAY >= until):
+                continue
+            paths = {column: _column_file(os.path.join(root, name), column, dtype) for column, dtype in schema.items()}
+            # A flush cut short leaves some columns longer; only rows present in every column count
+            rows = min(os.path.getsize(path) // np.dtype(schema[column]).itemsize if os.path.exists(path) else 0
+                       for column, path in paths.items())
+            if not rows:
+                continue
+            for column in columns:
+                parts[column].append(np.fromfile(paths[column], dtype=schema[column], count=rows))
+        data = {column: np.concatenate(chunks) if chunks else np.empty(0, schema[column])
+                for column, chunks in parts.items()}
+        mask = np.ones(len(data["ts"]), dtype=bool)
+        if since is not None:
+            mask &= data["ts"] >= since
+        if until is not None:
+            mask &= data["ts"] < until
+        return data if mask.all() else {column: values[mask] for column, values in data.items()}
+
+    def query(self, table: str, group_by: Sequence[str] = (), aggregates: Sequence[str] = (),
+              since: Timestamp = None, until: Timestamp = None,
+              where: Optional[Dict[str, Union[str, Sequence[str]]]] = None) -> List[Dict]:
+        """
+        Vectorized group-by over one table
+
+        Args:
+            table: "turns" or "sessions"
+            group_by: Columns to group by, plus "day" / "hour" buckets of the timestamp
+            aggregates: "column:function" with function one of count, sum, mean, min, max, distinct;
+                every group also gets a row "count". NaN values (turns without timings) are skipped
+            since: Inclusive lower bound (epoch seconds, ISO string or datetime, UTC when naive)
+            until: Exclusive upper bound
+            where: Column -> allowed value or values; dictionary columns take their string values
+
+        Returns:
+            One dict per group, ordered by the group keys
+
+        Raises:
+            ValueError: Unknown table, column or aggregate
+        """
+        if table not in TABLES:
+            raise ValueError(f"unknown table {table!r}")
+        schema = TABLES[table]
+        where = where or {}
+        specs = [self._aggregate_spec(schema, spec) for spec in aggregates]
+        for column in list(group_by) + list(where):
+            if column not in schema and column not in TIME_BUCKETS:
+                raise ValueError(f"unknown column {column!r} in {table}")
+        needed = [c for c in group_by if c in schema] + [c for c in where if c in schema] + \
+                 [column for column, _ in specs if column]
+        data = self.load(table, needed, since, until)
+        if self.enabled:
+            # Rows flushed by other workers may carry dictionary codes this one has not seen yet
+            with self._lock, _exclusive(self.directory):
+                self._load_schema()
+
+        mask = np.ones(len(data["ts"]), dtype=bool)
+        for column, allowed in where.items():
+            allowed = [allowed] if isinstance(allowed, str) else list(allowed)
+            if column in self._codes:
+                allowed = [self._codes[column][value] for value in allowed if value in self._codes[column]]
+            values = self._column(data, column)
+            mask &= np.isin(values, np.asarray(allowed, dtype=values.dtype))
+        if not mask.all():
+            data = {column: values[mask] for column, values in data.items()}
+
+        # Factorize each key column, then combine the factors into one integer key per row
+        group_keys, key = [], np.zeros(len(data["ts"]), dtype=np.int64)
+        for column in group_by:
+            uniques, inverse = self._factorize(column, self._column(data, column))
+            group_keys.append((column, uniques))
+            key = key * len(uniques) + inverse
+        key_space = int(np.prod([len(uniques) for _, uniques in group_keys], dtype=np.float64))
+        if key_space <= max(4 * len(key), 1 << 16):
+            # Small key space: find the groups present with a counting pass instead of a sort
+            combined = np.flatnonzero(np.bincount(key, minlength=key_space))
+            remap = np.zeros(key_space, dtype=np.int64)
+            remap[combined] = np.arange(len(combined))
+            groups = remap[key]
+        else:
+            combined, groups = np.unique(key, return_inverse=True)
+        size = len(combined)
+
+        result = {"count": np.bincount(groups, minlength=size)}
+        for column, function in specs:
+            if column:
+                result[f"{column}_{function}"] = self._aggregate(data[column], groups, size, function)
+
+        rows = []
+        for group in range(size):
+            row: Dict = {}
+            remainder = combined[group]
+            for column, uniques in reversed(group_keys):
+                remainder, index = divmod(int(remainder), len(uniques))
+                row[column] = self._decode(column, uniques[index])
+            row = {column: row[column] for column in group_by}
+            for name, values in result.items():
+                value = values[group].item()
+                row[name] = None if isinstance(value, float) and np.isnan(value) else value
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def _aggregate_spec(schema: Dict[str, str], spec: str) -> Tuple[str, str]:
+        column, _, function = spec.partition(":")
+        if spec == "count":
+            return "", "count"
+        if column not in schema or function not in AGGREGATES:
+            raise ValueError(f"unknown aggregate {spec!r}; use column:{'|'.join(AGGREGATES)}")
+        return column, function
+
+    def _factorize(self, column: str, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Dictionary codes and time buckets are dense already; only other columns need sorting
+        if column in self.dictionaries:
+            return np.arange(len(self.dictionaries[column])), values.astype(np.int64)
+        if column in TIME_BUCKETS and len(values):
+            first = int(values.min())
+            return np.arange(first, int(values.max()) + 1), values - first
+        return np.unique(values, return_inverse=True)
+
+    @staticmethod
+    def _column(data: Dict[str, np.ndarray], column: str) -> np.ndarray:
+        if column in TIME_BUCKETS:
+            return (data["ts"] // TIME_BUCKETS[column]).astype(np.int64)
+        return data[column]
+
+    @staticmethod
+    def _aggregate(values: np.ndarray, groups: np.ndarray, size: int, function: str) -> np.ndarray:
+        if function == "distinct":
+            uniques, inverse = np.unique(values, return_inverse=True)
+            pairs = np.unique(groups * max(len(uniques), 1) + inverse)
+            return np.bincount(pairs // max(len(uniques), 1), minlength=size)
+        valid = ~np.isnan(values) if values.dtype.kind == "f" else np.ones(len(values), dtype=bool)
+        groups, values = groups[valid], values[valid]
+        if function == "count":
+            return np.bincount(groups, minlength=size)
+        if function in ("sum", "mean"):
+            totals = np.bincount(groups, weights=values.astype(np.float64), minlength=size)
+            if function == "sum":
+                return totals
+            counts = np.bincount(groups, minlength=size)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return totals / counts
+        out = np.full(size, np.inf if function == "min" else -np.inf)
+        (np.minimum if function == "min" else np.maximum).at(out, groups, values.astype(np.float64))
+        out[np.isinf(out)] = np.nan
+        return out
+
+    def _decode(self, column: str, value) -> Union[str, int, float]:
+        if column in TIME_BUCKETS:
+            moment = datetime.fromtimestamp(int(value) * TIME_BUCKETS[column], tz=timezone.utc)
+            return moment.strftime("%Y-%m-%d" if column == "day" else "%Y-%m-%dT%H:00")
+        if column in self.dictionaries:
+            return self.dictionaries[column][int(value)]
+        return value.item()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "buffered": {table: len(buffer["ts"]) for table, buffer in self._buffers.items()}
+            }
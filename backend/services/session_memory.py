@@ -0,0 +1,241 @@
+"""
+Retrieval over past sessions for returning users
+Session summaries and notable turns are embedded with a hashed-feature
+embedding (words and word bigrams hashed into a fixed number of signed
+buckets), so no model or GPU is needed and vectors are stable across
+processes. Vectors live in one float32 matrix, memory-mapped from disk
+when a directory is configured, and each user's rows are scored with a
+single matrix-vector product. Workers sharing a directory append under an
+flock on the record file, whose line count is the authority for the next
+row, and pick up each other's memories before every read
+"""
+
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Persistence is opt-in: stored memories contain what users said
+DEFAULT_MEMORY_DIR = os.environ.get("SESSION_MEMORY_DIR", "")
+
+VECTOR_FILE = "vectors.f32"
+RECORD_FILE = "records.jsonl"
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+class HashedEmbedder:
+    """
+    Signed feature hashing of unigrams and bigrams into `dim` buckets
+
+    Args:
+        dim: Embedding size; collisions fall as it grows
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        L2-normalised float32 vector for `text`; all zeros when it has no words
+        """
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            # Low bits pick the bucket, the top bit the sign, so collisions tend to cancel out
+            vector[digest % self.dim] += 1.0 if digest & 0x80000000 else -1.0
+        # Sublinear term frequency, so a repeated word does not dominate the vector
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+
+class SessionMemoryIndex:
+    """
+    Per-user vector index of session memories
+
+    Args:
+        directory: Where vectors and records persist; empty keeps the index in memory
+        dim: Embedding size
+        initial_capacity: Rows allocated up front; the matrix doubles when full
+    """
+
+    def __init__(self, directory: str = DEFAULT_MEMORY_DIR, dim: int = 512, initial_capacity: int = 1024):
+        self.directory = directory
+        self.embedder = HashedEmbedder(dim)
+        self.dim = dim
+        self.count = 0
+        # Bytes of the record file already read into _records
+        self._records_offset = 0
+        self._records: List[Dict] = []
+        self._user_rows: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+            self._vectors = self._open(max(initial_capacity, self.count))
+        else:
+            self._vectors = np.zeros((initial_capacity, dim), dtype=np.float32)
+
+    def _load(self) -> None:
+        path = os.path.join(self.directory, RECORD_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as handle:
+            fcntl.flock(handle, fcntl.LOCK_SH)
+            self._catch_up(handle)
+
+    def _catch_up(self, handle) -> int:
+        """
+        Read records appended since the last read, by this or another process
+
+        Returns:
+            Bytes of an unfinished last line, left by a writer that died mid-append
+        """
+        handle.seek(self._records_offset)
+        data = handle.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            self._user_rows.setdefault(record["user_id"], []).append(len(self._records))
+            self._records.append(record)
+        self._records_offset += end
+        self.count = len(self._records)
+        return len(data) - end
+
+    def _refresh(self) -> None:
+        # Pick up memories other workers added; their vectors are already in the shared file
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, RECORD_FILE)
+        try:
+            if os.path.getsize(path) == self._records_offset:
+                return
+        except FileNotFoundError:
+            return
+        with self._lock, open(path, "rb") as handle:
+            fcntl.flock(handle, fcntl.LOCK_SH)
+            self._catch_up(handle)
+            if self.count > len(self._vectors):
+                self._vectors = self._open(self.count)
+
+    def _open(self, capacity: int) -> np.memmap:
+        path = os.path.join(self.directory, VECTOR_FILE)
+        size = capacity * self.dim * 4
+        with open(path, "ab") as handle:
+            if handle.tell() < size:
+                handle.truncate(size)
+        rows = os.path.getsize(path) // (self.dim * 4)
+        return np.memmap(path, dtype=np.float32, mode="r+", shape=(rows, self.dim))
+
+    def _grow(self) -> None:
+        capacity = max(len(self._vectors) * 2, self.count + 1)
+        if self.directory:
+            self._vectors.flush()
+            self._vectors = self._open(capacity)
+        else:
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:self.count] = self._vectors[:self.count]
+            self._vectors = grown
+
+    def add(self, user_id: str, text: str, kind: str = "turn", **metadata) -> int:
+        """
+        Embed and store one memory for `user_id`
+
+        Args:
+            user_id: Owner of the memory; queries only ever see their own rows
+            text: Memory text that is embedded and returned by queries
+            kind: "summary" or "turn"
+            **metadata: Extra JSON-serialisable fields kept with the record
+
+        Returns:
+            Row of the new memory
+        """
+        vector = self.embedder.embed(text)
+        record = {"user_id": user_id, "kind": kind, "text": text, "created": time.time(), **metadata}
+        with self._lock:
+            if not self.directory:
+                return self._append(vector, record)
+            with open(os.path.join(self.directory, RECORD_FILE), "a+b") as handle:
+                # One writer at a time across processes; the record file, not this process, decides the row
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                if self._catch_up(handle):
+                    handle.truncate(self._records_offset)
+                row = self._append(vector, record)
+                line = (json.dumps(record) + "\n").encode("utf-8")
+                handle.write(line)
+                handle.flush()
+                self._records_offset += len(line)
+        return row
+
+    def _append(self, vector: np.ndarray, record: Dict) -> int:
+        if self.count >= len(self._vectors):
+            self._grow()
+        row = self.count
+        # The vector is in place before its record line, so readers never see a record without one
+        self._vectors[row] = vector
+        self._records.append(record)
+        self._user_rows.setdefault(record["user_id"], []).append(row)
+        self.count += 1
+        return row
+
+    def flush(self) -> None:
+        if self.directory:
+            with self._lock:
+                self._vectors.flush()
+
+    def has_user(self, user_id: Optional[str]) -> bool:
+        if not user_id:
+            return False
+        self._refresh()
+        return user_id in self._user_rows
+
+    def query(self, user_id: str, text: str, k: int = 3, min_score: float = 0.1) -> List[Dict]:
+        """
+        Top-k memories of `user_id` by cosine similarity to `text`
+
+        Returns:
+            Records with a "score" field, best first; only scores of at least `min_score`
+        """
+        self._refresh()
+        rows = self._user_rows.get(user_id)
+        if not rows:
+            return []
+        query = self.embedder.embed(text)
+        with self._lock:
+            row_index = np.fromiter(rows, dtype=np.int64, count=len(rows))
+            scores = self._vectors[row_index] @ query
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [dict(self._records[rows[i]], score=round(float(scores[i]), 4))
+                for i in top if scores[i] >= min_score]
+
+    def recent(self, user_id: str, kind: str = "summary", limit: int = 1) -> List[Dict]:
+        self._refresh()
+        rows = self._user_rows.get(user_id, [])
+        return [self._records[row] for row in rows if self._records[row]["kind"] == kind][-limit:]
+
+    def snapshot(self) -> Dict:
+        return {
+            "memories": self.count,
+            "users": len(self._user_rows),
+            "dim": self.dim,
+            "vector_bytes": self.count * self.dim * 4,
+            "persistent": bool(self.directory)
+        }
@@ -0,0 +1,218 @@
+"""
+Cross-worker cache in a shared memory-mapped file
+Each uvicorn worker is its own process, so an in-process cache is held once
+per worker and starts cold in every new one. SharedLRU keeps entries in one
+file, ideally on a RAM-backed filesystem such as /dev/shm, mapped by every
+worker: an entry stored by one worker is a hit for all of them and its
+memory is paid once per host. The file is a set-associative table of
+fixed-size slots with LRU eviction inside each set; processes serialize on
+an flock and threads on a lock. Only the standard library is used, so the
+cache can be created while the app module is imported. If the file cannot
+be set up (a full /dev/shm, say), the cache logs once and reports misses,
+leaving callers to their in-process caches
+"""
+
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Union
+
+# e.g. /dev/shm; empty keeps every cache inside its own process
+DEFAULT_SHARED_CACHE_DIR = os.environ.get("SHARED_CACHE_DIR", "")
+
+MAGIC = b"SWLRU001"
+# magic, sets, ways, slot bytes, reserved, then the shared counters
+HEADER = struct.Struct("<8sIIII")
+HEADER_BYTES = 4096
+CLOCK, HITS, MISSES, STORES, EVICTIONS, REJECTED = range(HEADER.size, HEADER.size + 48, 8)
+COUNTER = struct.Struct("<Q")
+# key digest, value length, valid flag, last use
+SLOT = struct.Struct("<16sIIQ")
+
+Key = Union[str, bytes]
+
+logger = logging.getLogger(__name__)
+
+
+class SharedLRU:
+    """
+    Fixed-size byte cache shared by every process that maps the same file
+
+    Args:
+        path: Backing file; processes using the same path and geometry share entries
+        capacity_bytes: Approximate size of the file
+        slot_bytes: Largest value stored; larger values are rejected
+        ways: Slots per set; eviction picks the least recently used slot of the key's set
+    """
+
+    def __init__(self, path: str, capacity_bytes: int = 16 << 20, slot_bytes: int = 4096, ways: int = 8):
+        self.slot_bytes = slot_bytes
+        self.ways = ways
+        self.sets = max(capacity_bytes // ((SLOT.size + slot_bytes) * ways), 1)
+        # Geometry is part of the name, so a worker with other settings never maps a file of another layout
+        root, extension = os.path.splitext(path)
+        self.path = f"{root}-{self.sets}x{ways}x{slot_bytes}{extension or '.lru'}"
+        self.size = HEADER_BYTES + self.sets * ways * (SLOT.size + slot_bytes)
+        self.process_stats = {"hits": 0, "misses": 0}
+        self._mm: Optional[mmap.mmap] = None
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        # Set when the file could not be used; every lookup is then a miss and every store is refused
+        self.error: Optional[str] = None
+
+    @classmethod
+    def from_env(cls, name: str, capacity_bytes: int, slot_bytes: int,
+                 directory: str = DEFAULT_SHARED_CACHE_DIR) -> Optional["SharedLRU"]:
+        """
+        A shared cache named `name` under `directory`, or None when sharing is not configured
+        """
+        if not directory:
+            return None
+        return cls(os.path.join(directory, f"symptom_whisperer_{name}.lru"), capacity_bytes, slot_bytes)
+
+    def _attach(self) -> mmap.mmap:
+        # Re-open after a fork: a shared file descriptor would share the flock with the parent
+        if self._mm is not None and self._pid == os.getpid():
+            return self._mm
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.pread(fd, len(MAGIC), 0) != MAGIC:
+                # New file: allocate every page as zeros (all slots empty), then publish the header. A sparse
+                # file would fail on a full /dev/shm only when a page is first written, with SIGBUS mid-request
+                os.posix_fallocate(fd, 0, self.size)
+                os.pwrite(fd, HEADER.pack(MAGIC, self.sets, self.ways, self.slot_bytes, 0), 0)
+        except OSError:
+            # Out of space (or no fallocate support): fail the attach instead of mapping a short file
+            os.close(fd)
+            raise
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        self._mm = mmap.mmap(fd, self.size)
+        self._fd = fd
+        self._pid = os.getpid()
+        return self._mm
+
+    def _disable(self, error: OSError) -> None:
+        with self._lock:
+            if self.error is None:
+                self.error = str(error)
+                logger.warning("Shared cache %s unavailable, caching in process only: %s", self.path, error)
+
+    @contextmanager
+    def _locked(self) -> Iterator[mmap.mmap]:
+        with self._lock:
+            mm = self._attach()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield mm
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _locate(self, key: Key):
+        digest = hashlib.blake2b(key.encode("utf-8") if isinstance(key, str) else key, digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little") % self.sets * self.ways
+        offsets = [HEADER_BYTES + (first + way) * (SLOT.size + self.slot_bytes) for way in range(self.ways)]
+        return digest, offsets
+
+    @staticmethod
+    def _add(mm: mmap.mmap, counter: int, amount: int = 1) -> int:
+        value = COUNTER.unpack_from(mm, counter)[0] + amount
+        COUNTER.pack_into(mm, counter, value)
+        return value
+
+    def get(self, key: Key) -> Optional[bytes]:
+        """
+        The value stored for `key` by any process, or None
+        """
+        if self.error is not None:
+            return None
+        digest, offsets = self._locate(key)
+        try:
+            with self._locked() as mm:
+                for offset in offsets:
+                    slot_digest, length, valid, _ = SLOT.unpack_from(mm, offset)
+                    if valid and slot_digest == digest:
+                        SLOT.pack_into(mm, offset, digest, length, 1, self._add(mm, CLOCK))
+                        self._add(mm, HITS)
+                        self.process_stats["hits"] += 1
+                        return mm[offset + SLOT.size:offset + SLOT.size + length]
+                self._add(mm, MISSES)
+        except OSError as error:
+            self._disable(error)
+            return None
+        self.process_stats["misses"] += 1
+        return None
+
+    def put(self, key: Key, value: bytes) -> bool:
+        """
+        Store `value` for `key`, evicting the least recently used entry of its set
+
+        Returns:
+            False when the value is larger than a slot, or the cache is unavailable, and was not stored
+        """
+        if self.error is not None:
+            return False
+        digest, offsets = self._locate(key)
+        try:
+            with self._locked() as mm:
+                if len(value) > self.slot_bytes:
+                    self._add(mm, REJECTED)
+                    return False
+                slots = [(offset,) + SLOT.unpack_from(mm, offset) for offset in offsets]
+                target = next((slot for slot in slots if slot[3] and slot[1] == digest), None) or \
+                    next((slot for slot in slots if not slot[3]), None)
+                if target is None:
+                    target = min(slots, key=lambda slot: slot[4])
+                    self._add(mm, EVICTIONS)
+                offset = target[0]
+                # Invalidate first, so a process dying mid-write never leaves a torn entry marked valid
+                SLOT.pack_into(mm, offset, digest, 0, 0, 0)
+                mm[offset + SLOT.size:offset + SLOT.size + len(value)] = value
+                SLOT.pack_into(mm, offset, digest, len(value), 1, self._add(mm, CLOCK))
+                self._add(mm, STORES)
+        except OSError as error:
+            self._disable(error)
+            return False
+        return True
+
+    def snapshot(self) -> Dict:
+        if self.error is None:
+            try:
+                with self._locked() as mm:
+                    hits, misses, stores, evictions, rejected = (
+                        COUNTER.unpack_from(mm, counter)[0] for counter in (HITS, MISSES, STORES, EVICTIONS, REJECTED))
+                    entries = sum(SLOT.unpack_from(mm, HEADER_BYTES + slot * (SLOT.size + self.slot_bytes))[2]
+                                  for slot in range(self.sets * self.ways))
+            except OSError as error:
+                self._disable(error)
+        if self.error is not None:
+            return {"path": self.path, "bytes": self.size, "error": self.error}
+        process_lookups = self.process_stats["hits"] + self.process_stats["misses"]
+        return {
+            "path": self.path,
+            "bytes": self.size,
+            "slots": self.sets * self.ways,
+            "slot_bytes": self.slot_bytes,
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "stores": stores,
+            "evictions": evictions,
+            "rejected": rejected,
+            "process_hit_rate": round(self.process_stats["hits"] / process_lookups, 3) if process_lookups else 0.0
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mm is not None and self._pid == os.getpid():
+                self._mm.close()
+                os.close(self._fd)
+            self._mm = self._fd = self._pid = None
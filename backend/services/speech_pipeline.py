@@ -0,0 +1,160 @@
+"""
+Sentence-pipelined speech synthesis
+Splits a streamed LLM reply into sentences as tokens arrive and synthesizes
+each sentence in a worker pool, so audio playback can start after the first
+sentence instead of after the whole reply
+"""
+
+import queue
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# Sentence end: terminal punctuation (optionally closed by a quote/bracket) followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r"([.!?…]+[\"')\]]*)\s+|\n+")
+
+# Abbreviations whose trailing period does not end a sentence
+ABBREVIATIONS = {"dr.", "mr.", "mrs.", "ms.", "e.g.", "i.e.", "etc.", "vs.", "st."}
+
+
+class SentenceSplitter:
+    """
+    Incremental sentence splitter for streamed text
+
+    Sentences shorter than `min_chars` are held back and merged with the next
+    one, so TTS is not invoked on fragments like "Okay."
+    """
+
+    def __init__(self, min_chars: int = 24):
+        self.min_chars = min_chars
+        self._buffer = ""
+        self._pending = ""
+
+    def feed(self, fragment: str) -> List[str]:
+        """
+        Add streamed text and return any sentences it completed
+        """
+        self._buffer += fragment
+        sentences = []
+        search_from = 0
+        while True:
+            match = SENTENCE_BOUNDARY.search(self._buffer, search_from)
+            if match is None:
+                break
+            candidate = self._buffer[:match.end()].strip()
+            last_word = candidate.rsplit(None, 1)[-1].lower() if candidate else ""
+            if last_word in ABBREVIATIONS:
+                search_from = match.end()
+                continue
+            self._buffer = self._buffer[match.end():]
+            search_from = 0
+            sentence = self._merge(candidate)
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def flush(self) -> List[str]:
+        """
+        Return whatever text remains once the stream has ended
+        """
+        remainder = " ".join(part for part in (self._pending, self._buffer.strip()) if part)
+        self._buffer = ""
+        self._pending = ""
+        return [remainder] if remainder else []
+
+    def _merge(self, sentence: str) -> Optional[str]:
+        if self._pending:
+            sentence = f"{self._pending} {sentence}"
+            self._pending = ""
+        if len(sentence) < self.min_chars:
+            self._pending = sentence
+            return None
+        return sentence
+
+
+class SpeechPipeline:
+    """
+    Overlaps LLM generation with speech synthesis
+
+    A reader thread consumes the token stream and submits each completed
+    sentence to the synthesis pool; the caller receives audio chunks strictly
+    in sentence order. A caller that stops early (a client disconnect closes
+    the generator) stops the reader and cancels syntheses not yet started.
+    """
+
+    def __init__(self, synthesize: Callable[[str], bytes], max_workers: int = 2, min_chars: int = 24):
+        self.synthesize = synthesize
+        self.min_chars = min_chars
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
+
+    def stream(self, tokens: Iterable[str]) -> Iterator[Dict]:
+        """
+        Synthesize a streamed reply sentence by sentence
+
+        Args:
+            tokens: Text fragments in generation order, e.g. ChatService.stream_message
+
+        Yields:
+            {"index", "text", "audio"} for each sentence, in order
+        """
+        pending: "queue.Queue" = queue.Queue()
+        stop = threading.Event()
+        reader = threading.Thread(target=self._read_tokens, args=(tokens, pending, stop), daemon=True)
+        reader.start()
+
+        index = 0
+        try:
+            while True:
+                item = pending.get()
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                text, future = item
+                yield {"index": index, "text": text, "audio": future.result()}
+                index += 1
+            reader.join()
+        finally:
+            # Normal end, error or GeneratorExit: whatever is still queued will never be played
+            stop.set()
+            while True:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, tuple):
+                    item[1].cancel()
+
+    def _read_tokens(self, tokens: Iterable[str], pending: "queue.Queue", stop: threading.Event) -> None:
+        splitter = SentenceSplitter(self.min_chars)
+
+        def submit(sentence: str) -> None:
+            future = self._submit(sentence)
+            pending.put((sentence, future))
+            # The consumer may have drained the queue between the check in the loop and the put
+            if stop.is_set():
+                future.cancel()
+
+        try:
+            for token in tokens:
+                if stop.is_set():
+                    break
+                for sentence in splitter.feed(token):
+                    submit(sentence)
+            else:
+                for sentence in splitter.flush():
+                    submit(sentence)
+        except Exception as e:
+            pending.put(e)
+        finally:
+            if stop.is_set() and hasattr(tokens, "close"):
+                # Stop pulling tokens from the LLM, e.g. close its streaming response
+                tokens.close()
+        pending.put(None)
+
+    def _submit(self, sentence: str) -> Future:
+        return self.executor.submit(self.synthesize, sentence)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,194 @@
+"""
+Content-addressed cache for synthesized speech
+Static counselor utterances are synthesized once, written to disk and
+memory-mapped, so every worker on the host shares a single page-cache copy.
+With a shared cache configured, live syntheses are shared between workers too
+"""
+
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..utils.therapy_prompts import TherapyPrompts, CRISIS_RESOURCES
+from .shared_cache import SharedLRU
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "symptom_whisperer_tts")
+)
+
+# Catalog categories that are spoken verbatim, and which of them must never wait on synthesis
+STATIC_CATEGORIES = ["conversation_starters", "crisis_prompts", "closing_prompts"]
+CRISIS_SUBCATEGORIES = {("conversation_starters", "crisis_detected")}
+
+Synthesizer = Callable[[str, str, str], bytes]
+
+
+def static_utterances(therapy_prompts: TherapyPrompts) -> List[Tuple[str, bool]]:
+    """
+    List every fixed utterance the counselor may speak
+
+    Args:
+        therapy_prompts: Prompt catalog to read from
+
+    Returns:
+        (text, is_crisis) pairs
+    """
+    utterances = []
+    for category in STATIC_CATEGORIES:
+        for subcategory, prompts in getattr(therapy_prompts, category).items():
+            crisis = category == "crisis_prompts" or (category, subcategory) in CRISIS_SUBCATEGORIES
+            utterances.extend((text, crisis) for text in prompts)
+
+    for name, contact in CRISIS_RESOURCES["emergency_contacts"].items():
+        utterances.append((f"{name.replace('_', ' ').capitalize()}: {contact}", True))
+    utterances.extend((action, True) for action in CRISIS_RESOURCES["immediate_actions"])
+    utterances.append((CRISIS_RESOURCES["safety_plan"], True))
+    return utterances
+
+
+class TTSCache:
+    """
+    Two-level speech cache keyed by (text, voice, format)
+
+    Warmed entries live in files under `cache_dir` and are served from
+    read-only memory maps. Anything else is synthesized live and kept in
+    `shared`, a cross-worker cache, when given and the audio fits a slot,
+    otherwise in a bounded in-process LRU. Only texts in `static_texts`, the
+    static catalog, are looked up on disk when this worker has not mapped them.
+    """
+
+    def __init__(self, synthesizer: Synthesizer, cache_dir: str = DEFAULT_CACHE_DIR,
+                 max_dynamic_entries: int = 256, shared: Optional[SharedLRU] = None,
+                 static_texts: Iterable[str] = ()):
+        self.synthesizer = synthesizer
+        self.cache_dir = cache_dir
+        self.max_dynamic_entries = max_dynamic_entries
+        self.shared = shared
+        self.static_texts = set(static_texts)
+        self._mapped: Dict[str, mmap.mmap] = {}
+        self._dynamic: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"static_hits": 0, "dynamic_hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def cache_key(text: str, voice: str, audio_format: str) -> str:
+        digest = hashlib.sha256()
+        for part in (voice, audio_format, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _path(self, key: str, audio_format: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{audio_format}")
+
+    @staticmethod
+    def _map_file(path: str, pin: bool = False) -> Optional[mmap.mmap]:
+        # Filesystem work, so callers run it outside the cache lock
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        if pin:
+            # Touch every page so crisis audio never faults on first use
+            mapped.read()
+            mapped.seek(0)
+        return mapped
+
+    def _keep_mapped(self, key: str, mapped: mmap.mmap) -> mmap.mmap:
+        # Called with the lock held; a thread that mapped the same file first wins
+        return self._mapped.setdefault(key, mapped)
+
+    def warm(self, utterances: Iterable[Tuple[str, bool]], voice: str = "default",
+             audio_format: str = "wav") -> int:
+        """
+        Synthesize and map every utterance not already on disk
+
+        Args:
+            utterances: (text, pin) pairs; pinned entries are paged in eagerly
+            voice: Voice to synthesize with
+            audio_format: Output audio format
+
+        Returns:
+            Number of utterances that had to be synthesized
+        """
+        synthesized = 0
+        for text, pin in utterances:
+            key = self.cache_key(text, voice, audio_format)
+            path = self._path(key, audio_format)
+            if not os.path.exists(path):
+                audio = self.synthesizer(text, voice, audio_format)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write-then-rename keeps concurrent warmers from exposing partial files
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+                with os.fdopen(fd, "wb") as f:
+                    f.write(audio)
+                os.replace(tmp_path, path)
+                synthesized += 1
+            with self._lock:
+                self.static_texts.add(text)
+                known = key in self._mapped
+            if not known:
+                mapped = self._map_file(path, pin=pin)
+                if mapped is not None:
+                    with self._lock:
+                        self._keep_mapped(key, mapped)
+        return synthesized
+
+    def get(self, text: str, voice: str = "default", audio_format: str = "wav") -> bytes:
+        """
+        Return audio for `text`, synthesizing and caching it on a miss
+        """
+        key = self.cache_key(text, voice, audio_format)
+        with self._lock:
+            mapped = self._mapped.get(key)
+            on_disk = mapped is None and text in self.static_texts and key not in self._dynamic
+        if on_disk:
+            # A catalog line another worker or the build step may have rendered since we started
+            mapped = self._map_file(self._path(key, audio_format))
+        with self._lock:
+            if mapped is not None:
+                mapped = self._keep_mapped(key, mapped)
+                self.stats["static_hits"] += 1
+                return mapped[:]
+            if key in self._dynamic:
+                self._dynamic.move_to_end(key)
+                self.stats["dynamic_hits"] += 1
+                return self._dynamic[key]
+            audio = self.shared.get(key) if self.shared is not None else None
+            if audio is not None:
+                self.stats["shared_hits"] += 1
+                return audio
+            self.stats["misses"] += 1
+
+        audio = self.synthesizer(text, voice, audio_format)
+        if self.shared is not None and self.shared.put(key, audio):
+            return audio
+        with self._lock:
+            self._dynamic[key] = audio
+            self._dynamic.move_to_end(key)
+            while len(self._dynamic) > self.max_dynamic_entries:
+                self._dynamic.popitem(last=False)
+                self.stats["evictions"] += 1
+        return audio
+
+    def close(self) -> None:
+        with self._lock:
+            for mapped in self._mapped.values():
+                mapped.close()
+            self._mapped.clear()
+            self._dynamic.clear()
+
+
+if __name__ == "__main__":
+    # Build step: pre-render the static catalog, e.g. during the image build
+    from .voice_service import VoiceService
+
+    voice_service = VoiceService()
+    count = voice_service.warm_tts_cache()
+    print(f"Synthesized {count} utterances into {voice_service.tts_cache.cache_dir}")
@@ -1,11 +1,108 @@
+import time
+from typing import Callable, Dict, Optional
+
+from ..utils.audio_utils import decode_pcm16, encode_wav, find_speech_segments, segment_stats
+from ..utils.therapy_prompts import TherapyPrompts
+from .shared_cache import SharedLRU
+from .tts_cache import DEFAULT_CACHE_DIR, TTSCache, static_utterances
+
+
 class VoiceService:
     """
     Stub for voice input/output. Extend with speech-to-text and text-to-speech as needed.
+
+    Incoming audio passes through a voice activity detector first, so the
+    speech-to-text engine only ever sees speech segments. Outgoing speech is
+    served from a TTSCache, which holds the fixed counselor utterances and,
+    with SHARED_CACHE_DIR set, shares live syntheses between workers.
     """
+    def __init__(self, stt_engine: Optional[Callable[[bytes], str]] = None, vad_enabled: bool = True,
+                 tts_engine: Optional[Callable[[str, str, str], bytes]] = None,
+                 tts_cache_dir: str = DEFAULT_CACHE_DIR):
+        self.stt_engine = stt_engine or self._placeholder_stt
+        self.vad_enabled = vad_enabled
+        self.tts_engine = tts_engine or self._placeholder_tts
+        self.tts_cache = TTSCache(self.tts_engine, cache_dir=tts_cache_dir,
+                                  shared=SharedLRU.from_env("tts", capacity_bytes=64 << 20, slot_bytes=256 << 10),
+                                  static_texts=(text for text, _ in static_utterances(TherapyPrompts())))
+        self.vad_stats: Dict = {
+            "requests": 0,
+            "total_seconds": 0.0,
+            "speech_seconds": 0.0,
+            "segments": 0,
+            "vad_seconds": 0.0,
+            "stt_seconds": 0.0
+        }
+
     def transcribe_audio(self, audio_bytes: bytes) -> str:
-        # Placeholder: integrate with a speech-to-text API
-        return "Transcribed text from audio."
+        if not self.vad_enabled:
+            return self.stt_engine(audio_bytes)
+
+        vad_start = time.perf_counter()
+        samples, sample_rate = decode_pcm16(audio_bytes)
+        segments = find_speech_segments(samples, sample_rate)
+        vad_elapsed = time.perf_counter() - vad_start
+
+        stt_start = time.perf_counter()
+        transcripts = []
+        for start, end in segments:
+            text = self.stt_engine(encode_wav(samples[start:end], sample_rate))
+            if text:
+                transcripts.append(text.strip())
+        stt_elapsed = time.perf_counter() - stt_start
+
+        stats = segment_stats(len(samples), segments, sample_rate)
+        self.vad_stats["requests"] += 1
+        self.vad_stats["total_seconds"] += stats["total_seconds"]
+        self.vad_stats["speech_seconds"] += stats["speech_seconds"]
+        self.vad_stats["segments"] += stats["segments"]
+        self.vad_stats["vad_seconds"] += vad_elapsed
+        self.vad_stats["stt_seconds"] += stt_elapsed
 
-    def synthesize_speech(self, text: str) -> bytes:
+        return " ".join(transcripts)
+
+    def get_vad_stats(self) -> Dict:
+        """
+        Report how much audio the VAD dropped and the estimated STT time it saved
+
+        STT time saved is extrapolated from the engine's measured cost per
+        second of forwarded speech.
+        """
+        stats = self.vad_stats
+        total = stats["total_seconds"]
+        speech = stats["speech_seconds"]
+        dropped = total - speech
+        stt_cost_per_second = stats["stt_seconds"] / speech if speech else 0.0
+        return {
+            "requests": stats["requests"],
+            "segments": stats["segments"],
+            "audio_seconds": total,
+            "speech_seconds": speech,
+            "dropped_seconds": dropped,
+            "dropped_fraction": dropped / total if total else 0.0,
+            "stt_seconds": stats["stt_seconds"],
+            "stt_seconds_saved": dropped * stt_cost_per_second,
+            "vad_real_time_factor": stats["vad_seconds"] / total if total else 0.0
+        }
+
+    def synthesize_speech(self, text: str, voice: str = "default", audio_format: str = "wav") -> bytes:
+        return self.tts_cache.get(text, voice, audio_format)
+
+    def warm_tts_cache(self, therapy_prompts: Optional[TherapyPrompts] = None,
+                       voice: str = "default", audio_format: str = "wav") -> int:
+        """
+        Pre-render every static counselor utterance; call at startup or build time
+
+        Returns:
+            Number of utterances that were not already cached on disk
+        """
+        utterances = static_utterances(therapy_prompts or TherapyPrompts())
+        return self.tts_cache.warm(utterances, voice, audio_format)
+
+    def _placeholder_tts(self, text: str, voice: str, audio_format: str) -> bytes:
         # Placeholder: integrate with a text-to-speech API
         return b"Audio bytes for synthesized speech."
+
+    def _placeholder_stt(self, audio_bytes: bytes) -> str:
+        # Placeholder: integrate with a speech-to-text API
+        return "Transcribed text from audio."
@@ -0,0 +1,26 @@
+"""
+Tests for lazy subsystem initialization in the API module
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from backend.benchmarks.import_time import LAZY_MODULES, REPO_ROOT
+
+
+def test_import_does_not_build_heavy_subsystems():
+    code = f"import json, sys, backend.app; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True,
+                            check=True, env=dict(os.environ, MODEL_WARMUP="0"))
+    assert json.loads(result.stdout) == []
+
+
+def test_services_are_built_once_on_first_use():
+    import backend.app as app_module
+
+    first = app_module.get_chat_service()
+    assert app_module.chat_service is first
+    assert app_module.get_chat_service() is first
+    assert app_module.assessment_service is app_module.get_assessment_service()
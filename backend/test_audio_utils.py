@@ -0,0 +1,92 @@
+"""
+Tests for the voice activity detector and silence trimming
+"""
+
+import time
+
+import numpy as np
+
+from backend.utils.audio_utils import (
+    decode_pcm16,
+    encode_wav,
+    find_speech_segments,
+    segment_stats,
+    trim_silence,
+)
+from backend.services.voice_service import VoiceService
+
+SAMPLE_RATE = 16000
+
+
+def make_clip(layout):
+    """Build a clip from (kind, seconds) pairs, kind is 'speech' or 'silence'"""
+    rng = np.random.default_rng(0)
+    parts = []
+    for kind, seconds in layout:
+        n = int(seconds * SAMPLE_RATE)
+        noise = rng.normal(0, 0.001, n)
+        if kind == "speech":
+            t = np.arange(n) / SAMPLE_RATE
+            parts.append(0.3 * np.sin(2 * np.pi * 220 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t)) + noise)
+        else:
+            parts.append(noise)
+    return np.concatenate(parts).astype(np.float32)
+
+
+def test_trim_leading_and_trailing_silence():
+    clip = make_clip([("silence", 1.0), ("speech", 1.0), ("silence", 2.0)])
+    trimmed = trim_silence(clip, SAMPLE_RATE)
+    assert 0.9 * SAMPLE_RATE < len(trimmed) < 1.5 * SAMPLE_RATE
+
+
+def test_split_at_long_pause_only():
+    clip = make_clip([("speech", 1.0), ("silence", 0.2), ("speech", 1.0),
+                      ("silence", 1.5), ("speech", 1.0)])
+    segments = find_speech_segments(clip, SAMPLE_RATE, min_silence_ms=600)
+    assert len(segments) == 2
+
+
+def test_continuous_speech_without_silence_is_one_segment():
+    clip = make_clip([("speech", 3.0)])
+    assert find_speech_segments(clip, SAMPLE_RATE) == [(0, len(clip))]
+
+
+def test_silence_only_has_no_segments():
+    clip = make_clip([("silence", 3.0)])
+    assert find_speech_segments(clip, SAMPLE_RATE) == []
+    stats = segment_stats(len(clip), [], SAMPLE_RATE)
+    assert stats["dropped_fraction"] == 1.0
+
+
+def test_wav_round_trip():
+    clip = make_clip([("speech", 0.5)])
+    samples, rate = decode_pcm16(encode_wav(clip, SAMPLE_RATE))
+    assert rate == SAMPLE_RATE
+    assert np.allclose(samples, clip, atol=1e-3)
+
+
+def test_vad_faster_than_real_time():
+    clip = make_clip([("speech", 2.0), ("silence", 3.0)] * 12)
+    start = time.perf_counter()
+    find_speech_segments(clip, SAMPLE_RATE)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 60.0 / 20
+
+
+def test_voice_service_forwards_only_speech():
+    forwarded = []
+
+    def engine(audio_bytes):
+        samples, _ = decode_pcm16(audio_bytes)
+        forwarded.append(len(samples))
+        return "hello"
+
+    service = VoiceService(stt_engine=engine)
+    clip = make_clip([("silence", 2.0), ("speech", 1.0), ("silence", 2.0), ("speech", 1.0), ("silence", 2.0)])
+    text = service.transcribe_audio(encode_wav(clip, SAMPLE_RATE))
+
+    assert text == "hello hello"
+    assert sum(forwarded) < len(clip) / 2
+    stats = service.get_vad_stats()
+    assert stats["dropped_fraction"] > 0.5
+    assert stats["stt_seconds_saved"] >= 0.0
@@ -0,0 +1,55 @@
+"""
+Tests for routing, health checks and hedging in OllamaBackendPool
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.fake_ollama import FakeOllamaServer
+from backend.models.backend_pool import OllamaBackendPool
+
+MODEL = "llama3.1:8b-instruct-q4_0"
+
+
+def test_least_outstanding_spreads_concurrent_requests():
+    with FakeOllamaServer(ttft=0.2) as a, FakeOllamaServer(ttft=0.2) as b:
+        pool = OllamaBackendPool([a.url, b.url], health_interval=0)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda i: pool.generate(MODEL, f"hello {i}"), range(4)))
+        assert a.stats["requests"] == 2 and b.stats["requests"] == 2
+        assert all(backend.outstanding == 0 for backend in pool.backends)
+
+
+def test_session_affinity_keeps_a_session_on_one_backend():
+    with FakeOllamaServer(ttft=0.0) as a, FakeOllamaServer(ttft=0.0) as b:
+        pool = OllamaBackendPool([a.url, b.url], health_interval=0)
+        pool.generate(MODEL, "warm b first", affinity_key="other")  # b now has the lower latency tie-break
+        for i in range(5):
+            pool.generate(MODEL, f"turn {i}", affinity_key="session-1")
+        counts = sorted([a.stats["requests"], b.stats["requests"]])
+        assert counts == [1, 5]
+
+
+def test_unhealthy_backend_is_skipped_and_failed_over():
+    with FakeOllamaServer(ttft=0.0) as good:
+        pool = OllamaBackendPool(["http://127.0.0.1:9", good.url], health_interval=0, timeout=2)
+        # Connection errors fail over to the other backend before any health check ran
+        assert pool.generate(MODEL, "hello")["response"]
+
+        pool.check_health(timeout=1)
+        down, up = pool.backends
+        assert not down.healthy and up.healthy and MODEL in up.models
+        for _ in range(3):
+            pool.generate(MODEL, "hello again")
+        assert good.stats["requests"] == 4
+        assert pool.list_models() == sorted(good.models)
+
+
+def test_hedged_request_beats_a_stalled_backend():
+    with FakeOllamaServer(ttft=0.0, stall_rate=1.0, stall_seconds=1.5) as slow, \
+            FakeOllamaServer(ttft=0.0) as fast:
+        pool = OllamaBackendPool([slow.url, fast.url], health_interval=0, hedge_delay=0.1)
+        started = time.perf_counter()
+        assert pool.generate(MODEL, "I want to end my life", hedge=True)["response"]
+        assert time.perf_counter() - started < 1.0
+        assert fast.stats["requests"] == 1
@@ -0,0 +1,132 @@
+"""
+Tests for batch chat jobs: one-pass detection, background scheduling and polling
+"""
+
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.services.batch_chat import BatchDetector, BatchJobManager
+from backend.services.chat_service import EMOTION_KEYWORDS, ChatService
+from backend.services.fair_scheduler import FairScheduler
+from backend.utils.therapy_prompts import detect_crisis_level
+
+
+class StubClient:
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, model, prompt, options=None, timeout=None, **extra):
+        self.prompts.append(prompt)
+        return {"response": "Thank you for writing this down."}
+
+
+def wait_for(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while job.finished is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.finished is not None
+
+
+def test_batch_detection_matches_per_message_detection():
+    service = ChatService(llm_client=StubClient())
+    messages = [
+        "hello there",
+        "I'm so ANXIOUS and sad about tomorrow",
+        "I feel hopeless, I want to end my life",
+        "everything is too much and I'm angry",
+        "",
+        "I keep thinking about self-harm",
+        "sadly I'm a bit hopeful now",
+        "I can't go on like this\nreally",
+    ]
+    crisis, emotions = BatchDetector(EMOTION_KEYWORDS).detect(messages)
+    assert crisis == [detect_crisis_level(message) for message in messages]
+    assert emotions == [service._detect_emotional_state(message) for message in messages]
+    assert BatchDetector(EMOTION_KEYWORDS).detect([]) == ([], [])
+
+
+def test_background_work_leaves_the_reserved_slot_to_interactive_turns():
+    scheduler = FairScheduler(slots=2, timeout=5)
+    admitted = []
+    done = threading.Event()
+
+    def background_item():
+        with scheduler.slot("batch", background=True):
+            admitted.append(scheduler.active)
+            done.wait()
+
+    with scheduler.slot("batch", background=True):
+        # One slot is reserved, so a second background item waits while an interactive turn gets in
+        blocked = threading.Thread(target=background_item)
+        blocked.start()
+        while scheduler.snapshot()["waiting"] < 1:
+            time.sleep(0.001)
+        with scheduler.slot("user"):
+            assert scheduler.active == 2 and not admitted
+        assert not admitted
+    while not admitted:
+        time.sleep(0.001)
+    done.set()
+    blocked.join()
+    assert admitted == [1] and scheduler.active == 0
+
+
+def test_batch_job_answers_crisis_items_first_without_touching_the_session():
+    client = StubClient()
+    service = ChatService(llm_client=client)
+    manager = BatchJobManager(service, workers=1)
+    items = [{"session_id": f"s{i}", "message": f"journal entry {i}, I'm tired"} for i in range(5)]
+    items.append({"session_id": "s5", "message": "I want to kill myself"})
+
+    job = manager.submit(items)
+    wait_for(job)
+
+    assert job.status == "completed" and job.crisis_items == [5]
+    assert all(result["message"] == "Thank you for writing this down." for result in job.results)
+    assert "crisis_resources" in job.results[5]
+    assert "kill myself" in client.prompts[0]
+    assert service.conversation_history == []
+    assert manager.get(job.job_id) is job
+
+
+def test_crisis_item_in_a_later_job_does_not_wait_behind_earlier_jobs():
+    class SlowClient(StubClient):
+        def generate(self, model, prompt, options=None, timeout=None, **extra):
+            time.sleep(0.05)
+            return super().generate(model, prompt, options, timeout, **extra)
+
+    manager = BatchJobManager(ChatService(llm_client=SlowClient()), workers=1)
+    earlier = manager.submit([{"message": f"journal entry {i}"} for i in range(40)])
+    crisis = manager.submit([{"message": "I want to kill myself"}])
+    later = manager.submit([{"message": "a short note"}])
+
+    wait_for(crisis, timeout=1.0)
+    wait_for(later)
+    # The later job's item ran within the first few turns of the round robin, not after all 40
+    assert earlier.finished is None and earlier.completed < 10
+    assert "crisis_resources" in crisis.results[0]
+    wait_for(earlier)
+
+
+def test_batch_endpoints_submit_and_poll(monkeypatch):
+    import backend.app as app_module
+
+    service = app_module.get_chat_service()
+    monkeypatch.setattr(service, "llm_client", StubClient())
+    client = TestClient(app_module.app)
+
+    submitted = client.post("/chat/batch", json={"items": [{"session_id": "a", "message": "hi"},
+                                                           {"session_id": "b", "message": "I feel sad"}]})
+    assert submitted.status_code == 202
+    job_id = submitted.json()["job_id"]
+    wait_for(app_module.get_batch_manager().get(job_id))
+
+    polled = client.get(f"/chat/batch/{job_id}", params={"offset": 1}).json()
+    assert polled["status"] == "completed" and polled["completed"] == 2
+    assert [result["index"] for result in polled["results"]] == [1]
+    assert polled["results"][0]["emotional_state"] == "depressed"
+
+    assert client.post("/chat/batch", json={"items": [{"session_id": "a"}]}).status_code == 422
+    assert client.get("/chat/batch/unknown").status_code == 404
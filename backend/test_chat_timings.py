@@ -0,0 +1,47 @@
+"""
+Tests for per-turn Ollama generation timings in ChatService
+"""
+
+from backend.fake_ollama import FakeOllamaServer
+from backend.models.llm_handler import OllamaClient
+from backend.services.chat_service import ChatService, LLM_COLD_LOADS
+
+
+def test_timings_recorded_per_turn_and_aggregated():
+    with FakeOllamaServer(ttft=0.01, tokens_per_second=1000, load_seconds=0.5) as fake:
+        service = ChatService(llm_client=OllamaClient(fake.url))
+        service.start_session("u1")
+        cold_before = LLM_COLD_LOADS.value()
+
+        service.process_message("I'm feeling anxious about work")
+        service.process_message("It keeps me up at night")
+
+        first, second = (entry["llm_timings"] for entry in service.conversation_history)
+        assert first["cold_load"] and not second["cold_load"]
+        assert first["generated_tokens"] > 0 and first["prompt_tokens"] > 0
+        assert second["generation_tokens_per_second"] > 0
+        assert LLM_COLD_LOADS.value() == cold_before + 1
+
+        summary = service.get_session_stats()["llm_timings"]
+        assert summary["turns_measured"] == 2
+        assert summary["cold_loads"] == 1
+        assert summary["cold_load_rate"] == 0.5
+        assert summary["generated_tokens"] == first["generated_tokens"] + second["generated_tokens"]
+
+
+def test_streamed_turn_records_timings():
+    with FakeOllamaServer(ttft=0.01, tokens_per_second=1000) as fake:
+        service = ChatService(llm_client=OllamaClient(fake.url))
+        reply = "".join(service.stream_message("I just wanted to talk"))
+
+        timings = service.conversation_history[-1]["llm_timings"]
+        assert reply
+        assert timings["generated_tokens"] == len(reply.split(" "))
+
+
+def test_failed_turn_has_no_timings():
+    service = ChatService(llm_client=OllamaClient("http://127.0.0.1:9", timeout=1))
+    service.process_message("hello")
+
+    assert service.conversation_history[-1]["llm_timings"] is None
+    assert service.get_session_stats()["llm_timings"]["turns_measured"] == 0
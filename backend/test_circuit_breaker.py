@@ -0,0 +1,83 @@
+"""
+Tests for the LLM circuit breaker and the degraded template responder
+"""
+
+import requests
+
+from backend.services.chat_service import ChatService
+from backend.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from backend.utils.therapy_prompts import EmotionalState, TherapyPrompts
+
+
+class FlakyClient:
+    def __init__(self):
+        self.fail = True
+        self.calls = 0
+
+    def generate(self, model, prompt, options=None, timeout=None, **extra):
+        self.calls += 1
+        if self.fail:
+            raise requests.exceptions.ConnectionError("backend down")
+        return {"response": "I'm here with you."}
+
+
+def test_breaker_opens_on_failures_and_closes_after_probes():
+    breaker = CircuitBreaker(min_calls=4, open_seconds=0.0, half_open_probes=2)
+    for _ in range(4):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()  # one probe at a time
+    breaker.record_success(0.1)
+    assert breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+
+
+def test_breaker_opens_on_slow_calls():
+    breaker = CircuitBreaker(min_calls=3, slow_call_seconds=1.0, slow_call_rate=0.6)
+    for _ in range(3):
+        breaker.record_success(2.0)
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_open_circuit_fails_fast_with_template_reply():
+    client = FlakyClient()
+    service = ChatService(llm_client=client, circuit_breaker=CircuitBreaker(min_calls=3, open_seconds=60))
+    for _ in range(3):
+        assert service.process_message("I'm feeling anxious")["degraded"]
+    calls = client.calls
+
+    response = service.process_message("I'm feeling anxious")
+    assert client.calls == calls
+    assert response["degraded"]
+    prompts = TherapyPrompts()
+    assert any(response["message"].startswith(r) for r in prompts.emotional_responses[EmotionalState.ANXIOUS])
+
+
+def test_crisis_turn_gets_crisis_reply_and_resources_when_open():
+    service = ChatService(llm_client=FlakyClient(), circuit_breaker=CircuitBreaker(min_calls=1, open_seconds=60))
+    service.process_message("hello")
+
+    response = service.process_message("I want to end my life")
+    assert response["degraded"] and response["crisis_level"] == "high"
+    assert "crisis_resources" in response
+    prompts = TherapyPrompts()
+    assert any(response["message"].startswith(p) for p in prompts.crisis_prompts["immediate_safety"])
+
+
+def test_half_open_probe_restores_llm_replies():
+    client = FlakyClient()
+    service = ChatService(llm_client=client,
+                          circuit_breaker=CircuitBreaker(min_calls=1, open_seconds=0.0, half_open_probes=1))
+    service.process_message("hello")
+    assert service.circuit_breaker.state == OPEN
+
+    client.fail = False
+    response = service.process_message("hello again")
+    assert response["message"] == "I'm here with you." and "degraded" not in response
+    assert service.circuit_breaker.state == CLOSED
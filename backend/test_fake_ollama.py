@@ -0,0 +1,65 @@
+"""
+Tests for the fake Ollama server and the service layer running against it
+"""
+
+import time
+
+import pytest
+import requests
+
+from backend.fake_ollama import FakeOllamaServer
+from backend.models.llm_handler import OllamaClient
+from backend.services.chat_service import ChatService
+
+
+def test_tags_and_deterministic_generate():
+    with FakeOllamaServer(ttft=0.0) as server:
+        client = OllamaClient(server.url)
+        assert "llama3.1:8b-instruct-q4_0" in client.list_models()
+        first = client.generate("llama3.1:8b-instruct-q4_0", "I feel anxious")
+        second = client.generate("llama3.1:8b-instruct-q4_0", "I feel anxious")
+        assert first["response"] == second["response"]
+        assert first["eval_count"] > 0 and first["prompt_eval_count"] > 0
+
+
+def test_streaming_chat_respects_rate_and_num_predict():
+    with FakeOllamaServer(ttft=0.05, tokens_per_second=100) as server:
+        client = OllamaClient(server.url)
+        started = time.perf_counter()
+        chunks = list(client.stream_chat("llama3.1:8b-instruct-q4_0", [{"role": "user", "content": "hi"}],
+                                         options={"num_predict": 5}))
+        elapsed = time.perf_counter() - started
+        assert len([c for c in chunks if not c["done"]]) == 5
+        assert chunks[-1]["done"] and chunks[-1]["eval_count"] == 5
+        assert 0.09 <= elapsed < 1.0
+
+
+def test_cold_load_then_warm():
+    with FakeOllamaServer(ttft=0.0, load_seconds=0.2) as server:
+        client = OllamaClient(server.url)
+        cold = client.generate("llama3.1:8b-instruct-q4_0", "hello")
+        warm = client.generate("llama3.1:8b-instruct-q4_0", "hello")
+        assert cold["load_duration"] > 0 and warm["load_duration"] == 0
+        assert server.stats["cold_loads"] == 1
+
+
+def test_chat_service_against_fake_server():
+    with FakeOllamaServer(ttft=0.0) as server:
+        service = ChatService(ollama_url=server.url)
+        response = service.process_message("I'm really stressed about work")
+        assert response["emotional_state"] == "anxious"
+        assert response["message"]
+        assert "".join(service.stream_message("Thanks, that helps")).strip()
+
+
+def test_injected_errors_and_stalls_surface_as_fallbacks():
+    with FakeOllamaServer(error_rate=1.0) as server:
+        response = ChatService(ollama_url=server.url).process_message("hello")
+        assert response["degraded"] and response["message"]
+
+    with FakeOllamaServer(stall_rate=1.0, stall_seconds=2.0) as server:
+        client = OllamaClient(server.url)
+        started = time.perf_counter()
+        with pytest.raises(requests.exceptions.Timeout):
+            client.generate("llama3.1:8b-instruct-q4_0", "hello", timeout=0.2)
+        assert time.perf_counter() - started < 1.5
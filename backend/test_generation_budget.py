@@ -0,0 +1,90 @@
+"""
+Tests for the load-adaptive generation budget
+"""
+
+from backend.services.chat_service import CRISIS_LLM_TIMEOUT, ChatService
+from backend.services.generation_budget import GenerationBudget
+
+
+class RecordingClient:
+    def __init__(self):
+        self.calls = []
+        self.requests = []
+
+    def generate(self, model, prompt, options=None, timeout=None, **extra):
+        self.calls.append((prompt, options))
+        self.requests.append({"timeout": timeout, "hedge": extra.get("hedge")})
+        return {"response": "I'm listening."}
+
+
+def _hold(budget: GenerationBudget, turns: int):
+    contexts = [budget.track() for _ in range(turns)]
+    for context in contexts:
+        context.__enter__()
+    return contexts
+
+
+def test_idle_budget_is_full_and_overload_shrinks_it():
+    budget = GenerationBudget(slo_seconds=4.0, max_predict=500, min_predict=64, capacity=2, initial_rate=100.0)
+    with budget.track():
+        idle = budget.plan()
+    assert idle["num_predict"] == 500 and idle["history_turns"] == 3
+
+    held = _hold(budget, 10)
+    loaded = budget.plan()
+    crisis = budget.plan(crisis=True)
+    for context in held:
+        context.__exit__(None, None, None)
+
+    assert 64 <= loaded["num_predict"] < 500
+    assert loaded["history_turns"] < 3
+    assert crisis["num_predict"] == 500 and crisis["history_turns"] == 3
+    assert budget.in_flight == 0
+
+
+def test_observed_timings_update_rate_and_service_time():
+    budget = GenerationBudget(alpha=1.0, initial_rate=30.0)
+    budget.observe({"prompt_eval_ms": 200.0, "eval_ms": 1800.0, "load_ms": 0.0,
+                    "generation_tokens_per_second": 90.0})
+    assert budget.generation_rate == 90.0
+    assert budget.service_seconds == 2.0
+    assert budget.prompt_seconds == 0.2
+
+
+def test_chat_service_sends_num_predict_and_trims_history_under_load():
+    client = RecordingClient()
+    budget = GenerationBudget(slo_seconds=2.0, capacity=1, initial_rate=50.0)
+    service = ChatService(llm_client=client, generation_budget=budget)
+    service.start_session("budget-test")
+    for message in ("first thing on my mind", "second thing on my mind", "third thing on my mind"):
+        service.process_message(message)
+    prompt, options = client.calls[-1]
+    assert options["num_predict"] == budget.max_predict and "max_tokens" not in options
+    assert "first thing" in prompt
+
+    held = _hold(budget, 20)
+    service.process_message("a quick update")
+    service.process_message("I want to end my life")
+    for context in held:
+        context.__exit__(None, None, None)
+
+    (loaded_prompt, loaded_options), (crisis_prompt, crisis_options) = client.calls[-2:]
+    assert loaded_options["num_predict"] == budget.min_predict
+    assert "second thing" not in loaded_prompt and "third thing" in loaded_prompt
+    assert crisis_options["num_predict"] == budget.max_predict
+
+
+def test_medium_risk_turn_keeps_the_full_budget_under_load():
+    client = RecordingClient()
+    budget = GenerationBudget(slo_seconds=2.0, capacity=1, initial_rate=50.0)
+    service = ChatService(llm_client=client, generation_budget=budget)
+    service.start_session("budget-test")
+
+    held = _hold(budget, 20)
+    service.process_message("Everything feels hopeless and I want to give up")
+    for context in held:
+        context.__exit__(None, None, None)
+
+    _, options = client.calls[-1]
+    assert options["num_predict"] == budget.max_predict
+    assert client.requests[-1] == {"timeout": CRISIS_LLM_TIMEOUT, "hedge": True}
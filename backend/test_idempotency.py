@@ -0,0 +1,98 @@
+"""
+Tests for idempotency keys and duplicate-submit suppression on /chat/
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from backend.services.idempotency import (
+    ATTACHED, COMPUTED, REPLAYED, IdempotencyCache, IdempotencyConflict, fingerprint
+)
+
+
+class SlowClient:
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, model, prompt, options=None, timeout=None, **extra):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return {"response": "Take your time, I'm listening."}
+
+
+def test_cache_attaches_replays_and_rejects_reuse():
+    async def scenario():
+        cache = IdempotencyCache(ttl_seconds=60)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"message": "hi"}
+
+        first, second = await asyncio.gather(cache.run("k", fingerprint("hello"), compute),
+                                             cache.run("k", fingerprint("hello"), compute))
+        third = await cache.run("k", fingerprint("hello"), compute)
+        with pytest.raises(IdempotencyConflict):
+            await cache.run("k", fingerprint("something else"), compute)
+        return calls, first, second, third, cache
+
+    calls, first, second, third, cache = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [first[1], second[1], third[1]] == [COMPUTED, ATTACHED, REPLAYED]
+    assert cache.snapshot()["outcomes"] == {COMPUTED: 1, REPLAYED: 1, ATTACHED: 1, "conflict": 1}
+
+
+def test_errors_and_unstored_results_are_not_replayed():
+    async def scenario():
+        cache = IdempotencyCache()
+        await cache.run("error", "f", lambda: asyncio.sleep(0, result={"error": "boom"}),
+                        cacheable=lambda result: "error" not in result)
+        await cache.run("submit", "f", lambda: asyncio.sleep(0, result={"message": "ok"}), store=False)
+        return "error" in cache, "submit" in cache
+
+    assert asyncio.run(scenario()) == (False, False)
+
+
+def test_cache_drops_oldest_results_beyond_max_entries():
+    async def scenario():
+        cache = IdempotencyCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            await cache.run(key, "f", lambda: asyncio.sleep(0, result={}))
+        return [key in cache for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [False, True, True]
+
+
+def test_retried_chat_request_does_not_generate_twice(monkeypatch):
+    import backend.app as app_module
+
+    service = app_module.get_chat_service()
+    client_stub = SlowClient()
+    monkeypatch.setattr(service, "llm_client", client_stub)
+    monkeypatch.setattr(app_module, "chat_idempotency", IdempotencyCache())
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            body = {"message": "I had a rough day", "user_id": "idem-user"}
+            headers = {"Idempotency-Key": "turn-1"}
+            history_before = len(service.conversation_history)
+            first, retry = await asyncio.gather(client.post("/chat/", json=body, headers=headers),
+                                                client.post("/chat/", json=body, headers=headers))
+            replay = await client.post("/chat/", json=body, headers=headers)
+            conflict = await client.post("/chat/", json={**body, "message": "different"}, headers=headers)
+            return first, retry, replay, conflict, len(service.conversation_history) - history_before
+
+    first, retry, replay, conflict, appended = asyncio.run(scenario())
+    assert client_stub.calls == 1 and appended == 1
+    assert first.json() == retry.json() == replay.json()
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert conflict.status_code == 422
@@ -0,0 +1,38 @@
+"""
+Tests for the in-process metrics registry and its Prometheus rendering
+"""
+
+from backend.utils.metrics import MetricsRegistry
+
+
+def test_counter_and_histogram_render():
+    registry = MetricsRegistry()
+    counter = registry.counter("events_total", "Events", labels=("kind",))
+    histogram = registry.histogram("stage_seconds", "Stage time", labels=("stage",), buckets=(0.1, 1.0))
+
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    histogram.observe(0.05, "llm")
+    histogram.observe(0.5, "llm")
+    histogram.observe(5.0, "llm")
+
+    text = registry.render()
+    assert 'events_total{kind="a"} 3' in text
+    assert 'stage_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="llm",le="1.0"} 2' in text
+    assert 'stage_seconds_bucket{stage="llm",le="+Inf"} 3' in text
+    assert 'stage_seconds_count{stage="llm"} 3' in text
+    assert histogram.total("llm") == 5.55
+
+
+def test_register_is_idempotent_and_unlabeled_starts_at_zero():
+    registry = MetricsRegistry()
+    first = registry.counter("timeouts_total", "Timeouts")
+    assert registry.counter("timeouts_total", "Timeouts") is first
+    assert "timeouts_total 0" in registry.render()
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("odd_total", "Odd", labels=("v",)).inc('say "hi"\n')
+    assert 'odd_total{v="say \\"hi\\"\\n"} 1' in registry.render()
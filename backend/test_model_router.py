@@ -0,0 +1,68 @@
+"""
+Tests for routing chat turns between the small and large model tiers
+"""
+
+import requests
+
+from backend.services.chat_service import ChatService
+from backend.services.model_router import LARGE, SMALL, ModelRouter, RoutingPolicy
+from backend.utils.therapy_prompts import EmotionalState, TherapyApproach
+
+SMALL_MODEL = "llama3.2:3b-instruct-q4_K_M"
+LARGE_MODEL = "llama3.1:8b-instruct-q4_0"
+
+
+class RecordingClient:
+    def __init__(self, missing=()):
+        self.models = []
+        self.missing = set(missing)
+
+    def generate(self, model, prompt, options=None, timeout=None, **extra):
+        self.models.append(model)
+        if model in self.missing:
+            response = requests.Response()
+            response.status_code = 404
+            raise requests.exceptions.HTTPError("model not found", response=response)
+        return {"response": "Thanks for sharing that."}
+
+
+def test_policy_keeps_crisis_and_heavy_turns_on_the_large_model():
+    policy = RoutingPolicy(long_message_chars=100, deep_session_turns=3)
+    neutral, cbt = EmotionalState.NEUTRAL, TherapyApproach.CBT
+    assert policy.choose("thanks, see you tomorrow", "none", neutral, cbt) == (SMALL, "simple")
+    assert policy.choose("I want to end it all", "high", neutral, TherapyApproach.CRISIS_INTERVENTION)[0] == LARGE
+    assert policy.choose("I feel so empty", "none", EmotionalState.DEPRESSED,
+                         TherapyApproach.HUMANISTIC) == (LARGE, "emotional_state")
+    assert policy.choose("x" * 100, "none", neutral, cbt) == (LARGE, "long_message")
+    assert policy.choose("a bit nervous", "none", EmotionalState.ANXIOUS, cbt, history_turns=3) == (LARGE, "deep_session")
+
+
+def test_router_without_small_model_sends_everything_to_large():
+    router = ModelRouter(large_model=LARGE_MODEL, small_model="")
+    assert router.route("hi", "none", EmotionalState.NEUTRAL, TherapyApproach.CBT) == (LARGE, LARGE_MODEL)
+    assert not router.enabled
+
+
+def test_chat_service_routes_by_turn_and_reports_share():
+    client = RecordingClient()
+    service = ChatService(llm_client=client,
+                          model_router=ModelRouter(large_model=LARGE_MODEL, small_model=SMALL_MODEL))
+    service.start_session("router-test")
+    service.process_message("thanks, that helps")
+    service.process_message("I feel hopeless and worthless")
+    assert client.models == [SMALL_MODEL, LARGE_MODEL]
+
+    tiers = service.get_session_stats()["model_tiers"]
+    assert tiers["session_turns"] == {SMALL: 1, LARGE: 1}
+    assert tiers["router"]["share"] == {SMALL: 0.5, LARGE: 0.5}
+
+
+def test_failed_small_model_escalates_to_large():
+    client = RecordingClient(missing={SMALL_MODEL})
+    service = ChatService(llm_client=client,
+                          model_router=ModelRouter(large_model=LARGE_MODEL, small_model=SMALL_MODEL))
+    service.start_session("router-test")
+    response = service.process_message("thanks, that helps")
+    assert client.models == [SMALL_MODEL, LARGE_MODEL]
+    assert not response.get("degraded")
+    assert service.conversation_history[-1]["model_tier"] == LARGE
@@ -0,0 +1,67 @@
+"""
+Tests for model preload and warm-keeping against the fake Ollama server
+"""
+
+import time
+
+import pytest
+
+from backend.fake_ollama import FakeOllamaServer
+from backend.models.llm_handler import OllamaClient
+from backend.services.model_warmup import ModelWarmer
+from backend.utils.durations import parse_duration
+
+MODEL = "llama3.1:8b-instruct-q4_0"
+
+
+def test_warm_loads_model_and_reports_ready():
+    with FakeOllamaServer(ttft=0.01, load_seconds=0.1) as fake:
+        warmer = ModelWarmer(OllamaClient(fake.url), [MODEL], system_prompt="You are Alex.")
+        assert not warmer.ready
+
+        assert warmer.warm()
+        state = warmer.readiness()["models"][MODEL]
+        assert state["available"] and state["loaded"] and state["warm"]
+        assert state["load_ms"] >= 100
+        assert fake.stats["cold_loads"] == 1
+
+
+def test_missing_model_is_not_ready_unless_only_a_secondary_model_is_missing():
+    with FakeOllamaServer(ttft=0.01) as fake:
+        warmer = ModelWarmer(OllamaClient(fake.url), [MODEL, "not-a-model"])
+        assert not warmer.warm()
+        assert warmer.status["not-a-model"]["error"] == "model not available"
+        assert warmer.status[MODEL]["warm"]
+        # A small tier that is not pulled does not hold back the chat model, which can serve every turn
+        assert warmer.ready and warmer.readiness()["ready"]
+
+        missing_chat_model = ModelWarmer(OllamaClient(fake.url), ["not-a-model", MODEL])
+        assert not missing_chat_model.warm() and not missing_chat_model.ready
+
+
+def test_keeper_prevents_eviction_during_quiet_period():
+    with FakeOllamaServer(ttft=0.01) as fake:
+        warmer = ModelWarmer(OllamaClient(fake.url), [MODEL], keep_alive=0.5, refresh_interval=0.15).start()
+        try:
+            time.sleep(1.2)
+            assert warmer.ready
+        finally:
+            warmer.stop()
+        assert fake.stats["cold_loads"] == 1
+
+
+def test_unreachable_server_is_not_ready():
+    warmer = ModelWarmer(OllamaClient("http://127.0.0.1:9", timeout=1), [MODEL])
+    assert not warmer.warm()
+    assert warmer.status[MODEL]["error"]
+
+
+def test_keep_alive_durations_read_the_same_in_the_warmer_and_the_fake_server():
+    assert [parse_duration(value) for value in (300, "-1", "30s", "1h30m", "500ms", "-1m")] == \
+        [300.0, -1.0, 30.0, 5400.0, 0.5, -60.0]
+    with pytest.raises(ValueError):
+        parse_duration("5x")
+    assert ModelWarmer(OllamaClient("http://127.0.0.1:9"), [MODEL], keep_alive="1h30m").refresh_interval == 2700
+    with FakeOllamaServer() as fake:
+        fake._load(MODEL, "1h30m")
+        assert fake._loaded_until[MODEL] > time.monotonic() + 5000
@@ -0,0 +1,82 @@
+"""
+Tests for the on-demand request profiler and stack sampler
+"""
+
+import threading
+import time
+
+from backend.utils.profiling import ProfilingSession, StackSampler
+
+
+def busy_leaf():
+    return sum(i * i for i in range(20000))
+
+
+def busy_parent():
+    return busy_leaf() + busy_leaf()
+
+
+def blocking_call():
+    time.sleep(0.3)
+
+
+def test_window_closes_after_max_requests():
+    session = ProfilingSession()
+    session.start(duration=60, max_requests=2)
+
+    for _ in range(3):
+        profiler = session.begin_request()
+        if profiler is not None:
+            busy_parent()
+            session.end_request(profiler)
+
+    assert not session.active
+    assert session.profiled_requests == 2
+    stacks = session.request_stacks()
+    assert any("test_profiling.py:busy_parent;test_profiling.py:busy_leaf" in line for line in stacks.splitlines())
+
+
+def test_inactive_session_profiles_nothing():
+    session = ProfilingSession()
+    assert session.begin_request() is None
+    assert session.request_stacks() == ""
+
+
+def test_sampler_attributes_blocking_call():
+    ready = threading.Event()
+
+    def target():
+        ready.set()
+        blocking_call()
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    ready.wait()
+    sampler = StackSampler(thread.ident, interval=0.005).start()
+    thread.join()
+    sampler.stop()
+
+    assert sampler.samples > 10
+    heaviest = max(sampler.stacks, key=sampler.stacks.get)
+    assert heaviest.endswith("test_profiling.py:blocking_call")
+
+
+def test_chat_work_in_the_threadpool_appears_in_the_request_profile(monkeypatch):
+    import backend.app as app_module
+    from fastapi.testclient import TestClient
+
+    class StubClient:
+        def generate(self, model, prompt, options=None, timeout=None, **extra):
+            return {"response": "I'm here with you."}
+
+    monkeypatch.setattr(app_module.get_chat_service(), "llm_client", StubClient())
+    app_module.PROFILER.start(duration=60, max_requests=1)
+    try:
+        response = TestClient(app_module.app).post("/chat/", json={"message": "profile me",
+                                                                    "user_id": "profiled-user"})
+    finally:
+        app_module.PROFILER.stop()
+
+    assert response.status_code == 200
+    stacks = app_module.PROFILER.request_stacks()
+    assert any("chat_service.py:process_message" in line for line in stacks.splitlines())
@@ -0,0 +1,65 @@
+"""
+Tests for prompt sections and the compact prompt profile
+"""
+
+import itertools
+
+import pytest
+
+from backend.fake_ollama import FakeOllamaServer
+from backend.models.llm_handler import OllamaClient
+from backend.utils.therapy_prompts import (
+    COMPACT_PROFILE,
+    SAFETY_PROTOCOLS,
+    EmotionalState,
+    TherapyApproach,
+    TherapyPrompts,
+)
+from backend.utils.token_utils import estimate_tokens
+
+
+def test_sections_join_to_the_contextual_prompt_in_every_profile():
+    for profile in ("full", COMPACT_PROFILE):
+        prompts = TherapyPrompts(profile=profile)
+        for crisis, history in itertools.product((False, True), (None, ["Session on 2024-05-01: hard week"])):
+            sections = prompts.build_prompt_sections("User: hi", EmotionalState.ANXIOUS, TherapyApproach.DBT,
+                                                     history, crisis)
+            assert "".join(text for _, text in sections) == prompts.build_contextual_prompt(
+                "User: hi", EmotionalState.ANXIOUS, TherapyApproach.DBT, history, crisis)
+            names = [name for name, _ in sections]
+            assert ("crisis_banner" in names) == crisis and ("session_history" in names) == bool(history)
+
+
+def test_turn_guidance_follows_the_profile():
+    full, compact = TherapyPrompts(), TherapyPrompts(profile=COMPACT_PROFILE)
+    args = (EmotionalState.DEPRESSED, TherapyApproach.CBT, True)
+    full_guidance, compact_guidance = full.build_turn_guidance(*args), compact.build_turn_guidance(*args)
+    assert "🚨" in full_guidance and "🚨" not in compact_guidance
+    assert "CRISIS INDICATORS DETECTED - PRIORITIZE SAFETY ASSESSMENT" in compact_guidance
+    assert compact.approach_guidance[TherapyApproach.CBT] in compact_guidance
+    # Every guidance line is worded as in the profile's full contextual prompt
+    compact_prompt = compact.build_contextual_prompt("User: hi", *args[:2], crisis_indicators=True)
+    assert all(line in compact_prompt for line in compact_guidance.splitlines())
+    assert estimate_tokens(compact_guidance) < estimate_tokens(full_guidance)
+
+
+def test_compact_profile_keeps_safety_content_with_fewer_tokens():
+    full, compact = TherapyPrompts(), TherapyPrompts(profile=COMPACT_PROFILE)
+    assert SAFETY_PROTOCOLS in full.base_system_prompt and SAFETY_PROTOCOLS in compact.base_system_prompt
+    for state, approach in itertools.product(EmotionalState, TherapyApproach):
+        args = ("User: I can't go on", state, approach, None, True)
+        full_prompt, compact_prompt = full.build_contextual_prompt(*args), compact.build_contextual_prompt(*args)
+        assert "CRISIS INDICATORS DETECTED - PRIORITIZE SAFETY ASSESSMENT" in compact_prompt
+        assert compact.approach_guidance[approach] in compact_prompt
+        assert estimate_tokens(compact_prompt) < 0.65 * estimate_tokens(full_prompt)
+    with pytest.raises(ValueError):
+        TherapyPrompts(profile="tiny")
+
+
+def test_fake_server_prompt_evaluation_grows_with_prompt_length():
+    with FakeOllamaServer(ttft=0.0, prompt_tokens_per_second=4000) as server:
+        client = OllamaClient(server.url)
+        short = client.generate("llama3.1:8b-instruct-q4_0", "x" * 400, options={"num_predict": 1})
+        long = client.generate("llama3.1:8b-instruct-q4_0", "x" * 4000, options={"num_predict": 1})
+    assert short["prompt_eval_duration"] == pytest.approx(100 / 4000 * 1e9, rel=0.01)
+    assert long["prompt_eval_duration"] == pytest.approx(10 * short["prompt_eval_duration"], rel=0.01)
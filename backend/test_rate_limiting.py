@@ -0,0 +1,107 @@
+"""
+Tests for the per-client rate limiter and the fair-share generation scheduler
+"""
+
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.services.fair_scheduler import FairScheduler, SchedulerTimeout
+from backend.services.rate_limiter import TokenBucketLimiter
+
+
+class StubClient:
+    def generate(self, model, prompt, options=None, timeout=None, **extra):
+        return {"response": "I'm here with you."}
+
+
+def test_bucket_allows_burst_then_throttles_and_refills():
+    limiter = TokenBucketLimiter(rate_per_minute=600, burst=3)  # 10 tokens/sec
+    assert all(limiter.check("alice")[0] for _ in range(3))
+    allowed, retry_after = limiter.check("alice")
+    assert not allowed and 0 < retry_after <= 0.1
+    assert limiter.check("bob")[0]  # buckets are per key
+    time.sleep(0.12)
+    assert limiter.check("alice")[0]
+
+
+def test_idle_buckets_expire_and_key_count_is_bounded():
+    limiter = TokenBucketLimiter(rate_per_minute=6000, burst=2, max_keys=3)  # refills fully in 20 ms
+    limiter.check("a")
+    time.sleep(0.03)
+    limiter.check("b")
+    assert limiter.snapshot()["buckets"] == 1
+    for key in ("c", "d", "e"):
+        limiter.check(key)
+    assert limiter.snapshot()["buckets"] == 3
+
+
+def test_scheduler_shares_slots_fairly_between_users():
+    scheduler = FairScheduler(slots=1, timeout=5)
+    order = []
+    gate = threading.Event()
+
+    def turn(key):
+        with scheduler.slot(key):
+            order.append(key)
+            gate.wait()
+
+    holder = threading.Thread(target=turn, args=("heavy",))
+    holder.start()
+    while scheduler.active < 1:
+        time.sleep(0.001)
+    threads = []
+    for key in ["heavy"] * 3 + ["light"]:
+        thread = threading.Thread(target=turn, args=(key,))
+        thread.start()
+        threads.append(thread)
+        while scheduler.snapshot()["waiting"] < len(threads):
+            time.sleep(0.001)
+    gate.set()
+    for thread in [holder] + threads:
+        thread.join()
+    # The light user queued last but is served before the heavy user's backlog
+    assert order == ["heavy", "light", "heavy", "heavy", "heavy"]
+    assert scheduler.snapshot() == {"slots": 1, "active": 0, "waiting": 0, "waiting_interactive": 0,
+                                   "users_tracked": 0}
+
+
+def test_crisis_turns_bypass_a_full_scheduler_and_others_time_out():
+    scheduler = FairScheduler(slots=1, timeout=0.05)
+    with scheduler.slot("someone"):
+        with scheduler.slot("at-risk", crisis=True):
+            assert scheduler.active == 2
+        with pytest.raises(SchedulerTimeout):
+            with scheduler.slot("other"):
+                pass
+    assert scheduler.snapshot()["waiting"] == 0
+
+
+def test_medium_risk_turn_is_not_queued_behind_a_saturated_scheduler():
+    from backend.services.chat_service import ChatService
+
+    scheduler = FairScheduler(slots=1, timeout=0.05)
+    service = ChatService(llm_client=StubClient(), scheduler=scheduler)
+    with scheduler.slot("someone"):
+        response = service.process_message("I feel hopeless", user_id="medium-risk")
+        ordinary = service.process_message("I had an ok day", user_id="other")
+    assert response["crisis_level"] == "medium" and "degraded" not in response
+    assert response["message"] == "I'm here with you."
+    assert ordinary.get("degraded") is True
+
+
+def test_chat_endpoint_throttles_but_never_crisis_messages(monkeypatch):
+    import backend.app as app_module
+
+    service = app_module.get_chat_service()
+    monkeypatch.setattr(service, "llm_client", StubClient())
+    monkeypatch.setattr(app_module, "chat_rate_limiter", TokenBucketLimiter(rate_per_minute=1, burst=1))
+    client = TestClient(app_module.app)
+
+    assert client.post("/chat/", json={"message": "hello", "user_id": "rl"}).status_code == 200
+    throttled = client.post("/chat/", json={"message": "hello again", "user_id": "rl"})
+    assert throttled.status_code == 429 and int(throttled.headers["retry-after"]) >= 1
+    crisis = client.post("/chat/", json={"message": "I want to end my life", "user_id": "rl"})
+    assert crisis.status_code == 200 and crisis.json()["crisis_level"] == "high"
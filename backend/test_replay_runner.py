@@ -0,0 +1,35 @@
+"""
+Tests for the offline transcript replay runner
+"""
+
+import io
+import json
+
+from backend import replay_runner
+
+
+class StubClient:
+    def generate(self, model, prompt, options=None, timeout=None, **extra):
+        return {"response": "I'm here with you."}
+
+
+def test_replay_writes_per_turn_records(tmp_path, monkeypatch):
+    transcript = tmp_path / "conversations.jsonl"
+    transcript.write_text("\n".join([
+        json.dumps({"id": "a", "turns": ["I'm so anxious", {"user": "I want to end my life",
+                                                           "expect": {"crisis_level": "high"}}]}),
+        json.dumps({"id": "b", "turns": [{"user": "Things are better", "expect": {"crisis_level": "high"}}]})
+    ]))
+    monkeypatch.setattr(replay_runner, "OllamaClient", lambda *args, **kwargs: StubClient())
+
+    output = io.StringIO()
+    summary = replay_runner.run_replay(replay_runner.load_transcripts([str(transcript)]), output,
+                                       "stub-model", "http://stub", concurrency=2)
+
+    records = {(r["conversation_id"], r["turn"]): r for r in map(json.loads, output.getvalue().splitlines())}
+    assert summary["turns"] == 3
+    assert summary["mismatched_turns"] == 1
+    assert records[("a", 0)]["emotional_state"] == "anxious"
+    assert records[("a", 1)]["therapy_approach"] == "crisis_intervention"
+    assert records[("b", 0)]["mismatches"]["crisis_level"]["actual"] == "none"
+    assert records[("a", 0)]["response_length"] == len("I'm here with you.")
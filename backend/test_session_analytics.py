@@ -0,0 +1,111 @@
+"""
+Tests for the columnar session analytics store and its group-by queries
+"""
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from backend.services.chat_service import ChatService
+from backend.services.session_analytics import SessionAnalytics, session_key
+
+
+class StubClient:
+    def generate(self, model, prompt, options=None, timeout=None, **extra):
+        return {"response": "I hear you.", "eval_count": 12, "prompt_eval_count": 300,
+                "total_duration": 250_000_000}
+
+
+def entry(when, emotion="neutral", crisis="none", tier="large", total_ms=None):
+    return {"timestamp": when, "user_message": "not exported", "emotional_state": emotion,
+            "therapy_approach": "cognitive_behavioral_therapy", "crisis_level": crisis,
+            "llm_timings": {"total_ms": total_ms, "prompt_tokens": 300, "generated_tokens": 12} if total_ms else None,
+            "model_tier": tier}
+
+
+def test_turns_are_partitioned_by_day_and_grouped(tmp_path):
+    analytics = SessionAnalytics(str(tmp_path), flush_rows=2)
+    day_one = datetime(2024, 5, 1, 10, tzinfo=timezone.utc)
+    day_two = day_one + timedelta(days=1)
+    analytics.record_turn("s1", entry(day_one, "anxious", total_ms=100.0))
+    analytics.record_turn("s1", entry(day_one, "anxious", crisis="high", total_ms=300.0))
+    analytics.record_turn("s2", entry(day_two, "hopeful", tier=None))
+    analytics.flush()
+
+    assert sorted(os.listdir(tmp_path / "turns")) == ["day=2024-05-01", "day=2024-05-02"]
+    assert os.path.getsize(tmp_path / "turns" / "day=2024-05-01" / "llm_ms.f4") == 8
+    assert not any("user_message" in name for name in os.listdir(tmp_path / "turns" / "day=2024-05-01"))
+
+    rows = analytics.query("turns", group_by=["day", "emotional_state"],
+                           aggregates=["llm_ms:mean", "session:distinct", "degraded:sum"])
+    assert rows == [
+        {"day": "2024-05-01", "emotional_state": "anxious", "count": 2, "llm_ms_mean": 200.0,
+         "session_distinct": 1, "degraded_sum": 0.0},
+        {"day": "2024-05-02", "emotional_state": "hopeful", "count": 1, "llm_ms_mean": None,
+         "session_distinct": 1, "degraded_sum": 1.0},
+    ]
+    assert analytics.query("turns", where={"crisis_level": "high"}) == [{"count": 1}]
+    assert analytics.query("turns", since="2024-05-02") == [{"count": 1}]
+    with pytest.raises(ValueError):
+        analytics.query("turns", aggregates=["user_message:max"])
+
+
+def test_dictionaries_survive_reopening_and_new_values_get_new_codes(tmp_path):
+    analytics = SessionAnalytics(str(tmp_path))
+    analytics.record_turn("s1", entry(datetime.now(), tier="medium"))
+    analytics.flush()
+
+    reopened = SessionAnalytics(str(tmp_path))
+    with open(tmp_path / "schema.json") as handle:
+        assert json.load(handle)["dictionaries"]["model_tier"] == ["", "small", "large", "medium"]
+    assert reopened.query("turns", group_by=["model_tier"]) == [{"model_tier": "medium", "count": 1}]
+
+
+def test_torn_flush_only_counts_rows_present_in_every_column(tmp_path):
+    analytics = SessionAnalytics(str(tmp_path))
+    analytics.record_turn("s1", entry(datetime(2024, 5, 1, tzinfo=timezone.utc)))
+    analytics.flush()
+    with open(tmp_path / "turns" / "day=2024-05-01" / "ts.f8", "ab") as handle:
+        np.array([1714521600.0]).tofile(handle)
+    assert analytics.query("turns") == [{"count": 1}]
+
+
+def test_workers_sharing_a_directory_keep_codes_and_rows_aligned(tmp_path):
+    first, second = SessionAnalytics(str(tmp_path)), SessionAnalytics(str(tmp_path))
+    day = datetime(2024, 5, 1, 10, tzinfo=timezone.utc)
+    first.record_turn("s1", entry(day, tier="medium"))
+    second.record_turn("s2", entry(day, tier="tiny"))
+    first.flush()
+    # A flush cut short by a dying worker leaves one column a row ahead; the next flush realigns it
+    with open(tmp_path / "turns" / "day=2024-05-01" / "ts.f8", "ab") as handle:
+        np.array([day.timestamp()]).tofile(handle)
+    second.flush()
+
+    assert second.dictionaries["model_tier"] == ["", "small", "large", "medium", "tiny"]
+    assert first.query("turns", group_by=["model_tier"], aggregates=["session:distinct"]) == [
+        {"model_tier": "medium", "count": 1, "session_distinct": 1},
+        {"model_tier": "tiny", "count": 1, "session_distinct": 1},
+    ]
+    assert os.path.getsize(tmp_path / "turns" / "day=2024-05-01" / "ts.f8") == 16
+
+
+def test_chat_service_exports_turns_and_one_session_row(tmp_path):
+    analytics = SessionAnalytics(str(tmp_path))
+    service = ChatService(llm_client=StubClient(), analytics=analytics)
+    service.start_session("user-1")
+    service.process_message("I feel so anxious today")
+    service.process_message("thanks")
+    service.end_session()
+    service.end_session()
+
+    assert analytics.query("turns", group_by=["emotional_state"], aggregates=["llm_ms:max"]) == [
+        {"emotional_state": "neutral", "count": 1, "llm_ms_max": 250.0},
+        {"emotional_state": "anxious", "count": 1, "llm_ms_max": 250.0},
+    ]
+    sessions = analytics.load("sessions", ["session", "turns", "primary_emotion"])
+    assert list(sessions["turns"]) == [2]
+    assert sessions["session"][0] == session_key(service._session_id())
+    assert SessionAnalytics("").query("turns") == []
@@ -0,0 +1,108 @@
+"""
+Tests for the hashed-embedding session memory index and returning-user sessions
+"""
+
+import numpy as np
+
+from backend.services.chat_service import ChatService
+from backend.services.session_memory import HashedEmbedder, SessionMemoryIndex
+from backend.utils.therapy_prompts import TherapyPrompts
+
+
+class RecordingClient:
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, model, prompt, options=None, timeout=None, **extra):
+        self.prompts.append(prompt)
+        return {"response": "That sounds hard."}
+
+
+def test_embedding_is_normalised_and_stable():
+    embedder = HashedEmbedder(dim=256)
+    vector = embedder.embed("Panic attacks before my exams")
+    assert vector.dtype == np.float32 and abs(float(np.linalg.norm(vector)) - 1.0) < 1e-5
+    assert np.array_equal(vector, HashedEmbedder(dim=256).embed("panic attacks before my exams"))
+    assert not embedder.embed("...").any()
+
+
+def test_query_ranks_relevant_memories_of_the_same_user_only():
+    index = SessionMemoryIndex(directory="", initial_capacity=2)
+    index.add("ana", "User felt anxious: panic attacks before my exams")
+    index.add("ana", "User felt angry: my sister keeps borrowing money")
+    index.add("ana", "User felt depressed: I stopped going to the gym")
+    index.add("ben", "User felt anxious: panic attacks before exams at school")
+    results = index.query("ana", "my exams are next week and I'm panicking", k=2)
+    assert results[0]["text"].endswith("panic attacks before my exams")
+    assert all(r["user_id"] == "ana" for r in results)
+    assert index.query("nobody", "exams") == []
+    assert index.snapshot()["memories"] == 4  # grew past the initial capacity
+
+
+def test_index_persists_through_memory_mapped_files(tmp_path):
+    index = SessionMemoryIndex(directory=str(tmp_path), initial_capacity=1)
+    index.add("ana", "Session on 2026-01-01: worked on sleep routine", kind="summary")
+    index.add("ana", "User felt anxious: insomnia before work presentations")
+    index.flush()
+
+    reopened = SessionMemoryIndex(directory=str(tmp_path))
+    assert reopened.has_user("ana")
+    assert reopened.query("ana", "presentations keep me awake", k=1)[0]["kind"] == "turn"
+    assert reopened.recent("ana")[0]["text"].startswith("Session on 2026-01-01")
+
+
+def test_workers_sharing_a_directory_append_distinct_rows(tmp_path):
+    first = SessionMemoryIndex(directory=str(tmp_path), initial_capacity=1)
+    second = SessionMemoryIndex(directory=str(tmp_path), initial_capacity=1)
+    rows = [first.add("ana", "User felt anxious: panic attacks before exams"),
+            second.add("ben", "User felt angry: my landlord ignores the leak"),
+            first.add("ana", "User felt depressed: I stopped going to the gym")]
+    assert rows == [0, 1, 2]
+    # A line torn by a worker that died mid-append is dropped by the next writer
+    with open(tmp_path / "records.jsonl", "a") as handle:
+        handle.write('{"user_id": "ben", "kind": "tu')
+    assert second.add("ben", "User felt anxious: rent is due") == 3
+
+    reopened = SessionMemoryIndex(directory=str(tmp_path))
+    assert reopened.count == 4
+    assert second.query("ana", "exams make me panic", k=1)[0]["text"].endswith("before exams")
+    assert first.query("ben", "the landlord and the leak", k=1)[0]["user_id"] == "ben"
+    assert [r["user_id"] for r in reopened.query("ana", "gym", k=3)] == ["ana"]
+
+
+def test_returning_user_gets_starter_and_past_context():
+    client = RecordingClient()
+    service = ChatService(llm_client=client, session_memory=SessionMemoryIndex(directory=""))
+    starters = TherapyPrompts().conversation_starters
+
+    first = service.start_session("carol")
+    assert not first["returning_user"] and first["message"] in starters["first_session"]
+    service.process_message("I'm anxious about my driving test")
+    service.end_session()
+    service.end_session()  # a second end does not index the session twice
+    assert service.session_memory.snapshot()["memories"] == 2
+
+    second = service.start_session("carol")
+    assert second["returning_user"] and second["message"] in starters["returning_user"]
+    service.process_message("the driving test is tomorrow")
+    assert "PREVIOUS SESSION CONTEXT" in client.prompts[-1]
+    assert "anxious about my driving test" in client.prompts[-1]
+
+
+def test_memories_are_only_used_and_stored_for_the_session_owner():
+    client = RecordingClient()
+    memory = SessionMemoryIndex(directory="")
+    memory.add("carol", "Session on 2026-01-01: worked on nerves before my driving test", kind="summary")
+    service = ChatService(llm_client=client, session_memory=memory)
+
+    service.start_session("carol")
+    service.process_message("I'm anxious about the test", user_id="dave")
+    assert "driving test" not in client.prompts[-1]
+    service.process_message("the test is tomorrow and I'm anxious", user_id="carol")
+    assert "driving test" in client.prompts[-1]
+    service.end_session()
+
+    texts = [record["text"] for kind in ("summary", "turn") for record in memory.recent("carol", kind, limit=10)]
+    assert not memory.has_user("dave")
+    assert not any("I'm anxious about the test" in text for text in texts)
+    assert any("Total of 1 exchanges" in text for text in texts)
@@ -0,0 +1,115 @@
+"""
+Tests for the cross-worker shared cache and the caches built on it
+"""
+
+import asyncio
+import errno
+import multiprocessing
+import os
+
+from backend.services.idempotency import COMPUTED, REJECTED, REPLAYED, IdempotencyCache
+from backend.services.shared_cache import SharedLRU
+from backend.services.tts_cache import TTSCache
+
+
+def store_in_child(path, key, value):
+    cache = SharedLRU(path, capacity_bytes=64 << 10, slot_bytes=256)
+    cache.put(key, value)
+    cache.close()
+
+
+def test_values_stored_by_another_process_are_hits(tmp_path):
+    path = str(tmp_path / "cache.lru")
+    process = multiprocessing.get_context("spawn").Process(target=store_in_child,
+                                                           args=(path, "greeting", b"hello"))
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+
+    cache = SharedLRU(path, capacity_bytes=64 << 10, slot_bytes=256)
+    assert cache.get("greeting") == b"hello"
+    assert cache.get("missing") is None
+    snapshot = cache.snapshot()
+    assert (snapshot["entries"], snapshot["stores"], snapshot["hits"], snapshot["misses"]) == (1, 1, 1, 1)
+    # A different geometry never maps the same file
+    assert SharedLRU(path, capacity_bytes=64 << 10, slot_bytes=512).get("greeting") is None
+
+
+def test_least_recently_used_entry_of_a_full_set_is_evicted(tmp_path):
+    cache = SharedLRU(str(tmp_path / "cache.lru"), capacity_bytes=1, slot_bytes=16, ways=2)
+    assert cache.sets == 1
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.get("a")
+    cache.put("c", b"3")
+    assert [cache.get(key) for key in ("a", "b", "c")] == [b"1", None, b"3"]
+    cache.put("a", b"updated")
+    assert cache.get("a") == b"updated"
+    assert not cache.put("big", b"x" * 17)
+    assert cache.snapshot()["evictions"] == 1 and cache.snapshot()["rejected"] == 1
+
+
+def test_full_shared_memory_falls_back_to_in_process_caching(tmp_path, monkeypatch, caplog):
+    attempts = []
+
+    def no_space(fd, offset, length):
+        attempts.append(fd)
+        raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+    monkeypatch.setattr(os, "posix_fallocate", no_space)
+    shared = SharedLRU(str(tmp_path / "cache.lru"), capacity_bytes=64 << 10, slot_bytes=256)
+    idempotency = IdempotencyCache(shared=shared)
+    tts = TTSCache(lambda text, voice, audio_format: b"audio", cache_dir=str(tmp_path / "static"), shared=shared)
+
+    async def scenario():
+        computed = await idempotency.run("k", "f", lambda: asyncio.sleep(0, result={"message": "hi"}))
+        replayed = await idempotency.run("k", "f", lambda: asyncio.sleep(0, result={"message": "again"}))
+        return computed, replayed
+
+    assert asyncio.run(scenario()) == (({"message": "hi"}, COMPUTED), ({"message": "hi"}, REPLAYED))
+    assert tts.get("You are not alone") == b"audio" and tts.get("You are not alone") == b"audio"
+    assert tts.stats["dynamic_hits"] == 1
+    # The file is tried once and the failure logged once; later calls go straight to the fallback
+    assert len(attempts) == 1 and os.strerror(errno.ENOSPC) in shared.error
+    assert len([record for record in caplog.records if "unavailable" in record.message]) == 1
+    assert shared.snapshot()["error"] == shared.error and idempotency.snapshot()["shared"]["error"]
+
+
+def test_idempotent_result_is_replayed_by_another_worker(tmp_path):
+    path = str(tmp_path / "idempotency.lru")
+    first, second = IdempotencyCache(shared=SharedLRU(path)), IdempotencyCache(shared=SharedLRU(path))
+
+    admitted = []
+
+    def admit():
+        admitted.append(1)
+        return True
+
+    async def scenario():
+        computed = await first.run("k", "f", lambda: asyncio.sleep(0, result={"message": "hi"}), admit=admit)
+        replayed = await second.run("k", "f", lambda: asyncio.sleep(0, result={"message": "again"}), admit=admit)
+        rejected = await second.run("other", "f", lambda: asyncio.sleep(0, result={}), admit=lambda: False)
+        await second.run("submit", "f", lambda: asyncio.sleep(0, result={}), store=False)
+        return computed, replayed, rejected
+
+    computed, replayed, rejected = asyncio.run(scenario())
+    assert replayed == ({"message": "hi"}, REPLAYED) and computed[0] == replayed[0]
+    assert rejected == (None, REJECTED)
+    # Only the computed request was admitted, and each stored request looked the shared cache up once
+    assert len(admitted) == 1
+    shared = second.snapshot()["shared"]
+    assert (shared["hits"], shared["misses"]) == (1, 2)
+
+
+def test_live_speech_synthesized_once_across_workers(tmp_path):
+    calls = []
+
+    def engine(text, voice, audio_format):
+        calls.append(text)
+        return text.encode("utf-8") * 4
+
+    shared = str(tmp_path / "tts.lru")
+    workers = [TTSCache(engine, cache_dir=str(tmp_path / "static"), shared=SharedLRU(shared)) for _ in range(2)]
+    assert workers[0].get("You are not alone") == workers[1].get("You are not alone")
+    assert len(calls) == 1
+    assert workers[1].stats["shared_hits"] == 1 and not workers[0]._dynamic
@@ -0,0 +1,81 @@
+"""
+Tests for sentence splitting and pipelined speech synthesis
+"""
+
+import random
+import threading
+import time
+
+from backend.services.chat_service import ChatService
+from backend.services.speech_pipeline import SentenceSplitter, SpeechPipeline
+
+
+def split_stream(text, splitter, chunk=3):
+    sentences = []
+    for i in range(0, len(text), chunk):
+        sentences.extend(splitter.feed(text[i:i + chunk]))
+    return sentences + splitter.flush()
+
+
+def test_splitter_handles_token_boundaries_and_abbreviations():
+    text = "I hear you. Dr. Smith said that too! What happened next?\nLet's talk."
+    sentences = split_stream(text, SentenceSplitter(min_chars=0))
+    assert sentences == ["I hear you.", "Dr. Smith said that too!", "What happened next?", "Let's talk."]
+
+
+def test_splitter_merges_short_sentences():
+    sentences = split_stream("Okay. I understand how hard this is. Yes.", SentenceSplitter(min_chars=20))
+    assert sentences == ["Okay. I understand how hard this is.", "Yes."]
+
+
+def test_pipeline_preserves_order():
+    def synthesize(text):
+        time.sleep(random.uniform(0, 0.02))
+        return text.encode("utf-8")
+
+    pipeline = SpeechPipeline(synthesize, max_workers=4, min_chars=0)
+    reply = " ".join(f"Sentence number {i}." for i in range(12))
+    chunks = list(pipeline.stream(word + " " for word in reply.split(" ")))
+    pipeline.shutdown()
+
+    assert [c["index"] for c in chunks] == list(range(12))
+    assert b" ".join(c["audio"] for c in chunks).decode() == reply
+
+
+def test_closing_the_stream_early_stops_reading_and_synthesis():
+    pulled, synthesized, closed = [], [], threading.Event()
+
+    def tokens():
+        try:
+            for i in range(1000):
+                pulled.append(i)
+                time.sleep(0.001)
+                yield f"Sentence number {i}. "
+        finally:
+            closed.set()
+
+    def synthesize(text):
+        synthesized.append(text)
+        time.sleep(0.01)
+        return text.encode("utf-8")
+
+    pipeline = SpeechPipeline(synthesize, max_workers=1, min_chars=0)
+    stream = pipeline.stream(tokens())
+    assert next(stream)["index"] == 0
+    stream.close()
+
+    assert closed.wait(2.0)
+    pipeline.shutdown()
+    time.sleep(0.05)
+    assert len(pulled) < 1000
+    # Sentences queued behind the one being played were cancelled rather than synthesized
+    assert len(synthesized) < len(pulled) - 1
+
+
+def test_stream_message_records_exchange(monkeypatch):
+    service = ChatService()
+    monkeypatch.setattr(service, "_stream_response", lambda prompt, timings=None, model=None, num_predict=None: iter(["I'm ", "here ", "for you."]))
+    assert "".join(service.stream_message("I'm worried about tomorrow")) == "I'm here for you."
+    entry = service.conversation_history[-1]
+    assert entry["ai_response"] == "I'm here for you."
+    assert entry["emotional_state"] == "anxious"
@@ -0,0 +1,75 @@
+"""
+Tests for the queue-based structured logging pipeline
+"""
+
+import hashlib
+import io
+import json
+import logging
+import threading
+
+from backend.services.chat_service import ChatService
+from backend.utils.structured_logging import (
+    bind_context,
+    configure_logging,
+    redact,
+    reset_context,
+    shutdown_logging,
+)
+
+
+class StubClient:
+    def generate(self, model, prompt, options=None, timeout=None, **extra):
+        return {"response": "I'm here with you."}
+
+
+class BlockingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.release.wait()
+        return super().write(text)
+
+
+def read_lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_turn_log_has_context_and_redacted_text():
+    stream = io.StringIO()
+    configure_logging(stream=stream)
+    try:
+        service = ChatService(llm_client=StubClient())
+        token = bind_context(request_id="req-1")
+        try:
+            service.process_message("I'm so anxious about my exam")
+        finally:
+            reset_context(token)
+    finally:
+        shutdown_logging()
+
+    turn = next(entry for entry in read_lines(stream) if entry["message"] == "chat_turn")
+    assert turn["request_id"] == "req-1"
+    assert turn["session_id"] == str(service.session_context["session_start"].timestamp())
+    assert turn["user_message"]["chars"] == len("I'm so anxious about my exam")
+    assert "exam" not in json.dumps(turn)
+    # The digest is keyed, so it cannot be matched against hashes of guessed messages
+    assert turn["user_message"]["hmac"] == redact("I'm so anxious about my exam")["hmac"]
+    assert turn["user_message"]["hmac"] != hashlib.sha256(b"I'm so anxious about my exam").hexdigest()[:12]
+    assert set(turn["stage_ms"]) >= {"crisis_detection", "prompt_build", "llm", "total"}
+
+
+def test_full_queue_drops_instead_of_blocking():
+    stream = BlockingStream()
+    handler = configure_logging(stream=stream, max_queue=2)
+    log = logging.getLogger("backend.test")
+    try:
+        for i in range(50):
+            log.info("event %d", i)
+        assert handler.dropped >= 45
+    finally:
+        stream.release.set()
+        shutdown_logging()
+    assert len(read_lines(stream)) == 50 - handler.dropped
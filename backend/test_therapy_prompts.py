@@ -12,6 +12,7 @@ from enum import Enum
 import subprocess
 import pytest
 from utils.therapy_prompts import TherapyPrompts, EmotionalState, TherapyApproach, detect_crisis_level
+from models.llm_handler import DEFAULT_OLLAMA_URL
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -250,7 +251,7 @@ class EnhancedTherapyTester:
         """Test if Ollama is running and model is available"""
         try:
             # Check if Ollama is running
-            response = requests.get('http://localhost:11434/api/tags', timeout=5)
+            response = requests.get(f'{DEFAULT_OLLAMA_URL}/api/tags', timeout=5)
             if response.status_code != 200:
                 return False
             
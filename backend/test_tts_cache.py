@@ -0,0 +1,89 @@
+"""
+Tests for the precomputed TTS cache
+"""
+
+from backend.services.tts_cache import TTSCache, static_utterances
+from backend.services.voice_service import VoiceService
+from backend.utils.therapy_prompts import TherapyPrompts, CRISIS_RESOURCES
+
+
+class CountingEngine:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text, voice, audio_format):
+        self.calls += 1
+        return f"{voice}:{audio_format}:{text}".encode("utf-8")
+
+
+def test_static_catalog_covers_crisis_lines():
+    utterances = dict(static_utterances(TherapyPrompts()))
+    prompts = TherapyPrompts()
+    for text in prompts.crisis_prompts["immediate_safety"]:
+        assert utterances[text] is True
+    for text in prompts.closing_prompts["encouragement"]:
+        assert utterances[text] is False
+    assert utterances[CRISIS_RESOURCES["immediate_actions"][0]] is True
+
+
+def test_warmed_entries_served_from_disk(tmp_path):
+    engine = CountingEngine()
+    cache = TTSCache(engine, cache_dir=str(tmp_path))
+    assert cache.warm([("Are you safe?", True)]) == 1
+    assert cache.get("Are you safe?") == b"default:wav:Are you safe?"
+    assert engine.calls == 1
+    assert cache.stats["static_hits"] == 1
+
+    # A second worker maps the same files without synthesizing again
+    other = TTSCache(engine, cache_dir=str(tmp_path))
+    assert other.warm([("Are you safe?", True)]) == 0
+    assert other.get("Are you safe?") == b"default:wav:Are you safe?"
+    assert engine.calls == 1
+
+
+def test_only_catalog_lines_are_looked_up_on_disk(tmp_path, monkeypatch):
+    engine = CountingEngine()
+    TTSCache(engine, cache_dir=str(tmp_path)).warm([("Are you safe?", True)])
+    opened = []
+    map_file = TTSCache._map_file
+    monkeypatch.setattr(TTSCache, "_map_file", staticmethod(lambda path, pin=False: opened.append(path) or
+                                                             map_file(path, pin)))
+
+    # A worker that did not warm maps a catalog line rendered by another, but never stats live replies
+    worker = TTSCache(engine, cache_dir=str(tmp_path), static_texts=["Are you safe?"])
+    assert worker.get("Are you safe?") == b"default:wav:Are you safe?" and worker.get("Are you safe?")
+    assert worker.get("That sounds hard") and worker.get("That sounds hard")
+    assert len(opened) == 1 and engine.calls == 2
+    assert worker.stats["static_hits"] == 2 and worker.stats["dynamic_hits"] == 1
+
+
+def test_key_includes_voice_and_format(tmp_path):
+    engine = CountingEngine()
+    cache = TTSCache(engine, cache_dir=str(tmp_path))
+    assert cache.get("hello", "calm", "wav") != cache.get("hello", "calm", "mp3")
+    assert cache.get("hello", "warm", "wav") == b"warm:wav:hello"
+    assert engine.calls == 3
+
+
+def test_dynamic_lru_eviction(tmp_path):
+    engine = CountingEngine()
+    cache = TTSCache(engine, cache_dir=str(tmp_path), max_dynamic_entries=2)
+    cache.get("one")
+    cache.get("two")
+    cache.get("one")
+    cache.get("three")
+    assert cache.stats["evictions"] == 1
+    cache.get("one")
+    assert cache.stats["dynamic_hits"] == 2
+    cache.get("two")
+    assert engine.calls == 4
+
+
+def test_voice_service_warm_and_synthesize(tmp_path):
+    engine = CountingEngine()
+    service = VoiceService(tts_engine=engine, tts_cache_dir=str(tmp_path))
+    warmed = service.warm_tts_cache()
+    assert warmed == engine.calls > 0
+    crisis_line = TherapyPrompts().crisis_prompts["de_escalation"][0]
+    assert service.synthesize_speech(crisis_line).endswith(crisis_line.encode("utf-8"))
+    assert engine.calls == warmed
@@ -1,3 +1,18 @@
+"""
+Audio utilities for the voice pipeline
+Includes a CPU-only voice activity detector (VAD) used to trim silence
+before audio is handed to a speech-to-text backend
+"""
+
+import io
+import wave
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+DEFAULT_SAMPLE_RATE = 16000
+
+
 def convert_wav_to_mp3(wav_bytes: bytes) -> bytes:
     # Placeholder: implement audio conversion logic
     return wav_bytes
@@ -5,3 +20,191 @@ def convert_wav_to_mp3(wav_bytes: bytes) -> bytes:
 def normalize_audio(audio_bytes: bytes) -> bytes:
     # Placeholder: implement normalization logic
     return audio_bytes
+
+
+def decode_pcm16(audio_bytes: bytes, sample_rate: int = DEFAULT_SAMPLE_RATE) -> Tuple[np.ndarray, int]:
+    """
+    Decode 16-bit PCM audio into float samples in [-1, 1]
+
+    Args:
+        audio_bytes: WAV file bytes, or raw little-endian mono PCM16
+        sample_rate: Sample rate to assume for raw PCM input
+
+    Returns:
+        (mono float32 samples, sample rate)
+    """
+    if audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE":
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError("Only 16-bit PCM WAV audio is supported")
+            channels = wav.getnchannels()
+            sample_rate = wav.getframerate()
+            pcm = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+        if channels > 1:
+            pcm = pcm.reshape(-1, channels).mean(axis=1)
+    else:
+        usable = len(audio_bytes) - (len(audio_bytes) % 2)
+        pcm = np.frombuffer(audio_bytes[:usable], dtype="<i2")
+
+    return pcm.astype(np.float32) / 32768.0, sample_rate
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int = DEFAULT_SAMPLE_RATE) -> bytes:
+    """
+    Encode float samples in [-1, 1] as a mono 16-bit PCM WAV file
+    """
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def _frame_features(samples: np.ndarray, frame_length: int, hop_length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute per-frame log energy (dB) and zero-crossing rate without copying frames
+    """
+    if len(samples) < frame_length:
+        samples = np.pad(samples, (0, frame_length - len(samples)))
+    frames = np.lib.stride_tricks.sliding_window_view(samples, frame_length)[::hop_length]
+
+    energy = np.einsum("ij,ij->i", frames, frames) / frame_length
+    energy_db = 10.0 * np.log10(energy + 1e-10)
+
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_length - 1)
+    return energy_db, zcr
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return (starts, ends) of the True runs in a boolean array, ends exclusive
+    """
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detect_voice_activity(samples: np.ndarray,
+                          sample_rate: int = DEFAULT_SAMPLE_RATE,
+                          frame_ms: float = 30.0,
+                          hop_ms: float = 10.0,
+                          energy_margin_db: float = 12.0,
+                          min_energy_db: float = -60.0,
+                          max_noise_db: float = -40.0,
+                          zcr_threshold: float = 0.25) -> np.ndarray:
+    """
+    Classify each frame as speech or silence
+
+    A frame is speech when its energy clears the adaptive noise floor by
+    `energy_margin_db`, or when it sits within half that margin and has a
+    high zero-crossing rate (unvoiced consonants such as "s" and "f").
+    The floor is estimated from the quietest frames, but never above
+    `max_noise_db`, so a clip of continuous speech is not its own floor.
+
+    Args:
+        samples: Mono float samples in [-1, 1]
+        sample_rate: Sample rate of `samples`
+        frame_ms: Analysis window length
+        hop_ms: Step between consecutive frames
+        energy_margin_db: Required energy above the estimated noise floor
+        min_energy_db: Absolute floor below which a frame is always silence
+        max_noise_db: Loudest noise floor assumed, for clips with no pauses
+        zcr_threshold: Zero-crossing rate that marks an unvoiced speech frame
+
+    Returns:
+        Boolean array with one entry per hop
+    """
+    frame_length = max(int(sample_rate * frame_ms / 1000), 2)
+    hop_length = max(int(sample_rate * hop_ms / 1000), 1)
+    energy_db, zcr = _frame_features(samples, frame_length, hop_length)
+
+    noise_floor = min(np.percentile(energy_db, 10), max_noise_db)
+    threshold = max(noise_floor + energy_margin_db, min_energy_db)
+    voiced = energy_db > threshold
+    unvoiced = (energy_db > threshold - energy_margin_db / 2) & (zcr > zcr_threshold) & (energy_db > min_energy_db)
+    return voiced | unvoiced
+
+
+def find_speech_segments(samples: np.ndarray,
+                         sample_rate: int = DEFAULT_SAMPLE_RATE,
+                         min_silence_ms: float = 600.0,
+                         min_speech_ms: float = 120.0,
+                         padding_ms: float = 150.0,
+                         hop_ms: float = 10.0,
+                         **vad_options) -> List[Tuple[int, int]]:
+    """
+    Find speech utterances, trimming leading/trailing silence and
+    splitting at pauses longer than `min_silence_ms`
+
+    Args:
+        samples: Mono float samples in [-1, 1]
+        sample_rate: Sample rate of `samples`
+        min_silence_ms: Pauses shorter than this stay inside one utterance
+        min_speech_ms: Utterances shorter than this are treated as noise
+        padding_ms: Context kept on each side of an utterance
+        hop_ms: Frame step passed to `detect_voice_activity`
+        **vad_options: Extra options for `detect_voice_activity`
+
+    Returns:
+        List of (start_sample, end_sample) pairs, end exclusive
+    """
+    if len(samples) == 0:
+        return []
+
+    speech = detect_voice_activity(samples, sample_rate, hop_ms=hop_ms, **vad_options)
+    hop_length = max(int(sample_rate * hop_ms / 1000), 1)
+
+    # Close short pauses so one utterance is not split mid-sentence
+    gap_starts, gap_ends = _runs(~speech)
+    max_gap = int(min_silence_ms / hop_ms)
+    for start, end in zip(gap_starts, gap_ends):
+        if start > 0 and end < len(speech) and end - start < max_gap:
+            speech[start:end] = True
+
+    starts, ends = _runs(speech)
+    keep = (ends - starts) >= int(min_speech_ms / hop_ms)
+    if not keep.any():
+        return []
+
+    padding = int(sample_rate * padding_ms / 1000)
+    bounds = np.stack((starts[keep] * hop_length - padding,
+                       ends[keep] * hop_length + padding), axis=1)
+    bounds = np.clip(bounds, 0, len(samples))
+
+    # Padding may make neighbours overlap; merge them
+    segments: List[Tuple[int, int]] = []
+    for start, end in bounds.tolist():
+        if segments and start <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], max(end, segments[-1][1]))
+        else:
+            segments.append((start, end))
+    return segments
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int = DEFAULT_SAMPLE_RATE, **options) -> np.ndarray:
+    """
+    Remove leading and trailing silence, keeping pauses between utterances
+    """
+    segments = find_speech_segments(samples, sample_rate, **options)
+    if not segments:
+        return samples[:0]
+    return samples[segments[0][0]:segments[-1][1]]
+
+
+def segment_stats(total_samples: int, segments: List[Tuple[int, int]], sample_rate: int) -> Dict:
+    """
+    Summarize how much audio a segmentation keeps and drops
+    """
+    speech_samples = sum(end - start for start, end in segments)
+    total_seconds = total_samples / sample_rate if sample_rate else 0.0
+    speech_seconds = speech_samples / sample_rate if sample_rate else 0.0
+    return {
+        "total_seconds": total_seconds,
+        "speech_seconds": speech_seconds,
+        "dropped_seconds": total_seconds - speech_seconds,
+        "dropped_fraction": (1 - speech_samples / total_samples) if total_samples else 0.0,
+        "segments": len(segments)
+    }
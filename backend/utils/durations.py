@@ -0,0 +1,40 @@
+"""
+Duration parsing
+Ollama takes keep_alive as seconds or a Go-style duration string; the
+backend and the fake server both need it in seconds
+"""
+
+import re
+from typing import Union
+
+UNIT_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+_PART = re.compile(r"(\d+(?:\.\d*)?|\.\d+)(ms|s|m|h)")
+
+
+def parse_duration(value: Union[str, int, float]) -> float:
+    """
+    Convert a keep_alive value such as 300, '-1', '30s', '5m' or '1h30m' to seconds
+
+    Args:
+        value: Seconds as a number or numeric string, or a duration string; negative means forever
+
+    Returns:
+        Seconds as a float
+
+    Raises:
+        ValueError: Not a number or duration string
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = value.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    sign = -1.0 if text.startswith("-") else 1.0
+    body = text.lstrip("+-")
+    parts = _PART.findall(body)
+    if not parts or "".join(number + unit for number, unit in parts) != body:
+        raise ValueError(f"invalid duration {value!r}")
+    return sign * sum(float(number) * UNIT_SECONDS[unit] for number, unit in parts)
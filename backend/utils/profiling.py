@@ -0,0 +1,288 @@
+"""
+On-demand profiling for live workers
+Sampled per-request cProfile and wall-clock stack sampling of a single
+thread (normally the event loop), both exported as collapsed stacks that
+flamegraph.pl, speedscope and inferno read directly. While no profiling
+window is open the request path pays one attribute check. Work a profiled
+request hands to the threadpool through ProfilingSession.call is profiled
+in the worker thread and merged into the request's profile
+"""
+
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import cProfile
+    import pstats
+
+# Innermost frames that mean an idle event loop waiting in the selector
+IDLE_FUNCTIONS = {"select", "poll", "epoll", "kqueue", "control"}
+
+# Profiler of the request being handled; threadpool calls run in a copy of the request's context
+_request_profiler: contextvars.ContextVar[Optional["cProfile.Profile"]] = contextvars.ContextVar(
+    "request_profiler", default=None)
+
+# Guards against runaway recursion when unfolding the cProfile call graph
+MAX_STACK_DEPTH = 64
+
+
+def _label(filename: str, function: str) -> str:
+    return f"{os.path.basename(filename) or filename}:{function}"
+
+
+def collapse_frame(frame) -> str:
+    """
+    Render a frame and its callers as a root-first collapsed stack
+    """
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(_label(code.co_filename, code.co_name))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def render_collapsed(stacks: Dict[str, float]) -> str:
+    """
+    One "frame;frame;frame count" line per stack, heaviest first
+    """
+    lines = [f"{stack} {int(round(count))}" for stack, count in
+             sorted(stacks.items(), key=lambda item: -item[1]) if round(count) > 0]
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def pstats_to_collapsed(stats: "pstats.Stats") -> Dict[str, float]:
+    """
+    Unfold a cProfile call graph into collapsed stacks weighted in microseconds
+
+    cProfile only keeps caller/callee edges, so time below a function that is
+    reached along several paths is split in proportion to each edge's
+    cumulative time. Exact for tree-shaped call graphs, an approximation otherwise.
+    """
+    entries = stats.stats
+    children: Dict[Tuple, List[Tuple[Tuple, float]]] = {}
+    for callee, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((callee, edge[3]))
+
+    stacks: Dict[str, float] = Counter()
+
+    def walk(function, path: List[Tuple], labels: List[str], weight: float) -> None:
+        _, _, self_time, cumulative, _ = entries[function]
+        labels = labels + [_label(function[0], function[2])]
+        stack = ";".join(labels)
+        stacks[stack] += self_time * weight * 1e6
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for child, edge_time in children.get(function, ()):
+            child_cumulative = entries[child][3]
+            if child in path or not child_cumulative:
+                continue
+            walk(child, path + [child], labels, weight * edge_time / child_cumulative)
+
+    roots = [function for function, entry in entries.items()
+             if not any(caller in entries for caller in entry[4])]
+    for root in roots:
+        walk(root, [root], [], 1.0)
+    return stacks
+
+
+class StackSampler:
+    """
+    Wall-clock sampler of one thread's Python stack
+
+    Samples are taken from a background thread with sys._current_frames(),
+    so a call that blocks the target thread (a synchronous HTTP request on
+    the event loop, for example) shows up in proportion to how long it blocks.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            self.samples += 1
+            if frame.f_code.co_name in IDLE_FUNCTIONS:
+                self.idle_samples += 1
+                continue
+            self.stacks[collapse_frame(frame)] += 1
+
+    def summary(self) -> Dict:
+        busy = self.samples - self.idle_samples
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "busy_samples": busy,
+            "busy_fraction": round(busy / self.samples, 3) if self.samples else 0.0,
+            "distinct_stacks": len(self.stacks)
+        }
+
+
+class ProfilingSession:
+    """
+    Process-wide switch for request profiling and event loop sampling
+
+    A window closes after `max_requests` profiled requests or `duration`
+    seconds, whichever comes first. Only one request is profiled at a time,
+    because a thread can have a single active profiler.
+    """
+
+    def __init__(self):
+        self.active = False
+        self._lock = threading.Lock()
+        self._busy = False
+        self._deadline = 0.0
+        self._sample_rate = 1.0
+        self._remaining = 0
+        self._stats: Optional["pstats.Stats"] = None
+        self.profiled_requests = 0
+        self.sampler: Optional[StackSampler] = None
+
+    def start(self, duration: float = 30.0, max_requests: int = 100, sample_rate: float = 1.0,
+              loop_thread_id: Optional[int] = None, interval: float = 0.005) -> Dict:
+        """
+        Open a profiling window, discarding results from the previous one
+
+        Args:
+            duration: Seconds before the window closes
+            max_requests: Requests to profile before the window closes
+            sample_rate: Fraction of requests in the window to profile
+            loop_thread_id: Thread to stack-sample for the window, None to skip
+            interval: Seconds between stack samples
+        """
+        with self._lock:
+            self._stop_sampler()
+            self._deadline = time.monotonic() + duration
+            self._remaining = max_requests
+            self._sample_rate = sample_rate
+            self._stats = None
+            self.profiled_requests = 0
+            if loop_thread_id is not None:
+                self.sampler = StackSampler(loop_thread_id, interval).start()
+            self.active = True
+        return self.status()
+
+    def stop(self) -> Dict:
+        with self._lock:
+            self.active = False
+            self._stop_sampler()
+        return self.status()
+
+    def _stop_sampler(self) -> None:
+        if self.sampler is not None and self.sampler.running:
+            self.sampler.stop()
+
+    def _expired(self) -> bool:
+        return self._remaining <= 0 or time.monotonic() >= self._deadline
+
+    def begin_request(self) -> Optional["cProfile.Profile"]:
+        """
+        Start profiling the current request if it is picked, returning its profiler
+        """
+        with self._lock:
+            if not self.active:
+                return None
+            if self._expired():
+                self.active = False
+                self._stop_sampler()
+                return None
+            if self._busy or (self._sample_rate < 1.0 and random.random() >= self._sample_rate):
+                return None
+            self._busy = True
+            self._remaining -= 1
+        # Imported on first use so app startup does not pay for the profiler modules
+        import cProfile
+        profiler = cProfile.Profile()
+        # cProfile only sees its own thread; call() collects the request's worker-thread profiles here
+        profiler.thread_profilers = []
+        profiler.context_token = _request_profiler.set(profiler)
+        profiler.enable()
+        return profiler
+
+    def end_request(self, profiler: "cProfile.Profile") -> None:
+        import pstats
+        profiler.disable()
+        _request_profiler.reset(profiler.context_token)
+        with self._lock:
+            self._busy = False
+            self.profiled_requests += 1
+            for part in [profiler] + profiler.thread_profilers:
+                if self._stats is None:
+                    self._stats = pstats.Stats(part)
+                else:
+                    self._stats.add(part)
+            if self._expired():
+                self.active = False
+                self._stop_sampler()
+
+    @staticmethod
+    def call(func: Callable, *args: Any) -> Any:
+        """
+        Run `func`, profiling it as part of the current request when that request is profiled
+
+        Meant for the callable handed to run_in_threadpool, which runs it in
+        another thread with a copy of the request's context.
+        """
+        request_profiler = _request_profiler.get()
+        if request_profiler is None:
+            return func(*args)
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func(*args)
+        finally:
+            profiler.disable()
+            request_profiler.thread_profilers.append(profiler)
+
+    def request_stacks(self) -> str:
+        with self._lock:
+            if self._stats is None:
+                return ""
+            return render_collapsed(pstats_to_collapsed(self._stats))
+
+    def loop_stacks(self) -> str:
+        return render_collapsed(dict(self.sampler.stacks)) if self.sampler else ""
+
+    def status(self) -> Dict:
+        return {
+            "active": self.active,
+            "seconds_remaining": round(max(self._deadline - time.monotonic(), 0.0), 3) if self.active else 0.0,
+            "requests_remaining": max(self._remaining, 0) if self.active else 0,
+            "profiled_requests": self.profiled_requests,
+            "event_loop": self.sampler.summary() if self.sampler else None
+        }
+
+
+# Process-wide session driven by the /admin/profile endpoints
+PROFILER = ProfilingSession()
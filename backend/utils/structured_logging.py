@@ -0,0 +1,174 @@
+"""
+Structured logging off the request path
+Log calls only enqueue the record; a background listener thread formats it
+as one JSON line and does the I/O. Records carry the request and session
+ids bound in contextvars, the queue is bounded (records are dropped and
+counted rather than blocking a request), and conversation text is redacted
+"""
+
+import contextvars
+import hashlib
+import hmac
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from .metrics import REGISTRY
+
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full")
+
+# Fields whose values are user or model text and never reach the log output
+REDACTED_FIELDS = {"user_message", "ai_response", "message_text", "prompt", "response_text", "transcript"}
+
+# Secret for the digests that correlate repeated messages; a plain hash of a short message can be reversed
+# by hashing guesses. Set it per deployment to correlate across workers and restarts, otherwise each process
+# draws its own
+LOG_HASH_KEY = os.environ.get("LOG_HASH_KEY", "").encode("utf-8") or os.urandom(32)
+
+# Attributes every LogRecord has; anything else came from `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_log_context: contextvars.ContextVar[Dict] = contextvars.ContextVar("log_context", default={})
+
+_listener: Optional["BlockingStopQueueListener"] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+def new_request_id() -> str:
+    return os.urandom(8).hex()
+
+
+def bind_context(**fields) -> contextvars.Token:
+    """
+    Add fields (request_id, session_id, ...) to every record logged from this context
+
+    Returns:
+        Token for reset_context
+    """
+    return _log_context.set({**_log_context.get(), **fields})
+
+
+def reset_context(token: contextvars.Token) -> None:
+    _log_context.reset(token)
+
+
+def get_context() -> Dict:
+    return _log_context.get()
+
+
+def redact(text: str) -> Dict:
+    """
+    Stand-in for conversation text: its length and a short keyed digest to correlate repeats
+    """
+    return {"chars": len(text),
+            "hmac": hmac.new(LOG_HASH_KEY, text.encode("utf-8"), hashlib.sha256).hexdigest()[:12]}
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks and defers formatting to the listener
+
+    The stock QueueHandler formats the message on the calling thread; here
+    the caller only snapshots the log context (and any traceback, which
+    must not outlive its frames) and enqueues the record.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.context = _log_context.get()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+
+class BlockingStopQueueListener(logging.handlers.QueueListener):
+    """
+    Queue listener whose stop waits for room in a full queue instead of raising
+    """
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, logger, message, bound context and extra fields
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update(getattr(record, "context", None) or {})
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key != "context":
+                entry[key] = value
+        for key in REDACTED_FIELDS.intersection(entry):
+            if isinstance(entry[key], str):
+                entry[key] = redact(entry[key])
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: int = logging.INFO, stream=None, max_queue: int = 10000) -> NonBlockingQueueHandler:
+    """
+    Route the root logger through a bounded queue to a background JSON writer
+
+    Safe to call more than once; later calls replace the earlier pipeline.
+
+    Args:
+        level: Root log level
+        stream: Output stream for the writer thread, stdout by default
+        max_queue: Records buffered before new ones are dropped
+
+    Returns:
+        The installed queue handler (its `dropped` attribute counts drops)
+    """
+    global _listener, _queue_handler
+    shutdown_logging()
+
+    log_queue: queue.Queue = queue.Queue(maxsize=max_queue)
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(JsonFormatter())
+    _listener = BlockingStopQueueListener(log_queue, writer, respect_handler_level=True)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    _listener.start()
+    return _queue_handler
+
+
+def shutdown_logging() -> None:
+    """
+    Flush queued records and detach the pipeline installed by configure_logging
+    """
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -3,10 +3,27 @@ Therapeutic Prompt Templates for AI Mental Health Counselor
 Contains evidence-based therapeutic frameworks and conversation templates
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from enum import Enum
+import os
 import random
 
+# Prompt profiles: "full" is the original wording, "compact" keeps the safety protocols with far fewer tokens
+FULL_PROFILE = "full"
+COMPACT_PROFILE = "compact"
+PROMPT_PROFILES = (FULL_PROFILE, COMPACT_PROFILE)
+DEFAULT_PROMPT_PROFILE = os.environ.get("PROMPT_PROFILE", FULL_PROFILE)
+
+# Sections of build_prompt_sections that change from turn to turn; the rest is the stable system prompt
+TURN_SECTIONS = ("crisis_banner", "emotional_context", "approach_guidance", "closing_instruction")
+
+# Kept word for word in every profile
+SAFETY_PROTOCOLS = """SAFETY PROTOCOLS:
+- Always assess for crisis indicators (suicidal ideation, self-harm, severe distress)
+- Implement crisis intervention protocols immediately when needed
+- Connect users with professional resources when appropriate
+- Document concerning statements for follow-up"""
+
 class TherapyApproach(Enum):
     """Different therapeutic approaches supported"""
     CBT = "cognitive_behavioral_therapy"
@@ -31,14 +48,21 @@ class TherapyPrompts:
     Comprehensive therapeutic prompt system with evidence-based approaches
     """
     
-    def __init__(self):
-        self.base_system_prompt = self._get_base_system_prompt()
+    def __init__(self, profile: str = DEFAULT_PROMPT_PROFILE):
+        if profile not in PROMPT_PROFILES:
+            raise ValueError(f"Unknown prompt profile {profile!r}, expected one of {PROMPT_PROFILES}")
+        self.profile = profile
+        if profile == COMPACT_PROFILE:
+            self.base_system_prompt = self._get_compact_system_prompt()
+        else:
+            self.base_system_prompt = self._get_base_system_prompt()
         self.conversation_starters = self._get_conversation_starters()
         self.therapeutic_techniques = self._get_therapeutic_techniques()
         self.crisis_prompts = self._get_crisis_prompts()
         self.assessment_prompts = self._get_assessment_prompts()
         self.emotional_responses = self._get_emotional_responses()
         self.closing_prompts = self._get_closing_prompts()
+        self.approach_guidance = self._get_approach_guidance()
     
     def _get_base_system_prompt(self) -> str:
         """Core system prompt defining the AI's therapeutic persona"""
@@ -75,6 +99,16 @@ CONVERSATION STYLE:
 - Offer practical exercises and homework when appropriate
 
 Remember: You are a supportive companion in their mental health journey, not a replacement for professional therapy when clinical intervention is needed.
+"""
+    
+    def _get_compact_system_prompt(self) -> str:
+        """Shorter persona for the compact profile; the safety protocols are unchanged"""
+        return f"""
+You are Alex, a compassionate AI mental health counselor using evidence-based approaches (CBT, DBT, humanistic therapy). Validate feelings, listen reflectively, ask open questions and offer practical coping strategies. Speak naturally, not clinically.
+
+{SAFETY_PROTOCOLS}
+
+You are a supportive companion, not a replacement for professional therapy when clinical intervention is needed.
 """
     
     def _get_conversation_starters(self) -> Dict[str, List[str]]:
@@ -309,6 +343,17 @@ Remember: You are a supportive companion in their mental health journey, not a r
             ]
         }
     
+    def _get_approach_guidance(self) -> Dict[TherapyApproach, str]:
+        """One-line focus statement for each therapeutic approach"""
+        return {
+            TherapyApproach.CBT: "Focus on identifying and challenging negative thought patterns. Use cognitive restructuring techniques.",
+            TherapyApproach.DBT: "Emphasize distress tolerance and emotion regulation skills. Validate emotions while teaching coping strategies.",
+            TherapyApproach.HUMANISTIC: "Provide unconditional positive regard and facilitate self-discovery through reflection.",
+            TherapyApproach.SOLUTION_FOCUSED: "Focus on strengths, resources, and what's working. Ask scaling and exception-finding questions.",
+            TherapyApproach.MINDFULNESS: "Encourage present-moment awareness and acceptance. Use grounding techniques.",
+            TherapyApproach.CRISIS_INTERVENTION: "Prioritize immediate safety. Assess risk and connect with professional resources."
+        }
+    
     def get_prompt(self, category: str, subcategory: str = None, **kwargs) -> str:
         """
         Retrieve a specific prompt with optional formatting
@@ -392,43 +437,80 @@ Remember: You are a supportive companion in their mental health journey, not a r
         Returns:
             Complete contextual prompt
         """
+        return "".join(text for _, text in self.build_prompt_sections(
+            base_context, emotional_state, therapy_approach, session_history, crisis_indicators))
+    
+    def build_prompt_sections(self,
+                              base_context: str,
+                              emotional_state: EmotionalState,
+                              therapy_approach: TherapyApproach,
+                              session_history: List[str] = None,
+                              crisis_indicators: bool = False) -> List[Tuple[str, str]]:
+        """
+        The contextual prompt as named sections, in order; joined they are build_contextual_prompt
         
-        # Start with base system prompt
-        prompt = self.base_system_prompt + "\n\n"
+        Used for token accounting per section. Arguments are those of build_contextual_prompt.
+        
+        Returns:
+            (section name, text) pairs; sections that do not apply are left out
+        """
+        compact = self.profile == COMPACT_PROFILE
+        sections = [("system", self.base_system_prompt + "\n\n")]
         
         # Add crisis protocol if needed
         if crisis_indicators:
-            prompt += "🚨 CRISIS INDICATORS DETECTED - PRIORITIZE SAFETY ASSESSMENT 🚨\n\n"
+            banner = "CRISIS INDICATORS DETECTED - PRIORITIZE SAFETY ASSESSMENT"
+            sections.append(("crisis_banner", banner + "\n\n" if compact else f"🚨 {banner} 🚨\n\n"))
         
         # Add emotional context
-        prompt += f"CURRENT EMOTIONAL STATE: {emotional_state.value}\n"
-        prompt += f"RECOMMENDED THERAPEUTIC APPROACH: {therapy_approach.value}\n\n"
+        if compact:
+            sections.append(("emotional_context",
+                             f"EMOTIONAL STATE: {emotional_state.value}; APPROACH: {therapy_approach.value}\n\n"))
+        else:
+            sections.append(("emotional_context", f"CURRENT EMOTIONAL STATE: {emotional_state.value}\n"
+                                                  f"RECOMMENDED THERAPEUTIC APPROACH: {therapy_approach.value}\n\n"))
         
         # Add session history context
         if session_history:
-            prompt += "PREVIOUS SESSION CONTEXT:\n"
-            for session in session_history[-3:]:  # Last 3 sessions
-                prompt += f"- {session}\n"
-            prompt += "\n"
+            history = "".join(f"- {session}\n" for session in session_history[-3:])  # Last 3 sessions
+            heading = "PAST SESSIONS" if compact else "PREVIOUS SESSION CONTEXT"
+            sections.append(("session_history", f"{heading}:\n{history}\n"))
         
         # Add current conversation context
-        prompt += f"CURRENT CONVERSATION CONTEXT:\n{base_context}\n\n"
+        heading = "CONVERSATION" if compact else "CURRENT CONVERSATION CONTEXT"
+        sections.append(("conversation", f"{heading}:\n{base_context}\n\n"))
         
         # Add approach-specific guidance
-        approach_guidance = {
-            TherapyApproach.CBT: "Focus on identifying and challenging negative thought patterns. Use cognitive restructuring techniques.",
-            TherapyApproach.DBT: "Emphasize distress tolerance and emotion regulation skills. Validate emotions while teaching coping strategies.",
-            TherapyApproach.HUMANISTIC: "Provide unconditional positive regard and facilitate self-discovery through reflection.",
-            TherapyApproach.SOLUTION_FOCUSED: "Focus on strengths, resources, and what's working. Ask scaling and exception-finding questions.",
-            TherapyApproach.MINDFULNESS: "Encourage present-moment awareness and acceptance. Use grounding techniques.",
-            TherapyApproach.CRISIS_INTERVENTION: "Prioritize immediate safety. Assess risk and connect with professional resources."
-        }
+        heading = "FOCUS" if compact else "THERAPEUTIC FOCUS"
+        sections.append(("approach_guidance", f"{heading}: {self.approach_guidance[therapy_approach]}\n\n"))
         
-        prompt += f"THERAPEUTIC FOCUS: {approach_guidance[therapy_approach]}\n\n"
+        if compact:
+            sections.append(("closing_instruction", "Respond with empathy, conversationally and supportively."))
+        else:
+            sections.append(("closing_instruction", "Respond with empathy, professionalism, and appropriate therapeutic techniques. Keep responses conversational and supportive."))
+        return sections
+    
+    def build_turn_guidance(self,
+                            emotional_state: EmotionalState,
+                            therapy_approach: TherapyApproach,
+                            crisis_indicators: bool = False) -> str:
+        """
+        Build only the per-turn sections of the contextual prompt, worded for the selected profile
         
-        prompt += "Respond with empathy, professionalism, and appropriate therapeutic techniques. Keep responses conversational and supportive."
+        Chat-style callers send `base_system_prompt` once as a stable system
+        message and attach this short note to each turn, so the model server
+        can reuse its cached prefix instead of re-reading the whole prompt.
         
-        return prompt
+        Args:
+            emotional_state: Detected emotional state
+            therapy_approach: Chosen therapeutic approach
+            crisis_indicators: Whether crisis indicators are present
+            
+        Returns:
+            Turn guidance text
+        """
+        return "".join(text for name, text in self.build_prompt_sections(
+            "", emotional_state, therapy_approach, crisis_indicators=crisis_indicators) if name in TURN_SECTIONS)
 
 # Example usage and utility functions
 def create_therapy_session_prompt(user_input: str, 
@@ -471,6 +553,34 @@ CRISIS_KEYWORDS = {
     ]
 }
 
+# Crisis resources shared with the user whenever high risk is detected
+CRISIS_RESOURCES = {
+    "emergency_contacts": {
+        "national_suicide_prevention": "988",
+        "crisis_text_line": "Text HOME to 741741",
+        "emergency_services": "911"
+    },
+    "immediate_actions": [
+        "Remove any means of self-harm from your environment",
+        "Contact a trusted friend or family member",
+        "Go to the nearest emergency room if you're in immediate danger",
+        "Call 988 for immediate crisis support"
+    ],
+    "safety_plan": "Consider creating a safety plan with a mental health professional"
+}
+
+# Crisis levels whose turns are never throttled or queued: the rate limiter lets them
+# through and the scheduler admits them to a generation slot at once
+PRIORITY_CRISIS_LEVELS = ("high", "medium")
+
+
+def is_priority_crisis(crisis_level: str) -> bool:
+    """
+    Whether a turn at `crisis_level` bypasses the rate limit and the generation queue
+    """
+    return crisis_level in PRIORITY_CRISIS_LEVELS
+
+
 def detect_crisis_level(text: str) -> str:
     """
     Detect crisis level from user input
@@ -0,0 +1,60 @@
+"""
+Token accounting helpers
+Cheap token estimates for budgeting prompts and conversation history
+without loading the model's tokenizer
+"""
+
+from collections import deque
+from typing import Deque, Dict, Iterator, List
+
+# Llama-family tokenizers average roughly four bytes of English text per token
+BYTES_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate how many model tokens `text` will occupy
+    """
+    if not text:
+        return 0
+    return (len(text.encode("utf-8")) + BYTES_PER_TOKEN - 1) // BYTES_PER_TOKEN
+
+
+class TokenBudgetHistory:
+    """
+    Conversation history that never exceeds a token budget
+
+    The oldest exchanges are evicted first. A single exchange larger than the
+    whole budget is still kept, so the most recent turn is never lost.
+    """
+
+    def __init__(self, max_tokens: int = 1500, max_turns: int = 20):
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+        self._turns: Deque[Dict] = deque()
+        self.total_tokens = 0
+        self.evicted_turns = 0
+
+    def append(self, user_message: str, ai_response: str) -> None:
+        tokens = estimate_tokens(user_message) + estimate_tokens(ai_response)
+        self._turns.append({"user": user_message, "assistant": ai_response, "tokens": tokens})
+        self.total_tokens += tokens
+        while len(self._turns) > 1 and (self.total_tokens > self.max_tokens or len(self._turns) > self.max_turns):
+            self.total_tokens -= self._turns.popleft()["tokens"]
+            self.evicted_turns += 1
+
+    def as_messages(self) -> List[Dict]:
+        """
+        History as chat messages for Ollama's /api/chat
+        """
+        messages = []
+        for turn in self._turns:
+            messages.append({"role": "user", "content": turn["user"]})
+            messages.append({"role": "assistant", "content": turn["assistant"]})
+        return messages
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self._turns)
+
+    def __len__(self) -> int:
+        return len(self._turns)